@@ -0,0 +1,109 @@
+# -------------------------------------------------------- Log de alterações de alunos
+# Registro só de inserção, alimentado por triggers (rotas, API, importação,
+# tarefas, scripts: qualquer caminho que escreva em alunos): uma linha por
+# INSERT, UPDATE ou DELETE com o id do aluno. A chave versao é crescente e
+# nunca reaproveitada (AUTOINCREMENT), então um consumidor só guarda a
+# última versao que leu e pede o que veio depois.
+#
+# Compactação (entradas mais antigas que um corte):
+#   - de um mesmo aluno, só a última entrada fica; quem lê depois de
+#     qualquer versão ainda recebe o estado final de cada aluno
+#   - exclusões antigas saem de vez; o horizonte guarda a maior versao
+#     removida assim, e quem pede desde antes dele precisa de uma carga
+#     completa (a rota responde 410)
+
+SQL_CRIAR_ALTERACOES = (
+    '''
+    CREATE TABLE IF NOT EXISTS alteracoes_alunos (
+        versao INTEGER PRIMARY KEY AUTOINCREMENT,
+        operacao TEXT NOT NULL,
+        aluno_id INTEGER NOT NULL,
+        criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_alteracoes_aluno ON alteracoes_alunos (aluno_id, versao)',
+    '''
+    CREATE TABLE IF NOT EXISTS alteracoes_horizonte (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        versao INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS alteracoes_alunos_ai AFTER INSERT ON alunos BEGIN
+        INSERT INTO alteracoes_alunos (operacao, aluno_id) VALUES ('insert', new.id);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS alteracoes_alunos_au AFTER UPDATE ON alunos BEGIN
+        INSERT INTO alteracoes_alunos (operacao, aluno_id) VALUES ('update', new.id);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS alteracoes_alunos_ad AFTER DELETE ON alunos BEGIN
+        INSERT INTO alteracoes_alunos (operacao, aluno_id) VALUES ('delete', old.id);
+    END;
+    ''',
+)
+
+
+def criar_alteracoes(conn):
+    for sql in SQL_CRIAR_ALTERACOES:
+        conn.execute(sql)
+    conn.execute('INSERT OR IGNORE INTO alteracoes_horizonte (id, versao) VALUES (1, 0)')
+    # Os alunos que já existem entram como inserções: ler desde 0 é a carga completa
+    registrar_alteracoes_apos(conn, 0)
+
+
+def registrar_alteracoes_apos(conn, ultimo_id):
+    # Equivalente em lote do trigger alteracoes_alunos_ai para as linhas com id > ultimo_id
+    conn.execute('''
+        INSERT INTO alteracoes_alunos (operacao, aluno_id)
+        SELECT 'insert', id FROM alunos WHERE id > ? ORDER BY id
+    ''', (ultimo_id,))
+
+
+def horizonte(conn):
+    linha = conn.execute('SELECT versao FROM alteracoes_horizonte WHERE id = 1').fetchone()
+    return linha[0] if linha else 0
+
+
+def ultima_versao(conn):
+    return conn.execute('SELECT COALESCE(MAX(versao), 0) FROM alteracoes_alunos').fetchone()[0]
+
+
+def ler_alteracoes(conn, desde, limite):
+    # Até limite alterações com versao > desde, com a linha atual do aluno
+    # (None se ele não existe mais). Para o mesmo aluno a linha é sempre a
+    # atual, mesmo em entradas antigas: aplicar em ordem dá o estado certo.
+    return conn.execute('''
+        SELECT alteracoes_alunos.versao, alteracoes_alunos.operacao, alteracoes_alunos.aluno_id,
+               alteracoes_alunos.criado_em AS alterado_em, alunos.*
+        FROM alteracoes_alunos LEFT JOIN alunos ON alunos.id = alteracoes_alunos.aluno_id
+        WHERE alteracoes_alunos.versao > ?
+        ORDER BY alteracoes_alunos.versao
+        LIMIT ?
+    ''', (desde, limite)).fetchall()
+
+
+def compactar_alteracoes(conn, antes_de):
+    # antes_de: 'AAAA-MM-DD HH:MM:SS' (UTC, como CURRENT_TIMESTAMP). Não dá
+    # commit. Devolve quantas entradas saíram por tipo e o horizonte novo.
+    repetidas = conn.execute('''
+        DELETE FROM alteracoes_alunos
+        WHERE criado_em < ? AND versao < (
+            SELECT MAX(recente.versao) FROM alteracoes_alunos AS recente
+            WHERE recente.aluno_id = alteracoes_alunos.aluno_id
+        )
+    ''', (antes_de,)).rowcount
+    limite = conn.execute('''
+        SELECT MAX(versao) FROM alteracoes_alunos WHERE criado_em < ? AND operacao = 'delete'
+    ''', (antes_de,)).fetchone()[0]
+    exclusoes = 0
+    if limite is not None:
+        exclusoes = conn.execute('''
+            DELETE FROM alteracoes_alunos WHERE versao <= ? AND operacao = 'delete'
+        ''', (limite,)).rowcount
+        conn.execute('UPDATE alteracoes_horizonte SET versao = MAX(versao, ?) WHERE id = 1',
+                     (limite,))
+    return {'repetidas': repetidas, 'exclusoes': exclusoes, 'horizonte': horizonte(conn)}
+# -------------------------------------------------------- END Log de alterações de alunos
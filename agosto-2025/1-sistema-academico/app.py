@@ -1,95 +1,287 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import click
+from flask import Flask, Blueprint, Response, current_app, session, before_render_template, template_rendered, render_template, stream_template, stream_with_context, request, redirect, url_for, flash, g, jsonify, send_file
+from flask.cli import with_appcontext
+from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 
 import sqlite3
 
-from werkzeug.exceptions import abort
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.exceptions import abort, HTTPException
 from jinja2 import Environment
+from markupsafe import Markup
+
+from pool import ConnectionPool, PoolTimeout
+from armazenamento import PRAGMAS_PADRAO, GravadorSerial, configurar_conexao, pragmas_do_config
+from cache import LRUCache, CacheArquivo
+from senhas import HashExecutor, FilaHashCheia, hash_ficticio
+from limitador import LimitadorLogin, JanelasMemoria, JanelasArquivo, RESULTADOS as RESULTADOS_LOGIN
+from importar import (importar_alunos, ler_linhas, formato_do_arquivo, abrir_texto, validar,
+                      CampoInvalido, chave_importacao)
+from exportar import exportar_alunos, GERADORES, MIMETYPES, COLUNAS
+from busca import fts_disponivel, consulta_busca
+from migracoes import migrar, popular, versao_atual, deduplicar_emails, EmailsDuplicados
+from versoes import versao_tabela, versao_aluno
+from metricas import Metricas
+from perfilador import Perfilador, MODOS as MODOS_PERFIL, somar_tempo
+from replicas import Replicador, marca_replica
+from tarefas import ExecutorTarefas, enfileirar, ler_tarefa, listar_tarefas
+from resumo_cursos import reconstruir_resumo, verificar_resumo
+from alteracoes import compactar_alteracoes, horizonte, ler_alteracoes, ultima_versao
 # from kage-sama import criar_usuario_admin
 
 
 
-app = Flask(__name__)
-app.jinja_env.globals.update(zip=zip)
-app.secret_key = 'Ehqb_E._Uhlv_LL'
+CONFIG_PADRAO = {
+    'DATABASE': 'alunos.db',
+    'DB_POOL_SIZE': 5,
+    'DB_POOL_TIMEOUT': 10.0,
+    'ALUNOS_POR_PAGINA': 50,
+    'ALUNOS_POR_PAGINA_MAX': 500,
+    'USER_CACHE_SIZE': 1024,
+    'USER_CACHE_TTL': 60.0,
+    'FRAGMENT_CACHE_SIZE': 256,
+    'SEARCH_CACHE_ENABLED': True,
+    'SEARCH_CACHE_STORE': 'memoria',    # 'memoria' (por processo) ou 'arquivo' (todos os workers)
+    'SEARCH_CACHE_PATH': None,          # arquivo do store 'arquivo'; padrão: DATABASE + '-cache'
+    'SEARCH_CACHE_SIZE': 512,
+    'SEARCH_CACHE_TTL': 300.0,
+    'HASH_WORKERS': 2,
+    'HASH_QUEUE_SIZE': 32,
+    'HASH_TIMEOUT': 30.0,
+    'LOGIN_THROTTLE_ENABLED': True,
+    'LOGIN_THROTTLE_STORE': 'memoria',  # 'memoria' (por processo) ou 'arquivo' (todos os workers)
+    'LOGIN_THROTTLE_PATH': None,        # arquivo do store 'arquivo'; padrão: DATABASE + '-limites'
+    'LOGIN_IP_LIMIT': 20,               # tentativas por IP a cada LOGIN_IP_WINDOW segundos
+    'LOGIN_IP_WINDOW': 60.0,
+    'LOGIN_USER_LIMIT': 5,              # tentativas por usuário a cada LOGIN_USER_WINDOW segundos
+    'LOGIN_USER_WINDOW': 300.0,
+    'IMPORT_BATCH_SIZE': 1000,
+    'IMPORT_BATCHES_PER_TRANSACTION': 10,
+    'DB_WRITER_ENABLED': True,
+    'DB_WRITER_MAX_BATCH': 64,
+    'API_BATCH_MAX': 1000,
+    'CHANGES_PAGE_SIZE': 500,           # alterações por página em /api/alunos/changes
+    'CHANGES_PAGE_MAX': 5000,
+    'CHANGES_RETENTION_DAYS': 7,        # a compactação mexe só no que é mais antigo que isso
+    'METRICS_ENABLED': True,
+    'METRICS_TOKEN': None,      # se definido, /metrics exige "Authorization: Bearer <token>"
+    'SLOW_QUERY_MS': None,      # se definido, SQL mais lento que isso vai para o log
+    'PROFILE_ENABLED': True,    # perfis por requisição (taxa e modo em /perfis, só admin)
+    'PROFILE_DIR': None,        # padrão: DATABASE + '-perfis'
+    'PROFILE_SAMPLE_INTERVAL': 0.005,
+    'PROFILE_MAX_FILES': 200,
+    'PROFILE_HEADER': 'X-Perfil',   # requisição de admin com esse cabeçalho sempre é perfilada
+    'PROFILE_TOKEN': None,          # ou de qualquer um que mande o token como valor do cabeçalho
+    'ASGI_THREADS': 8,          # threads que rodam as views no modo ASGI (asgi.py)
+    'WORKERS': None,            # processos do servidor.py; padrão: um por CPU
+    'WORKER_THREADS': 4,        # threads por processo do servidor.py
+    'KEEPALIVE': 2.0,           # segundos de conexão ociosa mantida aberta; 0 desliga
+    'GRACEFUL_TIMEOUT': 30.0,   # espera pelas requisições em andamento antes do SIGKILL
+    'READ_REPLICAS': [],            # arquivos réplica para as leituras (ver replicas.py)
+    'REPLICA_SYNC_INTERVAL': 5.0,   # segundos entre cópias; 0 = só pelo `flask replicar`
+    'REPLICA_MAX_LAG': 15.0,        # réplica mais atrasada que isso não recebe leituras
+    'JOB_WORKERS': 1,           # threads de tarefas por processo; 0 = só pelo `flask tarefas`
+    'JOB_POLL_INTERVAL': 1.0,
+    'JOB_MAX_ATTEMPTS': 3,
+    'JOB_RETRY_DELAY': 5.0,     # espera antes da 2ª tentativa; dobra a cada falha
+    'JOB_STALE_AFTER': 60.0,    # tarefa sem sinal de vida há mais que isso volta para a fila
+    'JOB_FILES_DIR': None,      # uploads das tarefas; padrão: DATABASE + '-tarefas'
+    **PRAGMAS_PADRAO,
+}
+
+bp = Blueprint('academico', __name__)
 
 # -------------------------------------------------------- Configuração do Flask-Login
 
 
 
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'academico.login'
+# Na API, sem login é 401 em JSON, não redirecionamento para o formulário
+login_manager.blueprint_login_views['api'] = None
+
+class User:
+    # Mesma interface do UserMixin, mas com __slots__: os objetos ficam no
+    # cache de usuários por até USER_CACHE_TTL, então quanto menores, melhor.
+    __slots__ = ('id', 'username', 'is_admin')
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, username=None, is_admin=False):
+        self.id = id
+        self.username = username
+        self.is_admin = is_admin
+
+    @classmethod
+    def from_row(cls, user_data):
+        return cls(user_data['id'], user_data['username'], bool(user_data['is_admin']))
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        if isinstance(other, User):
+            return self.get_id() == other.get_id()
+        return NotImplemented
+
+    __hash__ = object.__hash__
+
+
+# Objetos de cada processo (pool, gravador, caches, executores) são criados
+# na primeira requisição, depois do fork dos workers. O lock impede que
+# requisições simultâneas criem dois: dois pools estourariam DB_POOL_SIZE e
+# dois gravadores quebrariam a escrita serial.
+_lock_extensoes = threading.RLock()
 
-class User(UserMixin):
-    pass
+def por_processo(nome, criar):
+    objeto = current_app.extensions.get(nome)
+    if objeto is None:
+        with _lock_extensoes:
+            objeto = current_app.extensions.get(nome)
+            if objeto is None:
+                objeto = criar()
+                current_app.extensions[nome] = objeto
+    return objeto
+
+def get_cache_usuarios():
+    def criar():
+        cache = LRUCache(maxsize=current_app.config['USER_CACHE_SIZE'],
+                         ttl=current_app.config['USER_CACHE_TTL'])
+        return cache
+    return por_processo('cache_usuarios', criar)
+
+def invalidar_usuario(user_id):
+    # Chamar sempre que uma linha de usuarios mudar. Em outros processos
+    # a entrada antiga vive no máximo USER_CACHE_TTL segundos.
+    get_cache_usuarios().invalidate(str(user_id))
 
 @login_manager.user_loader
 def load_user(user_id):
+    cache = get_cache_usuarios()
+    user = cache.get(user_id)
+    if user is not None:
+        return user
+
     conn = get_db_connection()
     user_data = conn.execute('SELECT * FROM usuarios WHERE id = ?', (user_id,)).fetchone()
-    conn.close()
     
     if not user_data:
         return None
     
-    user = User()
-    user.id = user_data['id']
-    user.username = user_data['username']
-    user.is_admin = user_data['is_admin']
+    user = User.from_row(user_data)
+    cache.set(user_id, user)
     return user
 
 
 
-@app.route('/login', methods=['GET', 'POST'])
+def get_hash_executor():
+    def criar():
+        executor = HashExecutor(workers=current_app.config['HASH_WORKERS'],
+                                fila=current_app.config['HASH_QUEUE_SIZE'],
+                                timeout=current_app.config['HASH_TIMEOUT'])
+        return executor
+    return por_processo('hash_executor', criar)
+
+@bp.app_errorhandler(FilaHashCheia)
+def fila_hash_cheia(e):
+    # Pico de logins: recusa logo em vez de segurar a requisição na fila
+    return 'Servidor ocupado, tente novamente em instantes.', 503, {'Retry-After': '1'}
+
+
+
+def get_limitador_login():
+    def criar():
+        config = current_app.config
+        if config['LOGIN_THROTTLE_STORE'] == 'arquivo':
+            janelas = JanelasArquivo(config['LOGIN_THROTTLE_PATH'] or config['DATABASE'] + '-limites')
+        else:
+            janelas = JanelasMemoria()
+        limitador = LimitadorLogin(janelas,
+                                   limite_ip=config['LOGIN_IP_LIMIT'],
+                                   janela_ip=config['LOGIN_IP_WINDOW'],
+                                   limite_usuario=config['LOGIN_USER_LIMIT'],
+                                   janela_usuario=config['LOGIN_USER_WINDOW'])
+        return limitador
+    return por_processo('limitador_login', criar)
+
+
+
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        
+
+        # Limite antes de consultar o banco ou calcular hash: força bruta
+        # recebe 429 sem gastar CPU
+        limitador = get_limitador_login() if current_app.config['LOGIN_THROTTLE_ENABLED'] else None
+        if limitador:
+            espera = limitador.tentar(request.remote_addr, username)
+            if espera:
+                flash(f'Muitas tentativas de login. Tente novamente em {espera} segundos.')
+                return render_template('login.html'), 429, {'Retry-After': str(espera)}
+
         conn = get_db_connection()
         user_data = conn.execute(
             'SELECT * FROM usuarios WHERE username = ?', (username,)
         ).fetchone()
-        conn.close()
-        
-        if user_data and check_password_hash(user_data['password_hash'], password):
-            user = User()
-            user.id = user_data['id']
+        # Devolve a conexão antes do hash para não segurar o pool durante a verificação
+        close_db_connection()
+
+        # Usuário inexistente responde como senha errada e no mesmo tempo
+        if user_data is None:
+            get_hash_executor().verificar_ficticio(password)
+            resultado = 'desconhecido'
+        elif get_hash_executor().verificar(user_data['password_hash'], password):
+            user = User.from_row(user_data)
+            get_cache_usuarios().set(user.get_id(), user)
             login_user(user)
-            return redirect(url_for('index'))
-        
+            if limitador:
+                limitador.sucesso(username)
+            return redirect(url_for('.index'))
+        else:
+            resultado = 'falha'
+
+        if limitador:
+            limitador.contar(resultado)
         flash('Credenciais inválidas!')
     
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('index'))
+    return redirect(url_for('.index'))
 
-@app.route('/criar-conta', methods=['GET', 'POST'])
+@bp.route('/criar-conta', methods=['GET', 'POST'])
 def criar_conta():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         is_admin = 1 if request.form.get('is_admin') else 0
         
-        conn = get_db_connection()
+        password_hash = get_hash_executor().gerar(password)
+        
         try:
-            conn.execute(
+            user_id = executar_escrita(lambda conn: conn.execute(
                 'INSERT INTO usuarios (username, password_hash, is_admin) VALUES (?, ?, ?)',
-                (username, generate_password_hash(password), is_admin)
-            )
-            conn.commit()
+                (username, password_hash, is_admin)
+            ).lastrowid)
+            invalidar_usuario(user_id)
             flash('Conta criada com sucesso!')
-            return redirect(url_for('login'))
+            return redirect(url_for('.login'))
         except sqlite3.IntegrityError:
             flash('Usuário já existe!')
-        finally:
-            conn.close()
     
     return render_template('criar_conta.html')
 
@@ -101,65 +293,701 @@ def criar_conta():
 
 
 # -------------------------------------------------------- Configuração do banco de dados
-def get_db_connection():
-    conn = sqlite3.connect('alunos.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+def get_pool():
+    def criar():
+        pragmas = pragmas_do_config(current_app.config)
+        pool = ConnectionPool(current_app.config['DATABASE'],
+                              size=current_app.config['DB_POOL_SIZE'],
+                              timeout=current_app.config['DB_POOL_TIMEOUT'],
+                              on_connect=lambda conn: configurar_conexao(conn, pragmas),
+                              factory=classe_conexao())
+        return pool
+    return por_processo('db_pool', criar)
+
+def fabrica_conexoes():
+    # Conexões de threads próprias (gravador, tarefas): fora do pool, com os
+    # mesmos pragmas e a mesma instrumentação
+    database = current_app.config['DATABASE']
+    pragmas = pragmas_do_config(current_app.config)
+    factory = classe_conexao()
+
+    def conectar():
+        conn = sqlite3.connect(database, factory=factory)
+        conn.row_factory = sqlite3.Row
+        return configurar_conexao(conn, pragmas)
+    return conectar
+
+def get_gravador():
+    def criar():
+        gravador = GravadorSerial(fabrica_conexoes(),
+                                  max_lote=current_app.config['DB_WRITER_MAX_BATCH'])
+        return gravador
+    return por_processo('db_gravador', criar)
 
-def init_db():
+def executar_escrita(funcao):
+    # Escritas curtas das rotas: funcao(conn) roda no gravador do processo e
+    # é confirmada junto com as escritas que chegaram ao mesmo tempo
+    if current_app.config['DB_WRITER_ENABLED']:
+        inicio = time.perf_counter()
+        try:
+            return get_gravador().executar(funcao)
+        finally:
+            somar_tempo('escrita', time.perf_counter() - inicio)
     conn = get_db_connection()
-    
-    # Cria tabela de alunos (se já não existir)
-    conn.execute('''
-    CREATE TABLE IF NOT EXISTS alunos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nome TEXT NOT NULL,
-        email TEXT NOT NULL,
-        telefone TEXT,
-        curso TEXT,
-        criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    
-    conn.execute('''
-    CREATE TABLE IF NOT EXISTS usuarios (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password_hash TEXT NOT NULL,
-        is_admin BOOLEAN DEFAULT 0
-    )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    try:
+        # Transação explícita: savepoints dentro de funcao não confirmam sozinhos
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+        resultado = funcao(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return resultado
+
+def get_db_connection():
+    # Uma conexão do pool por contexto; devolvida em close_db_connection
+    if 'db' not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+def close_db_connection(exc=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(conn)
+    leitura = g.pop('db_leitura', None)
+    if leitura is not None:
+        pool, conn = leitura
+        pool.release(conn)
+
+def fts_ativo(conn):
+    if 'fts' not in current_app.extensions:
+        current_app.extensions['fts'] = fts_disponivel(conn)
+    return current_app.extensions['fts']
+
+
+@bp.route('/metricas/pool')
+@login_required
+def metricas_pool():
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(get_pool().stats())
+
+
+@bp.route('/metricas/cache-usuarios')
+@login_required
+def metricas_cache_usuarios():
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(get_cache_usuarios().stats())
+
+
+@bp.route('/metricas/hash')
+@login_required
+def metricas_hash():
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(get_hash_executor().stats())
+
+
+@bp.route('/metricas/login')
+@login_required
+def metricas_login():
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(get_limitador_login().stats())
+
+
+@bp.route('/metricas/gravador')
+@login_required
+def metricas_gravador():
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(get_gravador().stats())
 # -------------------------------------------------------- END Configuração do banco de dados
 
 
-@app.route('/')
+# -------------------------------------------------------- Réplicas de leitura
+# As rotas só de leitura pegam a conexão em get_db_leitura(), que usa uma
+# réplica (replicas.py) quando ela está em dia o bastante: atraso até
+# REPLICA_MAX_LAG e, para quem escreveu há pouco, sincronizada depois da
+# última escrita da sessão. Senão, cai no banco principal. Sem
+# READ_REPLICAS configurado é o próprio get_db_connection().
+
+def configurar_replica(conn, pragmas):
+    configurar_conexao(conn, pragmas)
+    conn.execute('PRAGMA query_only = ON')
+    return conn
+
+def get_replicas():
+    def criar():
+        config = current_app.config
+        pragmas = pragmas_do_config(config)
+        factory = classe_conexao()
+        replicas = {caminho: ConnectionPool(caminho, size=config['DB_POOL_SIZE'],
+                                            timeout=config['DB_POOL_TIMEOUT'],
+                                            on_connect=lambda conn: configurar_replica(conn, pragmas),
+                                            factory=factory)
+                    for caminho in config['READ_REPLICAS']}
+        if replicas and config['REPLICA_SYNC_INTERVAL']:
+            get_replicador().iniciar()
+        return replicas
+    return por_processo('db_replicas', criar)
+
+def get_replicador():
+    def criar():
+        config = current_app.config
+        replicador = Replicador(config['DATABASE'], config['READ_REPLICAS'],
+                                intervalo=config['REPLICA_SYNC_INTERVAL'] or 5.0)
+        return replicador
+    return por_processo('db_replicador', criar)
+
+def escolher_replica():
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    replicas = get_replicas()
+    if not replicas:
+        return None
+    agora = time.time()
+    # Ler a sessão só quando há réplicas: sem elas o cookie nem é aberto
+    desde = max(agora - current_app.config['REPLICA_MAX_LAG'], session.get('escrita_em', 0))
+    em_dia = [caminho for caminho in replicas
+              if (marca_replica(caminho) or 0) > desde]
+    return random.choice(em_dia) if em_dia else None
+
+def get_db_leitura():
+    if 'db_leitura' in g:
+        return g.db_leitura[1]
+    replica = escolher_replica() if 'db' not in g else None
+    if replica is None:
+        return get_db_connection()
+    pool = get_replicas()[replica]
+    g.db_leitura = (pool, pool.acquire())
+    return g.db_leitura[1]
+
+@bp.after_app_request
+def marcar_escrita(response):
+    # Leia o que escreveu: depois de uma escrita (inclusive o redirect que a
+    # segue) a sessão só lê réplicas sincronizadas depois deste instante
+    if (current_app.config['READ_REPLICAS'] and request.method not in ('GET', 'HEAD', 'OPTIONS')
+            and response.status_code < 400):
+        session['escrita_em'] = time.time()
+    return response
+
+
+@bp.route('/metricas/replicas')
+@login_required
+def metricas_replicas():
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(get_replicador().stats())
+# -------------------------------------------------------- END Réplicas de leitura
+
+
+# -------------------------------------------------------- Instrumentação
+# Latência por rota, tempo e linhas por SQL, renderização de templates e
+# conexões (metricas.py), expostos em /metrics no formato do Prometheus
+# junto com os contadores do pool, gravador, hash e caches.
+
+def get_metricas():
+    if not current_app.config['METRICS_ENABLED']:
+        return None
+    def criar():
+        lento = current_app.config['SLOW_QUERY_MS']
+        metricas = Metricas(lento=None if lento is None else float(lento) / 1000,
+                            logger=current_app.logger)
+        return metricas
+    return por_processo('metricas', criar)
+
+def classe_conexao():
+    metricas = get_metricas()
+    return metricas.classe_conexao() if metricas else sqlite3.Connection
+
+@bp.before_app_request
+def iniciar_medicao():
+    g.inicio_requisicao = time.perf_counter()
+
+@bp.after_app_request
+def medir_requisicao(response):
+    metricas = get_metricas()
+    if metricas and 'inicio_requisicao' in g:
+        metricas.registrar_requisicao(request.endpoint or '(nenhuma)', request.method,
+                                      response.status_code,
+                                      time.perf_counter() - g.inicio_requisicao)
+    return response
+
+def iniciar_template(app, template, context, **extra):
+    g.setdefault('inicio_templates', []).append(time.perf_counter())
+
+def medir_template(app, template, context, **extra):
+    inicios = g.get('inicio_templates')
+    if not inicios:
+        return
+    duracao = time.perf_counter() - inicios.pop()
+    somar_tempo('template', duracao)
+    metricas = get_metricas()
+    if metricas:
+        metricas.registrar_template(template.name, duracao)
+
+def metricas_extras():
+    # Só lê o que já existe: um scrape não deve criar pool de hash nem gravador
+    extensoes = current_app.extensions
+    if 'db_pool' in extensoes:
+        pool = extensoes['db_pool'].stats()
+        yield ('academico_pool_conexoes', 'gauge', 'Conexões do pool por estado',
+               [({'estado': estado}, pool[estado]) for estado in ('abertas', 'em_uso', 'livres')])
+        yield ('academico_pool_checkouts_total', 'counter', 'Conexões entregues pelo pool',
+               [({}, pool['checkouts'])])
+        yield ('academico_pool_timeouts_total', 'counter', 'Esperas por conexão que estouraram',
+               [({}, pool['timeouts'])])
+        yield ('academico_pool_espera_segundos_total', 'counter', 'Tempo esperando conexão livre',
+               [({}, pool['tempo_espera_total'])])
+    if 'db_gravador' in extensoes:
+        gravador = extensoes['db_gravador'].stats()
+        yield ('academico_gravador_total', 'counter', 'Commits, escritas e falhas do gravador',
+               [({'tipo': tipo}, gravador[tipo]) for tipo in ('commits', 'escritas', 'falhas')])
+        yield ('academico_gravador_fila', 'gauge', 'Escritas aguardando o gravador',
+               [({}, gravador['na_fila'])])
+    if 'hash_executor' in extensoes:
+        hash_stats = extensoes['hash_executor'].stats()
+        operacoes = ('gerar', 'verificar')
+        yield ('academico_hash_total', 'counter', 'Operações de hash de senha',
+               [({'op': op}, hash_stats[op]['contagem']) for op in operacoes])
+        yield ('academico_hash_segundos_total', 'counter', 'Tempo em hash de senha',
+               [({'op': op}, hash_stats[op]['tempo_total']) for op in operacoes])
+        yield ('academico_hash_rejeitadas_total', 'counter', 'Hashes recusados com a fila cheia',
+               [({'op': op}, hash_stats[op]['rejeitadas']) for op in operacoes])
+        yield ('academico_hash_expiradas_total', 'counter', 'Hashes que passaram do timeout',
+               [({'op': op}, hash_stats[op]['expiradas']) for op in operacoes])
+    if 'limitador_login' in extensoes:
+        login_stats = extensoes['limitador_login'].stats()
+        yield ('academico_login_total', 'counter', 'Tentativas de login por resultado',
+               [({'resultado': resultado}, login_stats[resultado]) for resultado in RESULTADOS_LOGIN])
+    if 'db_replicador' in extensoes:
+        atrasos = extensoes['db_replicador'].stats()['atraso']
+        yield ('academico_replica_atraso_segundos', 'gauge', 'Tempo desde a última sincronização da réplica',
+               [({'replica': caminho}, atraso) for caminho, atraso in atrasos.items()
+                if atraso is not None])
+    if 'executor_tarefas' in extensoes:
+        tarefas = extensoes['executor_tarefas'].stats()
+        yield ('academico_tarefas_total', 'counter', 'Tarefas concluídas, falhas, retentativas e recuperadas',
+               [({'tipo': tipo}, tarefas[tipo])
+                for tipo in ('concluidas', 'falhas', 'retentativas', 'recuperadas')])
+        yield ('academico_tarefas_em_execucao', 'gauge', 'Tarefas rodando neste processo',
+               [({}, len(tarefas['em_execucao']))])
+    if 'perfilador' in extensoes:
+        perfis = extensoes['perfilador'].stats()
+        yield ('academico_perfis_total', 'counter', 'Perfis de requisição gravados',
+               [({}, perfis['perfis'])])
+    caches = [(nome, extensoes[chave].stats()) for nome, chave in
+              (('usuarios', 'cache_usuarios'), ('fragmentos', 'cache_fragmentos'),
+               ('busca', 'cache_busca'))
+              if chave in extensoes]
+    if caches:
+        yield ('academico_cache_total', 'counter', 'Acertos, faltas e despejos por cache',
+               [({'cache': nome, 'tipo': tipo}, stats[tipo]) for nome, stats in caches
+                for tipo in ('hits', 'misses', 'evictions', 'invalidations')])
+
+@bp.route('/metrics')
+def metrics():
+    metricas = get_metricas()
+    if metricas is None:
+        abort(404)
+    token = current_app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+    return Response(metricas.texto_prometheus(metricas_extras()),
+                    mimetype='text/plain; version=0.0.4')
+# -------------------------------------------------------- END Instrumentação
+
+
+# -------------------------------------------------------- Perfis de requisições
+# Uma fração das requisições (taxa e rota em /perfis, valendo para todos os
+# workers) ou as que mandam o cabeçalho PROFILE_HEADER rodam com o
+# perfilador de perfilador.py. Cada perfil vira arquivos na pasta de perfis,
+# com o tempo separado em SQL, espera pelo gravador, hash e templates.
+
+def get_perfilador():
+    def criar():
+        config = current_app.config
+        perfilador = Perfilador(config['PROFILE_DIR'] or config['DATABASE'] + '-perfis',
+                                intervalo=config['PROFILE_SAMPLE_INTERVAL'],
+                                max_arquivos=config['PROFILE_MAX_FILES'])
+        return perfilador
+    return por_processo('perfilador', criar)
+
+def perfil_pedido():
+    # Cabeçalho só vale com o token ou de um admin logado: perfilar custa
+    # CPU e disco, não pode ficar aberto a qualquer cliente
+    valor = request.headers.get(current_app.config['PROFILE_HEADER'])
+    if not valor:
+        return False
+    token = current_app.config['PROFILE_TOKEN']
+    if token and valor == token:
+        return True
+    return current_user.is_authenticated and current_user.is_admin
+
+@bp.before_app_request
+def iniciar_perfil():
+    if not current_app.config['PROFILE_ENABLED']:
+        return
+    perfilador = get_perfilador()
+    modo = perfilador.escolher(request.endpoint, perfil_pedido())
+    if modo:
+        url = request.full_path if request.query_string else request.path
+        g.perfil = perfilador.iniciar(modo, request.method, url)
+
+@bp.after_app_request
+def terminar_perfil(response):
+    perfil = g.pop('perfil', None)
+    if perfil is not None:
+        # No close da resposta: respostas em stream entram no perfil inteiras
+        perfilador = get_perfilador()
+        argumentos = (perfil, threading.get_ident(), request.endpoint, response.status_code)
+        response.call_on_close(lambda: perfilador.terminar(*argumentos))
+    return response
+
+
+@bp.route('/perfis')
+@login_required
+def perfis():
+    if not current_user.is_admin:
+        abort(403)
+    perfilador = get_perfilador()
+    lista = perfilador.listar(limite=100)
+    if quer_json():
+        return jsonify(perfis=lista, stats=perfilador.stats())
+    return render_template('perfis.html', perfis=lista, config=perfilador.config(),
+                           modos=MODOS_PERFIL, cabecalho=current_app.config['PROFILE_HEADER'])
+
+
+@bp.route('/perfis/config', methods=('POST',))
+@login_required
+def configurar_perfis():
+    if not current_user.is_admin:
+        abort(403)
+    dados = request.get_json(silent=True) if request.is_json else request.form
+    try:
+        config = get_perfilador().salvar_config(float(dados.get('taxa', 0)),
+                                                dados.get('modo', MODOS_PERFIL[0]),
+                                                dados.get('rota') or None)
+    except (TypeError, ValueError) as erro:
+        abort(400, str(erro))
+    if quer_json():
+        return jsonify(config=config)
+    flash(f"Perfis: {config['taxa']:.1%} das requisições, modo {config['modo']}.")
+    return redirect(url_for('.perfis'))
+
+
+@bp.route('/perfis/<nome>')
+@login_required
+def ver_perfil(nome):
+    if not current_user.is_admin:
+        abort(403)
+    perfilador = get_perfilador()
+    if perfilador.arquivo(nome, 'json') is None:
+        abort(404)
+    return jsonify(perfil=perfilador.ler(nome))
+
+
+@bp.route('/perfis/<nome>/<extensao>')
+@login_required
+def baixar_perfil(nome, extensao):
+    # folded: pilhas colapsadas (flamegraph.pl, speedscope); prof: pstats; txt: resumo
+    if not current_user.is_admin:
+        abort(403)
+    caminho = get_perfilador().arquivo(nome, extensao)
+    if caminho is None:
+        abort(404)
+    if extensao == 'prof':
+        return send_file(caminho, as_attachment=True, download_name=f'{nome}.prof')
+    return send_file(caminho, mimetype='text/plain; charset=utf-8')
+# -------------------------------------------------------- END Perfis de requisições
+
+
+# -------------------------------------------------------- Cache HTTP (ETag / Last-Modified)
+def versao_templates(app):
+    # Entra no ETag para que um deploy com templates novos não sirva 304 velho
+    h = hashlib.sha1()
+    pasta = os.path.join(app.root_path, app.template_folder)
+    for nome in sorted(os.listdir(pasta)):
+        info = os.stat(os.path.join(pasta, nome))
+        h.update(f'{nome}:{info.st_size}:{info.st_mtime_ns}'.encode())
+    return h.hexdigest()[:8]
+
+def nao_modificado(versao, atualizado_em):
+    # Chamar antes de consultar alunos: se o cliente já tem esta versão da
+    # página, devolve o 304 sem ler linhas nem renderizar nada.
+    if versao is None:
+        return None
+    # Mensagem flash pendente só aparece no corpo: a página nem leva ETag,
+    # senão o próximo 304 mostraria a mensagem velha de novo
+    if session.get('_flashes'):
+        return None
+    usuario = current_user.get_id() if current_user.is_authenticated else 'anon'
+    etag = f"{versao}-{usuario}-{current_app.config['ETAG_SALT']}"
+    g.etag = (etag, atualizado_em)
+
+    if request.if_none_match:
+        if request.if_none_match.contains(etag):
+            return Response(status=304)
+    elif (request.if_modified_since and atualizado_em and not current_user.is_authenticated
+          and atualizado_em <= request.if_modified_since):
+        # Last-Modified não distingue usuários: só vale para visitantes
+        return Response(status=304)
+    return None
+
+@bp.after_app_request
+def aplicar_etag(response):
+    if 'etag' in g and response.status_code in (200, 304):
+        etag, atualizado_em = g.etag
+        response.set_etag(etag)
+        if atualizado_em:
+            response.last_modified = atualizado_em
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Cookie')
+    return response
+# -------------------------------------------------------- END Cache HTTP (ETag / Last-Modified)
+
+
+# -------------------------------------------------------- Cache de fragmentos renderizados
+# Guarda o HTML já renderizado das linhas da tabela do index e do resumo das
+# estatísticas. A chave inclui a versão de alunos (versoes.py), então uma
+# escrita em qualquer processo faz as páginas novas errarem o cache; as rotas
+# de CRUD ainda limpam o cache local para liberar as entradas velhas.
+
+ID_MODELO = 987654321
+
+def get_cache_fragmentos():
+    def criar():
+        # Sem TTL: entradas de versões antigas só saem por LRU ou invalidação
+        cache = LRUCache(maxsize=current_app.config['FRAGMENT_CACHE_SIZE'], ttl=0)
+        return cache
+    return por_processo('cache_fragmentos', criar)
+
+def invalidar_fragmentos():
+    get_cache_fragmentos().clear()
+    invalidar_cache_busca()
+
+def urls_aluno():
+    # url_for uma vez por rota, não três vezes por linha: o template só troca
+    # o id no modelo (urls.ver.format(id))
+    return {
+        nome: url_for(endpoint, id=ID_MODELO).replace(str(ID_MODELO), '{}')
+        for nome, endpoint in (('ver', '.ver_aluno'), ('editar', '.editar'), ('deletar', '.deletar'))
+    }
+
+def fragmento(chave, gerar):
+    # gerar() devolve uma tupla (html, extras...); None na chave desliga o cache
+    if chave is None:
+        return gerar()
+    cache = get_cache_fragmentos()
+    valor = cache.get(chave)
+    if valor is None:
+        valor = gerar()
+        cache.set(chave, valor)
+    return valor
+
+@bp.route('/metricas/fragmentos')
+@login_required
+def metricas_fragmentos():
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(get_cache_fragmentos().stats())
+# -------------------------------------------------------- END Cache de fragmentos renderizados
+
+
+# -------------------------------------------------------- Cache de resultados de busca
+# Páginas de resultado da busca do index (e da API), já consultadas, por
+# termo normalizado e página. A chave leva a versão de alunos (versoes.py):
+# qualquer escrita em alunos, de qualquer processo, faz as buscas seguintes
+# errarem o cache, então ele nunca devolve resultado velho. O store
+# 'arquivo' (cache.CacheArquivo) é compartilhado por todos os workers; o
+# 'memoria' é um LRUCache por processo.
+
+def get_cache_busca():
+    def criar():
+        config = current_app.config
+        if config['SEARCH_CACHE_STORE'] == 'arquivo':
+            caminho = config['SEARCH_CACHE_PATH'] or config['DATABASE'] + '-cache'
+            cache = CacheArquivo(caminho, maxsize=config['SEARCH_CACHE_SIZE'],
+                                 ttl=config['SEARCH_CACHE_TTL'])
+        else:
+            cache = LRUCache(maxsize=config['SEARCH_CACHE_SIZE'], ttl=config['SEARCH_CACHE_TTL'])
+        return cache
+    return por_processo('cache_busca', criar)
+
+def invalidar_cache_busca():
+    # Só libera memória: a versão na chave já garante a invalidação. O store
+    # em arquivo é de todos os workers e as entradas velhas saem por LRU.
+    cache = current_app.extensions.get('cache_busca')
+    if isinstance(cache, LRUCache):
+        cache.clear()
+
+def termo_normalizado(search_term, fts):
+    # Com FTS5 (unicode61) maiúsculas e espaços não mudam o resultado; no
+    # LIKE um espaço a mais muda, e maiúscula acentuada também
+    return ' '.join(search_term.lower().split()) if fts else search_term
+
+def buscar_pagina(conn, versao, search_term, apos, antes, limite):
+    # apos/antes: tokens de página como vieram na URL
+    sql, params, chave = consulta_alunos(conn, search_term)
+
+    def consultar():
+        return paginar_alunos(conn, sql, params, chave,
+                              ler_token(apos, chave), ler_token(antes, chave), limite)
+
+    if not search_term or versao is None or not current_app.config['SEARCH_CACHE_ENABLED']:
+        return consultar()
+
+    fts = fts_ativo(conn)
+    chave_cache = json.dumps(['busca', versao, fts, termo_normalizado(search_term, fts),
+                              apos, antes, limite], ensure_ascii=False)
+    cache = get_cache_busca()
+    pagina = cache.get(chave_cache)
+    if pagina is None:
+        alunos, proximo, anterior = consultar()
+        pagina = {'alunos': [dict(aluno) for aluno in alunos],
+                  'proximo': proximo, 'anterior': anterior}
+        cache.set(chave_cache, pagina)
+    return pagina['alunos'], pagina['proximo'], pagina['anterior']
+
+@bp.route('/metricas/cache-busca')
+@login_required
+def metricas_cache_busca():
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(get_cache_busca().stats())
+# -------------------------------------------------------- END Cache de resultados de busca
+
+
+def consulta_alunos(conn, search_term):
+    return consulta_busca(search_term, search_term and fts_ativo(conn))
+
+
+def ler_token(token, chave):
+    # Token de página = valores da chave separados por vírgula ("12" ou "-3.1,12")
+    if not token:
+        return None
+    try:
+        valores = tuple(float(v) if '.' in v or 'e' in v.lower() else int(v)
+                        for v in token.split(','))
+    except ValueError:
+        return None
+    return valores if len(valores) == len(chave) else None
+
+
+def gerar_token(aluno, chave):
+    return ','.join(repr(aluno[c]) for c in chave)
+
+
+def paginar_alunos(conn, sql, params, chave, apos=None, antes=None, limite=50):
+    # Paginação por chave (keyset): cada página continua de onde a outra
+    # parou, então o custo não cresce com o número da página como com OFFSET.
+    colunas = ', '.join(chave)
+    marcadores = ', '.join('?' * len(chave))
+
+    if antes is not None:
+        condicao = f'WHERE ({colunas}) < ({marcadores})'
+        params += antes
+        ordem = ', '.join(f'{c} DESC' for c in chave)
+    elif apos is not None:
+        condicao = f'WHERE ({colunas}) > ({marcadores})'
+        params += apos
+        ordem = colunas
+    else:
+        condicao = ''
+        ordem = colunas
+
+    # Busca um a mais só para saber se existe outra página naquela direção
+    consulta = f'SELECT * FROM ({sql}) {condicao} ORDER BY {ordem} LIMIT ?'
+    alunos = conn.execute(consulta, params + (limite + 1,)).fetchall()
+    tem_mais = len(alunos) > limite
+    alunos = alunos[:limite]
+    if antes is not None:
+        alunos.reverse()
+
+    if not alunos:
+        return alunos, None, None
+
+    if antes is not None:
+        proximo = gerar_token(alunos[-1], chave)
+        anterior = gerar_token(alunos[0], chave) if tem_mais else None
+    else:
+        proximo = gerar_token(alunos[-1], chave) if tem_mais else None
+        anterior = gerar_token(alunos[0], chave) if apos is not None else None
+    return alunos, proximo, anterior
+
+
+@bp.route('/')
 def index():
     search_term = request.args.get('search', '').strip()
-    conn = get_db_connection()
-    
-    if search_term:
-        alunos = conn.execute(
-            'SELECT * FROM alunos WHERE nome LIKE ? OR email LIKE ? OR curso LIKE ?',
-            (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%')
-        ).fetchall()
-    else:
-        alunos = conn.execute('SELECT * FROM alunos').fetchall()
-    
-    conn.close()
-    return render_template('index.html', alunos=alunos, search_term=search_term)
+    conn = get_db_leitura()
+    versao, atualizado_em = versao_tabela(conn)
+    resposta = nao_modificado(versao, atualizado_em)
+    if resposta:
+        return resposta
+    urls = urls_aluno()
+    selecionar = current_user.is_authenticated and current_user.is_admin
+
+    # ?stream=1 renderiza a lista inteira aos poucos, direto do cursor,
+    # sem carregar tudo em memória (útil para exportar a lista completa)
+    if request.args.get('stream'):
+        sql, params, chave = consulta_alunos(conn, search_term)
+        alunos = conn.execute(f'{sql} ORDER BY {", ".join(chave)}', params)
+        return stream_template('index.html', alunos=alunos, linhas=None, urls=urls,
+                               selecionar=selecionar, search_term=search_term,
+                               proximo=None, anterior=None, limite=None)
+
+    limite = request.args.get('limite', current_app.config['ALUNOS_POR_PAGINA'], type=int)
+    limite = max(1, min(limite, current_app.config['ALUNOS_POR_PAGINA_MAX']))
+    apos = request.args.get('apos')
+    antes = request.args.get('antes')
+
+    def gerar():
+        alunos, proximo, anterior = buscar_pagina(conn, versao, search_term, apos, antes, limite)
+        linhas = render_template('_linhas_alunos.html', alunos=alunos, urls=urls,
+                                 selecionar=selecionar)
+        return Markup(linhas), proximo, anterior
+
+    # Em acerto nem a consulta de alunos roda
+    chave_cache = None if versao is None else (
+        'index', versao, search_term, fts_ativo(conn), limite, apos, antes, request.script_root,
+        selecionar)
+    linhas, proximo, anterior = fragmento(chave_cache, gerar)
+    return render_template('index.html', linhas=linhas, urls=urls, selecionar=selecionar,
+                           search_term=search_term, proximo=proximo, anterior=anterior,
+                           limite=limite)
+
+
+
+@bp.route('/exportar')
+@login_required
+def exportar():
+    # Dump completo (ou filtrado pela mesma busca do index) em CSV/JSONL,
+    # transmitido direto do cursor
+    formato = request.args.get('formato', 'csv')
+    if formato not in GERADORES:
+        abort(400)
+    search_term = request.args.get('search', '').strip()
+    gzip = bool(request.args.get('gzip'))
+
+    dados = exportar_alunos(get_db_leitura(), formato, search_term, gzip)
+    nome_arquivo = f'alunos.{formato}' + ('.gz' if gzip else '')
+    headers = {'Content-Disposition': f'attachment; filename={nome_arquivo}'}
+    mimetype = 'application/gzip' if gzip else MIMETYPES[formato]
+    return Response(stream_with_context(dados), mimetype=mimetype, headers=headers)
 
 
 
 # Rota para visualizar detalhes de um aluno
-@app.route('/<int:id>')
+@bp.route('/<int:id>')
 def ver_aluno(id):
-    conn = get_db_connection()
+    conn = get_db_leitura()
+    resposta = nao_modificado(*versao_aluno(conn, id))
+    if resposta:
+        return resposta
     aluno = conn.execute('SELECT * FROM alunos WHERE id = ?', (id,)).fetchone()
-    conn.close()
     if aluno is None:
         abort(404)
     return render_template('ver.html', aluno=aluno)
@@ -167,56 +995,56 @@ def ver_aluno(id):
 
 
 # ----------------------------------------------------- Rota CRUDs  aluno
-@app.route('/adicionar', methods=('GET', 'POST'))
+@bp.route('/adicionar', methods=('GET', 'POST'))
 @login_required
 def adicionar():
     if request.method == 'POST':
-        nome = request.form['nome']
-        email = request.form['email']
-        telefone = request.form['telefone']
-        curso = request.form['curso']
+        campos = validar(request.form)
 
-        if not nome or not email:
+        if campos is None:
             flash('Nome e email são obrigatórios!')
         else:
-            conn = get_db_connection()
-            conn.execute('INSERT INTO alunos (nome, email, telefone, curso) VALUES (?, ?, ?, ?)',
-                         (nome, email, telefone, curso))
-            conn.commit()
-            conn.close()
-            flash('Aluno adicionado com sucesso!')
-            return redirect(url_for('index'))
+            try:
+                executar_escrita(lambda conn: conn.execute(
+                    'INSERT INTO alunos (nome, email, telefone, curso) VALUES (?, ?, ?, ?)',
+                    campos))
+            except sqlite3.IntegrityError:
+                flash('Já existe um aluno com este email!')
+            else:
+                invalidar_fragmentos()
+                flash('Aluno adicionado com sucesso!')
+                return redirect(url_for('.index'))
 
     return render_template('adicionar.html')
 
 
-@app.route('/<int:id>/editar', methods=('GET', 'POST'))
+@bp.route('/<int:id>/editar', methods=('GET', 'POST'))
 @login_required
 def editar(id):
     conn = get_db_connection()
     aluno = conn.execute('SELECT * FROM alunos WHERE id = ?', (id,)).fetchone()
 
     if request.method == 'POST':
-        nome = request.form['nome']
-        email = request.form['email']
-        telefone = request.form['telefone']
-        curso = request.form['curso']
+        campos = validar(request.form)
 
-        if not nome or not email:
+        if campos is None:
             flash('Nome e email são obrigatórios!')
         else:
-            conn.execute('UPDATE alunos SET nome = ?, email = ?, telefone = ?, curso = ? WHERE id = ?',
-                        (nome, email, telefone, curso, id))
-            conn.commit()
-            conn.close()
-            flash('Aluno atualizado com sucesso!')
-            return redirect(url_for('index'))
-
-    conn.close()
+            try:
+                executar_escrita(lambda conn: conn.execute(
+                    'UPDATE alunos SET nome = ?, email = ?, telefone = ?, curso = ? WHERE id = ?',
+                    campos + (id,)))
+            except sqlite3.IntegrityError:
+                flash('Já existe um aluno com este email!')
+            else:
+                invalidar_fragmentos()
+                flash('Aluno atualizado com sucesso!')
+                return redirect(url_for('.index'))
+
     return render_template('editar.html', aluno=aluno)
 
 
-@app.route('/<int:id>/deletar', methods=('POST',))
+@bp.route('/<int:id>/deletar', methods=('POST',))
 @login_required
 def deletar(id):
     if not current_user.is_admin:
@@ -225,256 +1053,742 @@ def deletar(id):
     aluno = conn.execute('SELECT * FROM alunos WHERE id = ?', (id,)).fetchone()
     if aluno is None:
         abort(404)
-    conn.execute('DELETE FROM alunos WHERE id = ?', (id,))
-    conn.commit()
-    conn.close()
+    executar_escrita(lambda conn: conn.execute('DELETE FROM alunos WHERE id = ?', (id,)))
+    invalidar_fragmentos()
     flash('Aluno deletado com sucesso!')
-    return redirect(url_for('index'))
+    return redirect(url_for('.index'))
+
+
+# Campos que a edição em lote pode sobrescrever; nome e email são por aluno
+CAMPOS_LOTE = ('curso', 'telefone')
+
+@bp.route('/lote', methods=('POST',))
+@login_required
+def acao_lote():
+    # Ações sobre os alunos marcados no index, todas numa transação só:
+    #   deletar  remove os ids
+    #   curso    troca o curso (vazio = sem curso)
+    #   editar   sobrescreve os CAMPOS_LOTE preenchidos no formulário
+    if not current_user.is_admin:
+        abort(403)
+    acao = request.form.get('acao')
+    ids = sorted(set(request.form.getlist('ids', type=int)))
+    voltar = url_for('.index', search=request.form.get('search') or None)
+    if not ids:
+        flash('Selecione ao menos um aluno!')
+        return redirect(voltar)
+    if len(ids) > current_app.config['API_BATCH_MAX']:
+        abort(413)
+
+    if acao == 'deletar':
+        sql, valores = 'DELETE FROM alunos WHERE id = ?', ()
+    elif acao == 'curso':
+        sql, valores = 'UPDATE alunos SET curso = ? WHERE id = ?', (request.form.get('curso', '').strip() or None,)
+    elif acao == 'editar':
+        campos = {campo: request.form.get(campo, '').strip() for campo in CAMPOS_LOTE}
+        campos = {campo: valor for campo, valor in campos.items() if valor}
+        if not campos:
+            flash('Preencha ao menos um campo para alterar!')
+            return redirect(voltar)
+        atribuicoes = ', '.join(f'{campo} = ?' for campo in campos)
+        sql, valores = f'UPDATE alunos SET {atribuicoes} WHERE id = ?', tuple(campos.values())
+    else:
+        abort(400)
+
+    afetados = executar_escrita(
+        lambda conn: conn.executemany(sql, [valores + (id,) for id in ids]).rowcount)
+    if afetados:
+        invalidar_fragmentos()
+    if quer_json():
+        return jsonify(acao=acao, solicitados=len(ids), afetados=afetados)
+    verbo = 'deletados' if acao == 'deletar' else 'atualizados'
+    flash(f'{afetados} de {len(ids)} alunos {verbo}.')
+    return redirect(voltar)
+
+
+@bp.route('/importar', methods=('GET', 'POST'))
+@login_required
+def importar():
+    if not current_user.is_admin:
+        abort(403)
+    if request.method == 'POST':
+        arquivo = request.files.get('arquivo')
+        if not arquivo or not arquivo.filename:
+            flash('Selecione um arquivo CSV ou JSONL!')
+        else:
+            # O arquivo vai para disco e a importação roda na fila de tarefas
+            formato = formato_do_arquivo(arquivo.filename)
+            fd, caminho = tempfile.mkstemp(suffix=f'.{formato}', dir=pasta_tarefas())
+            with os.fdopen(fd, 'wb') as destino:
+                arquivo.save(destino)
+            id = enfileirar_tarefa('importar', {
+                'caminho': caminho,
+                'nome': arquivo.filename,
+                'formato': formato,
+                'retomar': bool(request.form.get('retomar')),
+            })
+            return responder_tarefa(id, f'Importação de {arquivo.filename} enfileirada.')
+
+    return render_template('importar.html')
 
 # ----------------------------------------------------- END Rota CRUDs  aluno
 
 
-@app.route('/estatisticas')
+@bp.route('/estatisticas')
 def estatisticas():
-    conn = get_db_connection()
-    
-    # Obtém contagem de alunos por curso
-    cursos = conn.execute('''
-        SELECT curso, COUNT(*) as total 
-        FROM alunos 
-        GROUP BY curso 
-        ORDER BY total DESC
-    ''').fetchall()
-    
-    conn.close()
-    
-    # Prepara os dados para o gráfico
-    labels = [curso['curso'] if curso['curso'] else 'Não informado' for curso in cursos]
-    valores = [curso['total'] for curso in cursos]
-    
-    return render_template('estatisticas.html', 
-                        labels=labels, 
-                        valores=valores,
-                        total_alunos=sum(valores))
+    conn = get_db_leitura()
+    versao, atualizado_em = versao_tabela(conn)
+    resposta = nao_modificado(versao, atualizado_em)
+    if resposta:
+        return resposta
 
+    def gerar():
+        # Contagem por curso já agregada em curso_stats (ver resumo_cursos.py)
+        cursos = conn.execute('''
+            SELECT curso, total
+            FROM curso_stats
+            WHERE total > 0
+            ORDER BY total DESC
+        ''').fetchall()
 
-def popular_banco_dados():
-    conn = get_db_connection()
-    
-    # Cria a tabela se não existir
-    conn.execute('''
-    CREATE TABLE IF NOT EXISTS alunos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nome TEXT NOT NULL,
-        email TEXT NOT NULL,
-        telefone TEXT,
-        curso TEXT,
-        criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        # Prepara os dados para o gráfico e o resumo
+        labels = [curso['curso'] if curso['curso'] else 'Não informado' for curso in cursos]
+        valores = [curso['total'] for curso in cursos]
+        resumo = render_template('_resumo_cursos.html', labels=labels, valores=valores,
+                                 total_alunos=sum(valores))
+        return Markup(resumo), labels, valores
+
+    chave_cache = None if versao is None else ('estatisticas', versao)
+    resumo, labels, valores = fragmento(chave_cache, gerar)
+    return render_template('estatisticas.html',
+                        resumo=resumo,
+                        labels=labels,
+                        valores=valores)
+
+
+# -------------------------------------------------------- API JSON de alunos
+# Mesmas regras das rotas HTML: leitura livre, escrita com login, remoção só
+# para admin, validação de importar.validar. As rotas /lote aplicam N
+# alterações numa transação só (um savepoint por item) e devolvem o
+# resultado de cada item; um item com erro não desfaz os outros.
+
+api = Blueprint('api', __name__, url_prefix='/api/alunos')
+
+ERRO_OBRIGATORIOS = 'Nome e email são obrigatórios!'
+ERRO_EMAIL_DUPLICADO = 'Já existe um aluno com este email!'
+
+@api.errorhandler(HTTPException)
+def erro_api(erro):
+    return jsonify(erro=erro.description), erro.code
+
+def aluno_json(aluno):
+    return {coluna: aluno[coluna] for coluna in COLUNAS}
+
+def corpo_json():
+    dados = request.get_json(silent=True)
+    if dados is None:
+        abort(400, 'Corpo JSON inválido.')
+    return dados
+
+def itens_do_lote(chave):
+    # Aceita uma lista ou {"<chave>": [...]}
+    dados = corpo_json()
+    if isinstance(dados, dict):
+        dados = dados.get(chave)
+    if not isinstance(dados, list):
+        abort(400, f'Esperada uma lista em "{chave}".')
+    if len(dados) > current_app.config['API_BATCH_MAX']:
+        abort(413, f"No máximo {current_app.config['API_BATCH_MAX']} itens por lote.")
+    return dados
+
+def inserir_aluno(conn, dados):
+    campos = validar(dados)
+    if campos is None:
+        return 400, {'erro': ERRO_OBRIGATORIOS}
+    cursor = conn.execute('INSERT INTO alunos (nome, email, telefone, curso) VALUES (?, ?, ?, ?)',
+                          campos)
+    aluno = conn.execute('SELECT * FROM alunos WHERE id = ?', (cursor.lastrowid,)).fetchone()
+    return 201, {'aluno': aluno_json(aluno)}
+
+def atualizar_aluno(conn, id, dados):
+    campos = validar(dados)
+    if campos is None:
+        return 400, {'erro': ERRO_OBRIGATORIOS}
+    cursor = conn.execute(
+        'UPDATE alunos SET nome = ?, email = ?, telefone = ?, curso = ? WHERE id = ?',
+        campos + (id,))
+    if not cursor.rowcount:
+        return 404, {'erro': 'Aluno não encontrado.'}
+    aluno = conn.execute('SELECT * FROM alunos WHERE id = ?', (id,)).fetchone()
+    return 200, {'aluno': aluno_json(aluno)}
+
+def remover_aluno(conn, id):
+    cursor = conn.execute('DELETE FROM alunos WHERE id = ?', (id,))
+    if not cursor.rowcount:
+        return 404, {'erro': 'Aluno não encontrado.'}
+    return 200, {'id': id}
+
+def aplicar_item(conn, operacao, *args):
+    # Savepoint por item: email duplicado ou campo inválido desfaz só este item
+    conn.execute('SAVEPOINT item_api')
+    try:
+        status, corpo = operacao(conn, *args)
+    except CampoInvalido as erro:
+        conn.execute('ROLLBACK TO item_api')
+        status, corpo = 400, {'erro': str(erro)}
+    except sqlite3.IntegrityError:
+        conn.execute('ROLLBACK TO item_api')
+        status, corpo = 409, {'erro': ERRO_EMAIL_DUPLICADO}
+    conn.execute('RELEASE item_api')
+    return status, corpo
+
+def responder_item(operacao, *args):
+    status, corpo = executar_escrita(lambda conn: aplicar_item(conn, operacao, *args))
+    if status < 300:
+        invalidar_fragmentos()
+    return jsonify(corpo), status
+
+def responder_lote(operacoes):
+    # operacoes: lista de (operacao, args) já validada quanto ao formato
+    def aplicar(conn):
+        return [aplicar_item(conn, operacao, *args) for operacao, args in operacoes]
+
+    resultados = executar_escrita(aplicar) if operacoes else []
+    if any(status < 300 for status, _ in resultados):
+        invalidar_fragmentos()
+    itens = [{'indice': indice, 'status': status, **corpo}
+             for indice, (status, corpo) in enumerate(resultados)]
+    return jsonify(
+        resultados=itens,
+        sucesso=sum(1 for item in itens if item['status'] < 300),
+        falhas=sum(1 for item in itens if item['status'] >= 300),
     )
-    ''')
-    
-    # if table == null or table == 0 
-    count = conn.execute('SELECT COUNT(*) FROM alunos').fetchone()[0]
-    
-    if count == 0:
-        estudantes = [
-            ('João Silva', 'joao.silva@email.com', '(11) 98765-4321', 'Engenharia de Software'),
-            ('Maria Oliveira', 'maria.oliveira@email.com', '(11) 98765-4322', 'Ciência da Computação'),
-            ('Carlos Souza', 'carlos.souza@email.com', '(11) 98765-4323', 'Sistemas de Informação'),
-            ('Ana Costa', 'ana.costa@email.com', '(11) 98765-4324', 'Engenharia da Computação'),
-            ('Pedro Santos', 'pedro.santos@email.com', '(11) 98765-4325', 'Análise de Sistemas'),
-            ('Juliana Pereira', 'juliana.pereira@email.com', '(11) 98765-4326', 'Engenharia de Software'),
-            ('Marcos Lima', 'marcos.lima@email.com', '(11) 98765-4327', 'Ciência da Computação'),
-            ('Fernanda Rocha', 'fernanda.rocha@email.com', '(11) 98765-4328', 'Sistemas de Informação'),
-            ('Ricardo Alves', 'ricardo.alves@email.com', '(11) 98765-4329', 'Engenharia da Computação'),
-            ('Patrícia Gomes', 'patricia.gomes@email.com', '(11) 98765-4330', 'Análise de Sistemas'),
-            ('Lucas Martins', 'lucas.martins@email.com', '(11) 98765-4331', 'Engenharia de Software'),
-            ('Amanda Barbosa', 'amanda.barbosa@email.com', '(11) 98765-4332', 'Ciência da Computação'),
-            ('Gustavo Ferreira', 'gustavo.ferreira@email.com', '(11) 98765-4333', 'Sistemas de Informação'),
-            ('Isabela Ribeiro', 'isabela.ribeiro@email.com', '(11) 98765-4334', 'Engenharia da Computação'),
-            ('Roberto Carvalho', 'roberto.carvalho@email.com', '(11) 98765-4335', 'Análise de Sistemas'),
-            ('Tatiane Nunes', 'tatiane.nunes@email.com', '(11) 98765-4336', 'Engenharia de Software'),
-            ('Felipe Cunha', 'felipe.cunha@email.com', '(11) 98765-4337', 'Ciência da Computação'),
-            ('Vanessa Dias', 'vanessa.dias@email.com', '(11) 98765-4338', 'Sistemas de Informação'),
-            ('Eduardo Mendes', 'eduardo.mendes@email.com', '(11) 98765-4339', 'Engenharia da Computação'),
-            ('Laura Moreira', 'laura.moreira@email.com', '(11) 98765-4340', 'Análise de Sistemas'),
-            ('Rodrigo Cardoso', 'rodrigo.cardoso@email.com', '(11) 98765-4341', 'Engenharia de Software'),
-            ('Beatriz Xavier', 'beatriz.xavier@email.com', '(11) 98765-4342', 'Ciência da Computação'),
-            ('Daniel Teixeira', 'daniel.teixeira@email.com', '(11) 98765-4343', 'Sistemas de Informação'),
-            ('Camila Andrade', 'camila.andrade@email.com', '(11) 98765-4344', 'Engenharia da Computação'),
-            ('Marcelo Castro', 'marcelo.castro@email.com', '(11) 98765-4345', 'Análise de Sistemas'),
-            ('Renata Duarte', 'renata.duarte@email.com', '(11) 98765-4346', 'Engenharia de Software'),
-            ('Alexandre Fonseca', 'alexandre.fonseca@email.com', '(11) 98765-4347', 'Ciência da Computação'),
-            ('Simone Guimarães', 'simone.guimaraes@email.com', '(11) 98765-4348', 'Sistemas de Informação'),
-            ('Hugo Lopes', 'hugo.lopes@email.com', '(11) 98765-4349', 'Engenharia da Computação'),
-            ('Elaine Macedo', 'elaine.macedo@email.com', '(11) 98765-4350', 'Análise de Sistemas'),
-            ('André Neves', 'andre.neves@email.com', '(11) 98765-4351', 'Engenharia de Software'),
-            ('Cristina Pires', 'cristina.pires@email.com', '(11) 98765-4352', 'Ciência da Computação'),
-            ('Sérgio Queiroz', 'sergio.queiroz@email.com', '(11) 98765-4353', 'Sistemas de Informação'),
-            ('Larissa Ramos', 'larissa.ramos@email.com', '(11) 98765-4354', 'Engenharia da Computação'),
-            ('Paulo Soares', 'paulo.soares@email.com', '(11) 98765-4355', 'Análise de Sistemas'),
-            ('Mônica Torres', 'monica.torres@email.com', '(11) 98765-4356', 'Engenharia de Software'),
-            ('Rafael Uchôa', 'rafael.uchoa@email.com', '(11) 98765-4357', 'Ciência da Computação'),
-            ('Viviane Vasconcelos', 'viviane.vasconcelos@email.com', '(11) 98765-4358', 'Sistemas de Informação'),
-            ('Diego Wernick', 'diego.wernick@email.com', '(11) 98765-4359', 'Engenharia da Computação'),
-            ('Helena Yamasaki', 'helena.yamasaki@email.com', '(11) 98765-4360', 'Análise de Sistemas'),
-            ('Bruno Zanetti', 'bruno.zanetti@email.com', '(11) 98765-4361', 'Engenharia de Software'),
-            ('Adriana Albuquerque', 'adriana.albuquerque@email.com', '(11) 98765-4362', 'Ciência da Computação'),
-            ('Otávio Brito', 'otavio.brito@email.com', '(11) 98765-4363', 'Sistemas de Informação'),
-            ('Natália Correia', 'natalia.correia@email.com', '(11) 98765-4364', 'Engenharia da Computação'),
-            ('Leonardo Dantas', 'leonardo.dantas@email.com', '(11) 98765-4365', 'Análise de Sistemas'),
-            ('Débora Esteves', 'debora.esteves@email.com', '(11) 98765-4366', 'Engenharia de Software'),
-            ('Fábio Fontes', 'fabio.fontes@email.com', '(11) 98765-4367', 'Ciência da Computação'),
-            ('Gabriela Guedes', 'gabriela.guedes@email.com', '(11) 98765-4368', 'Sistemas de Informação'),
-            ('Igor Holanda', 'igor.holanda@email.com', '(11) 98765-4369', 'Engenharia da Computação'),
-            ('Jéssica Ilha', 'jessica.ilha@email.com', '(11) 98765-4370', 'Análise de Sistemas'),
-            ('Thiago Azevedo', 'thiago.azevedo@email.com', '(11) 98765-4371', 'Engenharia de Software'),
-            ('Melissa Cardoso', 'melissa.cardoso@email.com', '(11) 98765-4372', 'Ciência da Computação'),
-            ('Cláudio Batista', 'claudio.batista@email.com', '(11) 98765-4373', 'Sistemas de Informação'),
-            ('Priscila Farias', 'priscila.farias@email.com', '(11) 98765-4374', 'Engenharia da Computação'),
-            ('Vitor Nogueira', 'vitor.nogueira@email.com', '(11) 98765-4375', 'Análise de Sistemas'),
-            ('Carolina Teles', 'carolina.teles@email.com', '(11) 98765-4376', 'Engenharia de Software'),
-            ('Rogério Peixoto', 'rogerio.peixoto@email.com', '(11) 98765-4377', 'Ciência da Computação'),
-            ('Tatiana Braga', 'tatiana.braga@email.com', '(11) 98765-4378', 'Sistemas de Informação'),
-            ('Márcio Correia', 'marcio.correia@email.com', '(11) 98765-4379', 'Engenharia da Computação'),
-            ('Clara Martins', 'clara.martins@email.com', '(11) 98765-4380', 'Análise de Sistemas'),
-            ('Henrique Duarte', 'henrique.duarte@email.com', '(11) 98765-4381', 'Engenharia de Software'),
-            ('Aline Ferreira', 'aline.ferreira@email.com', '(11) 98765-4382', 'Ciência da Computação'),
-            ('Samuel Barros', 'samuel.barros@email.com', '(11) 98765-4383', 'Sistemas de Informação'),
-            ('Mirela Rocha', 'mirela.rocha@email.com', '(11) 98765-4384', 'Engenharia da Computação'),
-            ('Edson Lima', 'edson.lima@email.com', '(11) 98765-4385', 'Análise de Sistemas'),
-            ('Paula Menezes', 'paula.menezes@email.com', '(11) 98765-4386', 'Engenharia de Software'),
-            ('Luiz Fernando', 'luiz.fernando@email.com', '(11) 98765-4387', 'Ciência da Computação'),
-            ('Célia Ramos', 'celia.ramos@email.com', '(11) 98765-4388', 'Sistemas de Informação'),
-            ('Jonas Carvalho', 'jonas.carvalho@email.com', '(11) 98765-4389', 'Engenharia da Computação'),
-            ('Bianca Moraes', 'bianca.moraes@email.com', '(11) 98765-4390', 'Análise de Sistemas'),
-            ('Fernando Silveira', 'fernando.silveira@email.com', '(11) 98765-4391', 'Engenharia de Software'),
-            ('Patrícia Lemos', 'patricia.lemos@email.com', '(11) 98765-4392', 'Ciência da Computação'),
-            ('Rafael Duarte', 'rafael.duarte2@email.com', '(11) 98765-4393', 'Sistemas de Informação'),
-            ('Isis Moreira', 'isis.moreira@email.com', '(11) 98765-4394', 'Engenharia da Computação'),
-            ('Marcela Pacheco', 'marcela.pacheco@email.com', '(11) 98765-4395', 'Análise de Sistemas'),
-            ('Caio Figueiredo', 'caio.figueiredo@email.com', '(11) 98765-4396', 'Engenharia de Software'),
-            ('Tatiane Araújo', 'tatiane.araujo@email.com', '(11) 98765-4397', 'Ciência da Computação'),
-            ('Rodrigo Cunha', 'rodrigo.cunha@email.com', '(11) 98765-4398', 'Sistemas de Informação'),
-            ('Daniela Torres', 'daniela.torres@email.com', '(11) 98765-4399', 'Engenharia da Computação'),
-            ('Maurício Sales', 'mauricio.sales@email.com', '(11) 98765-4400', 'Análise de Sistemas'),
-            ('Vivian Matos', 'vivian.matos@email.com', '(11) 98765-4401', 'Engenharia de Software'),
-            ('Guilherme Paiva', 'guilherme.paiva@email.com', '(11) 98765-4402', 'Ciência da Computação'),
-            ('Luciana Vieira', 'luciana.vieira@email.com', '(11) 98765-4403', 'Sistemas de Informação'),
-            ('Rodrigo Farias', 'rodrigo.farias@email.com', '(11) 98765-4404', 'Engenharia da Computação'),
-            ('Vanessa Tavares', 'vanessa.tavares@email.com', '(11) 98765-4405', 'Análise de Sistemas'),
-            ('Douglas Nunes', 'douglas.nunes@email.com', '(11) 98765-4406', 'Engenharia de Software'),
-            ('Carla Mendes', 'carla.mendes@email.com', '(11) 98765-4407', 'Ciência da Computação'),
-            ('Jorge Peixoto', 'jorge.peixoto@email.com', '(11) 98765-4408', 'Sistemas de Informação'),
-            ('Beny Basaula Kiamvu II', 'itsbenyreis@outlook.com', '(00244) 922959709', 'Sistemas de Informação'),
-            ('Lorena Azevedo', 'lorena.azevedo@email.com', '(11) 98765-4409', 'Engenharia da Computação'),
-            ('Fábio Santos', 'fabio.santos@email.com', '(11) 98765-4410', 'Análise de Sistemas'),
-            ('Érica Lima', 'erica.lima@email.com', '(11) 98765-4411', 'Engenharia de Software'),
-            ('Bruno Nascimento', 'bruno.nascimento@email.com', '(11) 98765-4412', 'Ciência da Computação'),
-            ('Sofia Correia', 'sofia.correia@email.com', '(11) 98765-4413', 'Sistemas de Informação'),
-            ('Matheus Rocha', 'matheus.rocha@email.com', '(11) 98765-4414', 'Engenharia da Computação'),
-            ('Caroline Teixeira', 'caroline.teixeira@email.com', '(11) 98765-4415', 'Análise de Sistemas'),
-            ('Rogério Lima', 'rogerio.lima@email.com', '(11) 98765-4416', 'Engenharia de Software'),
-            ('Fernanda Duarte', 'fernanda.duarte@email.com', '(11) 98765-4417', 'Ciência da Computação'),
-            ('Diego Almeida', 'diego.almeida@email.com', '(11) 98765-4418', 'Sistemas de Informação'),
-            ('Natália Farias', 'natalia.farias@email.com', '(11) 98765-4419', 'Engenharia da Computação'),
-            ('Vinícius Oliveira', 'vinicius.oliveira@email.com', '(11) 98765-4420', 'Análise de Sistemas'),
-            ('Andressa Melo', 'andressa.melo@email.com', '(11) 98765-4421', 'Engenharia de Software'),
-            ('Rodrigo Neves', 'rodrigo.neves@email.com', '(11) 98765-4422', 'Ciência da Computação'),
-            ('Camila Barbosa', 'camila.barbosa@email.com', '(11) 98765-4423', 'Sistemas de Informação'),
-            ('Igor Batista', 'igor.batista@email.com', '(11) 98765-4424', 'Engenharia da Computação'),
-            ('Lívia Torres', 'livia.torres@email.com', '(11) 98765-4425', 'Análise de Sistemas'),
-            ('Sérgio Pinto', 'sergio.pinto@email.com', '(11) 98765-4426', 'Engenharia de Software'),
-            ('Juliana Costa', 'juliana.costa@email.com', '(11) 98765-4427', 'Ciência da Computação'),
-            ('Otávio Gomes', 'otavio.gomes@email.com', '(11) 98765-4428', 'Sistemas de Informação'),
-            ('Amanda Figueiredo', 'amanda.figueiredo@email.com', '(11) 98765-4429', 'Engenharia da Computação'),
-            ('Ricardo Barbosa', 'ricardo.barbosa@email.com', '(11) 98765-4430', 'Análise de Sistemas'),
-            ('Helena Ribeiro', 'helena.ribeiro@email.com', '(11) 98765-4431', 'Engenharia de Software'),
-            ('César Albuquerque', 'cesar.albuquerque@email.com', '(11) 98765-4432', 'Ciência da Computação'),
-            ('Jéssica Moura', 'jessica.moura@email.com', '(11) 98765-4433', 'Sistemas de Informação'),
-            ('Felipe Azevedo', 'felipe.azevedo@email.com', '(11) 98765-4434', 'Engenharia da Computação'),
-            ('Patrícia Rocha', 'patricia.rocha@email.com', '(11) 98765-4435', 'Análise de Sistemas'),
-            ('Gabriel Vieira', 'gabriel.vieira@email.com', '(11) 98765-4436', 'Engenharia de Software'),
-            ('Larissa Martins', 'larissa.martins@email.com', '(11) 98765-4437', 'Ciência da Computação'),
-            ('Eduardo Lopes', 'eduardo.lopes@email.com', '(11) 98765-4438', 'Sistemas de Informação'),
-            ('Manuela Fernandes', 'manuela.fernandes@email.com', '(11) 98765-4439', 'Engenharia da Computação'),
-            ('Rafael Cardoso', 'rafael.cardoso@email.com', '(11) 98765-4440', 'Análise de Sistemas'),
-            ('Luana Pires', 'luana.pires@email.com', '(11) 98765-4441', 'Engenharia de Software'),
-            ('Pedro Barbosa', 'pedro.barbosa@email.com', '(11) 98765-4442', 'Ciência da Computação'),
-            ('Juliana Rezende', 'juliana.rezende@email.com', '(11) 98765-4443', 'Sistemas de Informação'),
-            ('Carlos Eduardo', 'carlos.eduardo@email.com', '(11) 98765-4444', 'Engenharia da Computação'),
-            ('Raquel Nogueira', 'raquel.nogueira@email.com', '(11) 98765-4445', 'Análise de Sistemas'),
-            ('André Tavares', 'andre.tavares@email.com', '(11) 98765-4446', 'Engenharia de Software'),
-            ('Tatiana Gomes', 'tatiana.gomes@email.com', '(11) 98765-4447', 'Ciência da Computação'),
-            ('Leonardo Rocha', 'leonardo.rocha@email.com', '(11) 98765-4448', 'Sistemas de Informação'),
-            ('Vanessa Duarte', 'vanessa.duarte@email.com', '(11) 98765-4449', 'Engenharia da Computação'),
-            ('Gustavo Barros', 'gustavo.barros@email.com', '(11) 98765-4450', 'Análise de Sistemas'),
-            ('Cláudia Ribeiro', 'claudia.ribeiro@email.com', '(11) 98765-4451', 'Engenharia de Software'),
-            ('Thiago Martins', 'thiago.martins@email.com', '(11) 98765-4452', 'Ciência da Computação'),
-            ('Carolina Souza', 'carolina.souza@email.com', '(11) 98765-4453', 'Sistemas de Informação'),
-            ('João Pedro', 'joao.pedro@email.com', '(11) 98765-4454', 'Engenharia da Computação'),
-            ('Marcela Duarte', 'marcela.duarte@email.com', '(11) 98765-4455', 'Análise de Sistemas'),
-            ('Eduardo Almeida', 'eduardo.almeida2@email.com', '(11) 98765-4456', 'Engenharia de Software'),
-            ('Sabrina Lopes', 'sabrina.lopes@email.com', '(11) 98765-4457', 'Ciência da Computação'),
-            ('Rafael Mendes', 'rafael.mendes@email.com', '(11) 98765-4458', 'Sistemas de Informação'),
-            ('Bianca Oliveira', 'bianca.oliveira@email.com', '(11) 98765-4459', 'Engenharia da Computação'),
-            ('Anderson Teixeira', 'anderson.teixeira@email.com', '(11) 98765-4460', 'Análise de Sistemas'),
-            ('Mônica Fernandes', 'monica.fernandes@email.com', '(11) 98765-4461', 'Engenharia de Software'),
-            ('Paulo Henrique', 'paulo.henrique@email.com', '(11) 98765-4462', 'Ciência da Computação'),
-            ('Cristiane Matos', 'cristiane.matos@email.com', '(11) 98765-4463', 'Sistemas de Informação'),
-            ('Mateus Nogueira', 'mateus.nogueira@email.com', '(11) 98765-4464', 'Engenharia da Computação'),
-            ('Suelen Barros', 'suelen.barros@email.com', '(11) 98765-4465', 'Análise de Sistemas'),
-            ('Renato Pires', 'renato.pires@email.com', '(11) 98765-4466', 'Engenharia de Software'),
-            ('Amanda Carvalho', 'amanda.carvalho@email.com', '(11) 98765-4467', 'Ciência da Computação'),
-            ('Felipe Silva', 'felipe.silva@email.com', '(11) 98765-4468', 'Sistemas de Informação'),
-            ('Camila Ribeiro', 'camila.ribeiro@email.com', '(11) 98765-4469', 'Engenharia da Computação'),
-            ('Luciano Moraes', 'luciano.moraes@email.com', '(11) 98765-4470', 'Análise de Sistemas'),
-            ('Juliana Alves', 'juliana.alves@email.com', '(11) 98765-4471', 'Engenharia de Software'),
-            ('Bruno Fernandes', 'bruno.fernandes@email.com', '(11) 98765-4472', 'Ciência da Computação'),
-            ('Patrícia Mendes', 'patricia.mendes@email.com', '(11) 98765-4473', 'Sistemas de Informação'),
-            ('Rodrigo Oliveira', 'rodrigo.oliveira@email.com', '(11) 98765-4474', 'Engenharia da Computação'),
-            ('Camila Duarte', 'camila.duarte@email.com', '(11) 98765-4475', 'Análise de Sistemas'),
-            ('Guilherme Souza', 'guilherme.souza@email.com', '(11) 98765-4476', 'Engenharia de Software'),
-            ('Larissa Lima', 'larissa.lima@email.com', '(11) 98765-4477', 'Ciência da Computação'),
-            ('André Barbosa', 'andre.barbosa@email.com', '(11) 98765-4478', 'Sistemas de Informação'),
-            ('Fernanda Pires', 'fernanda.pires@email.com', '(11) 98765-4479', 'Engenharia da Computação'),
-            ('Rafael Batista', 'rafael.batista@email.com', '(11) 98765-4480', 'Análise de Sistemas'),
-            ('Isabela Ferreira', 'isabela.ferreira@email.com', '(11) 98765-4481', 'Engenharia de Software'),
-            ('Marcelo Gomes', 'marcelo.gomes@email.com', '(11) 98765-4482', 'Ciência da Computação'),
-            ('Priscila Rocha', 'priscila.rocha@email.com', '(11) 98765-4483', 'Sistemas de Informação'),
-            ('José Carlos', 'jose.carlos@email.com', '(11) 98765-4484', 'Engenharia da Computação'),
-            ('Débora Lima', 'debora.lima@email.com', '(11) 98765-4485', 'Análise de Sistemas'),
-            ('Tiago Ribeiro', 'tiago.ribeiro@email.com', '(11) 98765-4486', 'Engenharia de Software'),
-            ('Cristina Duarte', 'cristina.duarte@email.com', '(11) 98765-4487', 'Ciência da Computação'),
-            ('Alexandre Silva', 'alexandre.silva@email.com', '(11) 98765-4488', 'Sistemas de Informação'),
-            ('Tatiane Moreira', 'tatiane.moreira@email.com', '(11) 98765-4489', 'Engenharia da Computação'),
-            ('Paula Almeida', 'paula.almeida@email.com', '(11) 98765-4490', 'Análise de Sistemas'),
-            ('Lucas Henrique', 'lucas.henrique@email.com', '(11) 98765-4491', 'Engenharia de Software'),
-            ('Simone Freitas', 'simone.freitas@email.com', '(11) 98765-4492', 'Ciência da Computação'),
-            ('Caio Santos', 'caio.santos@email.com', '(11) 98765-4493', 'Sistemas de Informação'),
-            ('Marta Ferreira', 'marta.ferreira@email.com', '(11) 98765-4494', 'Engenharia da Computação'),
-            ('João Paulo', 'joao.paulo@email.com', '(11) 98765-4495', 'Análise de Sistemas'),
-            ('Camila Martins', 'camila.martins@email.com', '(11) 98765-4496', 'Engenharia de Software'),
-            ('Anderson Silva', 'anderson.silva@email.com', '(11) 98765-4497', 'Ciência da Computação'),
-            ('Letícia Souza', 'leticia.souza@email.com', '(11) 98765-4498', 'Sistemas de Informação'),
-            ('Eduardo Costa', 'eduardo.costa@email.com', '(11) 98765-4499', 'Engenharia da Computação'),
-            ('Gabriela Lima', 'gabriela.lima@email.com', '(11) 98765-4500', 'Análise de Sistemas')
-        ]
-        conn.executemany('INSERT INTO alunos (nome, email, telefone, curso) VALUES (?, ?, ?, ?)', estudantes)
+
+def id_do_item(item):
+    id = item.get('id') if isinstance(item, dict) else item
+    return id if isinstance(id, int) and not isinstance(id, bool) else None
+
+
+@api.route('', methods=('GET',))
+def api_listar():
+    search_term = request.args.get('search', '').strip()
+    conn = get_db_leitura()
+    versao, _ = versao_tabela(conn)
+    limite = request.args.get('limite', current_app.config['ALUNOS_POR_PAGINA'], type=int)
+    limite = max(1, min(limite, current_app.config['ALUNOS_POR_PAGINA_MAX']))
+    alunos, proximo, anterior = buscar_pagina(conn, versao, search_term, request.args.get('apos'),
+                                              request.args.get('antes'), limite)
+    return jsonify(alunos=[aluno_json(aluno) for aluno in alunos],
+                   proximo=proximo, anterior=anterior)
+
+
+@api.route('/<int:id>', methods=('GET',))
+def api_ver(id):
+    aluno = get_db_leitura().execute('SELECT * FROM alunos WHERE id = ?', (id,)).fetchone()
+    if aluno is None:
+        abort(404, 'Aluno não encontrado.')
+    return jsonify(aluno=aluno_json(aluno))
+
+
+@api.route('', methods=('POST',))
+@login_required
+def api_criar():
+    return responder_item(inserir_aluno, corpo_json())
+
+
+@api.route('/<int:id>', methods=('PUT',))
+@login_required
+def api_atualizar(id):
+    return responder_item(atualizar_aluno, id, corpo_json())
+
+
+@api.route('/<int:id>', methods=('DELETE',))
+@login_required
+def api_remover(id):
+    if not current_user.is_admin:
+        abort(403)
+    return responder_item(remover_aluno, id)
+
+
+@api.route('/lote', methods=('POST',))
+@login_required
+def api_criar_lote():
+    return responder_lote([(inserir_aluno, (item,)) for item in itens_do_lote('alunos')])
+
+
+@api.route('/lote', methods=('PUT',))
+@login_required
+def api_atualizar_lote():
+    operacoes = []
+    for item in itens_do_lote('alunos'):
+        id = id_do_item(item)
+        if id is None:
+            operacoes.append((lambda conn: (400, {'erro': 'Item sem "id" inteiro.'}), ()))
+        else:
+            operacoes.append((atualizar_aluno, (id, item)))
+    return responder_lote(operacoes)
+
+
+@api.route('/lote', methods=('DELETE',))
+@login_required
+def api_remover_lote():
+    if not current_user.is_admin:
+        abort(403)
+    operacoes = []
+    for item in itens_do_lote('ids'):
+        id = id_do_item(item)
+        if id is None:
+            operacoes.append((lambda conn: (400, {'erro': 'Item sem "id" inteiro.'}), ()))
+        else:
+            operacoes.append((remover_aluno, (id,)))
+    return responder_lote(operacoes)
+
+
+@api.route('/changes', methods=('GET',))
+def api_alteracoes():
+    # Feed incremental: ?since=<versao> devolve as alterações seguintes, em
+    # ordem, com a linha atual de cada aluno (null se foi removido). O
+    # consumidor guarda "ate" e pede de novo desde ele enquanto "mais" for true.
+    desde = request.args.get('since', 0, type=int)
+    limite = request.args.get('limite', current_app.config['CHANGES_PAGE_SIZE'], type=int)
+    limite = max(1, min(limite, current_app.config['CHANGES_PAGE_MAX']))
+    conn = get_db_leitura()
+    compactado_ate = horizonte(conn)
+    if 0 < desde < compactado_ate:
+        # Exclusões que este consumidor não viu já saíram do log: ele recomeça
+        # do zero (since=0 sempre traz a última entrada de cada aluno que existe)
+        abort(410, f'Log compactado até a versão {compactado_ate}; recomece de since=0.')
+
+    linhas = ler_alteracoes(conn, desde, limite + 1)
+    mais = len(linhas) > limite
+    linhas = linhas[:limite]
+    ate = linhas[-1]['versao'] if linhas else desde
+    alteracoes = [{
+        'versao': linha['versao'],
+        'operacao': linha['operacao'],
+        'id': linha['aluno_id'],
+        'alterado_em': linha['alterado_em'],
+        'aluno': aluno_json(linha) if linha['id'] is not None else None,
+    } for linha in linhas]
+    return jsonify(alteracoes=alteracoes, desde=desde, ate=ate, mais=mais,
+                   ultima_versao=ultima_versao(conn) if not mais else None)
+# -------------------------------------------------------- END API JSON de alunos
+
+
+# -------------------------------------------------------- Tarefas em segundo plano
+# Operações longas de admin rodam na fila de tarefas.py: a rota enfileira e
+# responde na hora (202 com o id em JSON, ou redirect para a página da
+# tarefa). Cada processo do app roda JOB_WORKERS threads de tarefas; com 0,
+# só quem roda `flask --app app tarefas` executa a fila.
+
+TIPOS_TAREFA = {}
+LOTE_REMOCAO = 500
+
+def tipo_tarefa(nome):
+    # Registra funcao(conn, parametros, progresso) para o tipo; ela roda com
+    # app_context e faz os próprios commits, em lotes
+    def registrar(funcao):
+        TIPOS_TAREFA[nome] = funcao
+        return funcao
+    return registrar
+
+def get_executor_tarefas():
+    def criar():
+        config = current_app.config
+        executor = ExecutorTarefas(fabrica_conexoes(), TIPOS_TAREFA,
+                                   threads=config['JOB_WORKERS'],
+                                   intervalo=config['JOB_POLL_INTERVAL'],
+                                   atraso_retentativa=config['JOB_RETRY_DELAY'],
+                                   expira_sinal=config['JOB_STALE_AFTER'],
+                                   contexto=current_app._get_current_object().app_context)
+        return executor
+    return por_processo('executor_tarefas', criar)
+
+@bp.before_app_request
+def iniciar_tarefas():
+    if current_app.config['JOB_WORKERS'] and 'executor_tarefas' not in current_app.extensions:
+        get_executor_tarefas().iniciar()
+
+def pasta_tarefas():
+    pasta = current_app.config['JOB_FILES_DIR'] or current_app.config['DATABASE'] + '-tarefas'
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+def enfileirar_tarefa(tipo, parametros=None):
+    max_tentativas = current_app.config['JOB_MAX_ATTEMPTS']
+    criado_por = current_user.id
+    id = executar_escrita(lambda conn: enfileirar(conn, tipo, parametros, max_tentativas, criado_por))
+    if current_app.config['JOB_WORKERS']:
+        get_executor_tarefas().acordar()
+    return id
+
+def quer_json():
+    # Corpo em JSON ou Accept preferindo JSON: cliente da API, não navegador
+    return request.is_json or request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+
+def responder_tarefa(id, mensagem):
+    url = url_for('.ver_tarefa', id=id)
+    if quer_json():
+        return jsonify(id=id, url=url), 202, {'Location': url}
+    flash(f'{mensagem} Tarefa #{id}.')
+    return redirect(url)
+
+
+@tipo_tarefa('importar')
+def tarefa_importar(conn, parametros, progresso):
+    caminho = parametros['caminho']
+    concluida = False
+    try:
+        total = os.path.getsize(caminho)
+        chave = chave_importacao(caminho, parametros['nome'])
+        with open(caminho, 'rb') as bruto:
+            # texto numa variável: o TextIOWrapper fecha bruto quando é
+            # coletado, e o progresso ainda lê bruto.tell()
+            texto = abrir_texto(bruto)
+
+            def avisar(processadas, inseridas, rejeitadas, por_segundo):
+                # Fração pelos bytes lidos
+                progresso(bruto.tell(), total, f'{processadas} linhas, {inseridas} inseridas, '
+                                               f'{rejeitadas} rejeitadas ({por_segundo:.0f}/s)')
+
+            resultado = importar_alunos(
+                conn,
+                ler_linhas(texto, parametros['formato']),
+                chave,
+                lote=current_app.config['IMPORT_BATCH_SIZE'],
+                lotes_por_transacao=current_app.config['IMPORT_BATCHES_PER_TRANSACTION'],
+                # Nova tentativa continua do último checkpoint em importacoes
+                retomar=parametros['retomar'] or progresso.tentativa > 1,
+                progresso=avisar,
+            )
+        concluida = True
+    finally:
+        # O upload fica só enquanto houver nova tentativa para retomar dele
+        if concluida or progresso.ultima:
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+    invalidar_fragmentos()
+    return resultado
+
+@tipo_tarefa('reconstruir_estatisticas')
+def tarefa_reconstruir_estatisticas(conn, parametros, progresso):
+    # curso_stats e o índice FTS refeitos do zero, em transações separadas
+    # para não segurar o lock de escrita pelas duas
+    divergentes = len(verificar_resumo(conn))
+    conn.execute('BEGIN IMMEDIATE')
+    reconstruir_resumo(conn)
+    conn.commit()
+    progresso(1, 2, 'curso_stats reconstruída')
+    if fts_disponivel(conn):
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute("INSERT INTO alunos_fts(alunos_fts) VALUES ('rebuild')")
+        conn.commit()
+    progresso(2, 2, 'Índice de busca reconstruído')
+    invalidar_fragmentos()
+    return {'cursos_divergentes': divergentes}
+
+@tipo_tarefa('remover_alunos')
+def tarefa_remover_alunos(conn, parametros, progresso):
+    ids = parametros.get('ids')
+    if ids is None:
+        ids = [linha[0] for linha in
+               conn.execute('SELECT id FROM alunos WHERE curso IS ?', (parametros['curso'],))]
+    # Um lote por transação: escritas das rotas passam entre os lotes, e uma
+    # nova tentativa só refaz o que faltou
+    removidos = 0
+    for inicio in range(0, len(ids), LOTE_REMOCAO):
+        lote = ids[inicio:inicio + LOTE_REMOCAO]
+        conn.execute('BEGIN IMMEDIATE')
+        removidos += conn.executemany('DELETE FROM alunos WHERE id = ?', [(id,) for id in lote]).rowcount
         conn.commit()
-        print(f"{count} estudantes foram adicionados ao banco de dados!")
+        progresso(inicio + len(lote), len(ids), f'{removidos} alunos removidos')
+    invalidar_fragmentos()
+    return {'removidos': removidos, 'solicitados': len(ids)}
+
+@tipo_tarefa('compactar_alteracoes')
+def tarefa_compactar_alteracoes(conn, parametros, progresso):
+    dias = parametros.get('dias', current_app.config['CHANGES_RETENTION_DAYS'])
+    conn.execute('BEGIN IMMEDIATE')
+    resultado = compactar_alteracoes(conn, corte_alteracoes(dias))
+    conn.commit()
+    return resultado
+
+def corte_alteracoes(dias):
+    # Mesmo formato e fuso do CURRENT_TIMESTAMP do SQLite
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - dias * 86400))
+
+
+@bp.route('/tarefas')
+@login_required
+def lista_tarefas():
+    if not current_user.is_admin:
+        abort(403)
+    tarefas = listar_tarefas(get_db_connection())
+    if quer_json():
+        return jsonify(tarefas=tarefas)
+    return render_template('tarefas.html', tarefas=tarefas)
+
+
+@bp.route('/tarefas/<int:id>')
+@login_required
+def ver_tarefa(id):
+    if not current_user.is_admin:
+        abort(403)
+    tarefa = ler_tarefa(get_db_connection(), id)
+    if tarefa is None:
+        abort(404)
+    if quer_json():
+        return jsonify(tarefa=tarefa)
+    return render_template('tarefa.html', tarefa=tarefa)
+
+
+@bp.route('/tarefas/estatisticas', methods=('POST',))
+@login_required
+def reconstruir_estatisticas():
+    if not current_user.is_admin:
+        abort(403)
+    id = enfileirar_tarefa('reconstruir_estatisticas')
+    return responder_tarefa(id, 'Reconstrução das estatísticas enfileirada.')
+
+
+@bp.route('/tarefas/compactar-alteracoes', methods=('POST',))
+@login_required
+def compactar_alteracoes_tarefa():
+    if not current_user.is_admin:
+        abort(403)
+    id = enfileirar_tarefa('compactar_alteracoes')
+    return responder_tarefa(id, 'Compactação do log de alterações enfileirada.')
+
+
+@bp.route('/tarefas/remover-alunos', methods=('POST',))
+@login_required
+def remover_alunos_em_massa():
+    # ids (lista) ou curso, por formulário ou JSON
+    if not current_user.is_admin:
+        abort(403)
+    dados = request.get_json(silent=True) or {}
+    ids = dados.get('ids') if request.is_json else request.form.getlist('ids', type=int)
+    curso = dados.get('curso') if request.is_json else request.form.get('curso')
+    if ids:
+        if not isinstance(ids, list) or not all(isinstance(id, int) and not isinstance(id, bool)
+                                                for id in ids):
+            abort(400)
+        parametros = {'ids': ids}
+    elif curso is not None:
+        # Validado aqui: um tipo errado falharia em todas as tentativas da tarefa
+        if not isinstance(curso, str):
+            abort(400)
+        parametros = {'curso': curso or None}
     else:
-        print(f"O banco já contém {count} registros. Nenhum dado foi inserido.")
-    
-    conn.close()
+        abort(400)
+    id = enfileirar_tarefa('remover_alunos', parametros)
+    return responder_tarefa(id, 'Remoção de alunos enfileirada.')
+
+
+@bp.route('/metricas/tarefas')
+@login_required
+def metricas_tarefas():
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(get_executor_tarefas().stats())
+# -------------------------------------------------------- END Tarefas em segundo plano
+
+
+# -------------------------------------------------------- Processos do servidor
+# Ganchos do servidor.py. O pai importa o app e aquece templates e caches
+# uma vez; os workers herdam isso no fork (cópia sob demanda). Conexões,
+# threads (gravador) e o pool de hash não sobrevivem a um fork: o pai fecha
+# os seus antes e cada worker abre os próprios depois.
+
+def aquecer_app(app):
+    for nome in app.jinja_env.list_templates(extensions=('html',)):
+        app.jinja_env.get_template(nome)
+    cliente = app.test_client()
+    for url in ('/', '/estatisticas'):
+        resposta = cliente.get(url)
+        if resposta.status_code != 200:
+            app.logger.warning('Aquecimento: %s respondeu %s', url, resposta.status_code)
+        resposta.close()
+    hash_ficticio()
+    liberar_recursos(app)
+
+def preparar_worker(app):
+    # Métricas são por processo: o worker não herda as do aquecimento
+    app.extensions.pop('metricas', None)
+    app.extensions['pronto'] = False
+    with app.app_context():
+        pool = get_pool()
+        conexoes = [pool.acquire() for _ in range(pool.size)]
+        for conn in conexoes:
+            pool.release(conn)
+    app.extensions['pronto'] = True
+
+def liberar_recursos(app):
+    pool = app.extensions.pop('db_pool', None)
+    if pool is not None:
+        pool.close()
+    gravador = app.extensions.pop('db_gravador', None)
+    if gravador is not None:
+        gravador.fechar()
+    executor = app.extensions.pop('hash_executor', None)
+    if executor is not None:
+        executor.shutdown()
+    for pool in app.extensions.pop('db_replicas', {}).values():
+        pool.close()
+    replicador = app.extensions.pop('db_replicador', None)
+    if replicador is not None:
+        replicador.parar()
+    executor_tarefas = app.extensions.pop('executor_tarefas', None)
+    if executor_tarefas is not None:
+        # Tarefa que não terminar a tempo volta para a fila (JOB_STALE_AFTER)
+        executor_tarefas.parar(timeout=app.config['GRACEFUL_TIMEOUT'])
 
 
-init_db()
-popular_banco_dados()
+@bp.route('/pronto')
+def pronto():
+    # Prontidão para o balanceador: 503 enquanto o worker aquece ou encerra,
+    # ou se o banco não responde
+    if current_app.extensions.get('pronto', True):
+        try:
+            get_db_connection().execute('SELECT 1').fetchone()
+            return jsonify(pronto=True, pid=os.getpid())
+        except (sqlite3.Error, PoolTimeout):
+            pass
+    return jsonify(pronto=False, pid=os.getpid()), 503
+# -------------------------------------------------------- END Processos do servidor
+
+
+# -------------------------------------------------------- Fábrica do app
+def create_app(config=None):
+    app = Flask(__name__)
+    app.jinja_env.globals.update(zip=zip)
+    app.secret_key = 'Ehqb_E._Uhlv_LL'
+    app.config.update(CONFIG_PADRAO)
+    app.config.from_prefixed_env()
+    if config:
+        app.config.update(config)
+
+    app.config.setdefault('ETAG_SALT', versao_templates(app))
+
+    login_manager.init_app(app)
+    app.register_blueprint(bp)
+    app.register_blueprint(api)
+    app.teardown_appcontext(close_db_connection)
+    before_render_template.connect(iniciar_template, app)
+    template_rendered.connect(medir_template, app)
+
+    app.cli.add_command(migrar_command)
+    app.cli.add_command(popular_command)
+    app.cli.add_command(deduplicar_command)
+    app.cli.add_command(replicar_command)
+    app.cli.add_command(tarefas_command)
+    app.cli.add_command(compactar_alteracoes_command)
+    return app
+
+
+@click.command('migrar')
+@with_appcontext
+def migrar_command():
+    """Aplica as migrações pendentes do banco."""
+    try:
+        aplicadas = migrar(get_db_connection())
+    except EmailsDuplicados as erro:
+        raise click.ClickException(str(erro))
+    for versao, descricao in aplicadas:
+        click.echo(f'Migração {versao} aplicada: {descricao}')
+    click.echo(f'Schema na versão {versao_atual(get_db_connection())}.')
+
+
+@click.command('popular')
+@with_appcontext
+def popular_command():
+    """Carrega os alunos de exemplo se a tabela estiver vazia."""
+    inseridos = popular(get_db_connection())
+    if inseridos:
+        click.echo(f"{inseridos} estudantes foram adicionados ao banco de dados!")
+    else:
+        click.echo("O banco já contém registros. Nenhum dado foi inserido.")
+
+
+@click.command('deduplicar-emails')
+@click.option('--aplicar', is_flag=True, help='remove os duplicados em vez de só listar')
+@with_appcontext
+def deduplicar_command(aplicar):
+    """Lista (ou remove) alunos com email repetido, mantendo o mais antigo."""
+    duplicados, removidos = deduplicar_emails(get_db_connection(), aplicar)
+    for email, total, manter in duplicados:
+        click.echo(f'{email}: {total} alunos (mantém id {manter})')
+    if not duplicados:
+        click.echo('Nenhum email duplicado.')
+    elif aplicar:
+        click.echo(f'{removidos} alunos duplicados removidos.')
+    else:
+        click.echo(f'{removidos} alunos seriam removidos. Use --aplicar para remover.')
+
+
+@click.command('replicar')
+@click.option('--uma-vez', is_flag=True, help='faz uma rodada e sai')
+@with_appcontext
+def replicar_command(uma_vez):
+    """Mantém as réplicas de READ_REPLICAS em dia com o banco principal."""
+    if not current_app.config['READ_REPLICAS']:
+        raise click.ClickException('Nenhuma réplica em READ_REPLICAS.')
+    replicador = get_replicador()
+    if uma_vez:
+        if not replicador.rodada():
+            raise click.ClickException('Outro processo está sincronizando as réplicas.')
+        click.echo(json.dumps(replicador.stats(), indent=2))
+        return
+    click.echo(f'Sincronizando {len(replicador.replicas)} réplicas a cada {replicador.intervalo}s.')
+    replicador.iniciar()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        replicador.parar()
+
+
+@click.command('tarefas')
+@click.option('--threads', type=int, default=1, show_default=True)
+@with_appcontext
+def tarefas_command(threads):
+    """Executa a fila de tarefas em primeiro plano (para JOB_WORKERS=0 nos workers web)."""
+    current_app.config['JOB_WORKERS'] = threads
+    executor = get_executor_tarefas()
+    click.echo(f'Executando tarefas com {threads} threads.')
+    executor.iniciar()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        executor.parar()
+
+
+@click.command('compactar-alteracoes')
+@click.option('--dias', type=float, help='só mexe no que é mais antigo que isso '
+                                         '(padrão: CHANGES_RETENTION_DAYS)')
+@with_appcontext
+def compactar_alteracoes_command(dias):
+    """Compacta o log de alterações de alunos usado por /api/alunos/changes."""
+    if dias is None:
+        dias = current_app.config['CHANGES_RETENTION_DAYS']
+    conn = get_db_connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        resultado = compactar_alteracoes(conn, corte_alteracoes(dias))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    click.echo(f"{resultado['repetidas']} entradas repetidas e {resultado['exclusoes']} "
+               f"exclusões removidas; horizonte na versão {resultado['horizonte']}.")
+# -------------------------------------------------------- END Fábrica do app
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
 
 
 #  2-5-14-25
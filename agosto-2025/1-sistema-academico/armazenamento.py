@@ -0,0 +1,164 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, TimeoutError as TempoEsgotado
+
+
+# -------------------------------------------------------- Configuração do SQLite e escrita serializada
+# Toda conexão aberta pelo app passa por configurar_conexao: WAL deixa
+# leitores e escritor trabalharem juntos, busy_timeout espera o lock em vez
+# de estourar "database is locked" na hora, synchronous=NORMAL é seguro com
+# WAL e corta um fsync por commit.
+#
+# GravadorSerial é o único escritor do processo: as escritas das requisições
+# entram numa fila e uma thread aplica várias delas na mesma transação
+# (group commit), cada uma no seu SAVEPOINT para que a falha de uma não
+# desfaça as outras.
+
+PRAGMAS_PADRAO = {
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_CACHE_SIZE': -20000,          # negativo = KiB (~20 MB por conexão)
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    'SQLITE_BUSY_TIMEOUT': 5000,          # ms
+}
+
+
+def configurar_conexao(conn, config=None):
+    config = {**PRAGMAS_PADRAO, **(config or {})}
+    # busy_timeout primeiro: trocar o journal_mode também pode esperar lock
+    conn.execute(f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT'])}")
+    if config['SQLITE_JOURNAL_MODE']:
+        conn.execute(f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+    if config['SQLITE_SYNCHRONOUS']:
+        conn.execute(f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}")
+    conn.execute(f"PRAGMA cache_size = {int(config['SQLITE_CACHE_SIZE'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}")
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+
+def conectar(database, config=None):
+    # Conexão avulsa (scripts de linha de comando) com os mesmos pragmas do app
+    conn = sqlite3.connect(database)
+    return configurar_conexao(conn, config)
+
+
+def pragmas_do_config(config):
+    return {chave: config[chave] for chave in PRAGMAS_PADRAO if chave in config}
+
+
+class GravadorSerial:
+    def __init__(self, conectar, max_lote=64, timeout=30.0):
+        self.conectar = conectar
+        self.max_lote = max_lote
+        self.timeout = timeout
+        self._fila = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.commits = 0
+        self.escritas = 0
+        self.falhas = 0
+        self.maior_lote = 0
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='gravador-sqlite',
+                                                daemon=True)
+                self._thread.start()
+
+    def executar(self, funcao):
+        # funcao(conn) roda na thread do gravador; não deve dar commit
+        futuro = Future()
+        self._iniciar()
+        self._fila.put((funcao, futuro))
+        try:
+            return futuro.result(self.timeout)
+        except TempoEsgotado:
+            # Ainda na fila: cancelada, o gravador pula e o erro é verdadeiro.
+            # Já no lote: vai ser gravada, então espera o resultado real.
+            if futuro.cancel():
+                raise
+            return futuro.result()
+
+    def _loop(self):
+        conn = self.conectar()
+        while True:
+            item = self._fila.get()
+            if item is None:
+                break
+            lote = [item]
+            while len(lote) < self.max_lote:
+                try:
+                    proximo = self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if proximo is None:
+                    self._fila.put(None)
+                    break
+                lote.append(proximo)
+            self._aplicar(conn, lote)
+        conn.close()
+
+    def _aplicar(self, conn, lote):
+        # Escritas que desistiram de esperar (executar cancelou) ficam de fora;
+        # as outras não podem mais ser canceladas
+        lote = [(funcao, futuro) for funcao, futuro in lote if futuro.set_running_or_notify_cancel()]
+        if not lote:
+            return
+        resultados = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for funcao, futuro in lote:
+                conn.execute('SAVEPOINT escrita')
+                try:
+                    resultado = funcao(conn)
+                except Exception as erro:
+                    conn.execute('ROLLBACK TO escrita')
+                    conn.execute('RELEASE escrita')
+                    resultados.append((futuro, None, erro))
+                else:
+                    conn.execute('RELEASE escrita')
+                    resultados.append((futuro, resultado, None))
+            conn.commit()
+        except Exception as erro:
+            # Falhou o BEGIN ou o COMMIT: nada do lote foi gravado
+            if conn.in_transaction:
+                conn.rollback()
+            resultados = [(futuro, None, erro) for _, futuro in lote]
+
+        with self._lock:
+            self.commits += 1
+            self.maior_lote = max(self.maior_lote, len(lote))
+            for futuro, resultado, erro in resultados:
+                if erro is None:
+                    self.escritas += 1
+                else:
+                    self.falhas += 1
+        for futuro, resultado, erro in resultados:
+            if erro is None:
+                futuro.set_result(resultado)
+            else:
+                futuro.set_exception(erro)
+
+    def fechar(self):
+        with self._lock:
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._fila.put(None)
+            thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'commits': self.commits,
+                'escritas': self.escritas,
+                'falhas': self.falhas,
+                'maior_lote': self.maior_lote,
+                'escritas_por_commit': self.escritas / self.commits if self.commits else 0.0,
+                'na_fila': self._fila.qsize(),
+            }
+# -------------------------------------------------------- END Configuração do SQLite e escrita serializada
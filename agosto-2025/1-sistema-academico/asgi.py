@@ -0,0 +1,163 @@
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app
+
+
+# -------------------------------------------------------- Modo ASGI
+# Serve o app Flask por um servidor ASGI (uvicorn, hypercorn):
+#     uvicorn asgi:app --workers 4
+#
+# O loop de eventos cuida dos sockets: ler o corpo da requisição e mandar a
+# resposta para um cliente lento não prendem thread nenhuma. A view (acesso
+# ao SQLite, renderização) roda num ThreadPoolExecutor limitado a
+# ASGI_THREADS; o hash de senha continua no pool de processos de senhas.py,
+# então o loop nunca bloqueia. Resposta até LIMITE_BUFFER é montada inteira
+# na thread, que é liberada antes do envio; acima disso (exportações,
+# ?stream=1) a thread transmite os blocos e espera o cliente consumir.
+
+LIMITE_BUFFER = 1024 * 1024
+# Corpo da requisição acima disso vai para disco em vez de memória (uploads)
+LIMITE_CORPO_MEMORIA = 1024 * 1024
+
+
+class AdaptadorASGI:
+    def __init__(self, wsgi_app, threads=8):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        corpo = tempfile.SpooledTemporaryFile(max_size=LIMITE_CORPO_MEMORIA)
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'http.disconnect':
+                corpo.close()
+                return
+            corpo.write(mensagem.get('body', b''))
+            if not mensagem.get('more_body'):
+                break
+        tamanho = corpo.tell()
+        corpo.seek(0)
+
+        loop = asyncio.get_running_loop()
+        environ = montar_environ(scope, corpo, tamanho)
+        try:
+            resposta = await loop.run_in_executor(
+                self.executor, self._executar, environ, loop, send)
+        finally:
+            corpo.close()
+        if resposta is None:
+            return   # já transmitida pela thread
+        status, headers, blocos = resposta
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b''.join(blocos)})
+
+    def _executar(self, environ, loop, send):
+        # Roda na thread: chama o app WSGI e consome a resposta na mesma
+        # thread (os contextos do Flask em stream_with_context dependem disso)
+        inicio = {}
+
+        def start_response(status, headers, exc_info=None):
+            inicio['status'] = int(status.split(' ', 1)[0])
+            inicio['headers'] = [(nome.lower().encode('latin-1'), valor.encode('latin-1'))
+                                 for nome, valor in headers]
+
+        iteravel = self.wsgi_app(environ, start_response)
+        try:
+            blocos = []
+            acumulado = 0
+            iterador = iter(iteravel)
+            for bloco in iterador:
+                if not bloco:
+                    continue
+                blocos.append(bloco)
+                acumulado += len(bloco)
+                if acumulado > LIMITE_BUFFER:
+                    self._transmitir(loop, send, inicio, blocos, iterador)
+                    return None
+            return inicio['status'], inicio['headers'], blocos
+        finally:
+            if hasattr(iteravel, 'close'):
+                iteravel.close()
+
+    def _transmitir(self, loop, send, inicio, blocos, iterador):
+        def enviar(mensagem):
+            # Espera o envio terminar: é o controle de fluxo do stream
+            asyncio.run_coroutine_threadsafe(send(mensagem), loop).result()
+
+        enviar({'type': 'http.response.start', 'status': inicio['status'],
+                'headers': inicio['headers']})
+        enviar({'type': 'http.response.body', 'body': b''.join(blocos), 'more_body': True})
+        for bloco in iterador:
+            if bloco:
+                enviar({'type': 'http.response.body', 'body': bloco, 'more_body': True})
+        enviar({'type': 'http.response.body', 'body': b''})
+
+
+def montar_environ(scope, corpo, tamanho):
+    script_name = scope.get('root_path', '')
+    caminho = scope['path']
+    if script_name and caminho.startswith(script_name):
+        caminho = caminho[len(script_name):]
+    servidor = scope.get('server') or ('localhost', 80)
+    cliente = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI quer str com os bytes crus em latin-1
+        'SCRIPT_NAME': script_name.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': caminho.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': cliente[0],
+        'REMOTE_PORT': str(cliente[1]),
+        'CONTENT_LENGTH': str(tamanho),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': corpo,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for nome, valor in scope.get('headers', []):
+        nome = nome.decode('latin-1').upper().replace('-', '_')
+        valor = valor.decode('latin-1')
+        if nome == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = valor
+            continue
+        if nome == 'CONTENT_LENGTH':
+            continue
+        chave = f'HTTP_{nome}'
+        if chave in environ:
+            valor = environ[chave] + ('; ' if nome == 'COOKIE' else ',') + valor
+        environ[chave] = valor
+    return environ
+
+
+def create_asgi_app(config=None):
+    flask_app = create_app(config)
+    return AdaptadorASGI(flask_app, threads=flask_app.config['ASGI_THREADS'])
+# -------------------------------------------------------- END Modo ASGI
+
+
+app = create_asgi_app()
@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+from armazenamento import conectar
+from gerar_dados import SOBRENOMES, popular_sintetico
+from migracoes import migrar
+
+
+# Compara o caminho WSGI atual (servidor do app.run, com threads) com o modo
+# ASGI (asgi.py no uvicorn) com muitas conexões simultâneas. Cada servidor
+# roda num processo próprio sobre o mesmo banco sintético; o cliente é
+# asyncio puro, uma conexão por requisição. --lentos faz uma parte dos
+# clientes mandar a requisição aos poucos, como um celular em rede ruim.
+# Uso: python benchmark_asgi.py [--conexoes 10 100 500] [--segundos 5]
+#                               [--lentos 0.1] [--saida resultado.json]
+
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+SERVIDORES = {
+    'wsgi': lambda porta: [sys.executable, '-c',
+                           'from app import create_app; '
+                           f'create_app().run(host="127.0.0.1", port={porta}, threaded=True)'],
+    'asgi': lambda porta: [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+                           '--port', str(porta), '--log-level', 'warning'],
+}
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def caminho_aleatorio(rnd, linhas):
+    sorteio = rnd.random()
+    if sorteio < 0.4:
+        return f'/{rnd.randint(1, linhas)}'
+    if sorteio < 0.7:
+        return '/?' + urllib.parse.urlencode({'search': rnd.choice(SOBRENOMES).lower()})
+    if sorteio < 0.9:
+        return f'/?apos={rnd.randint(1, linhas)}'
+    return '/estatisticas'
+
+
+async def requisitar(porta, caminho, lento):
+    leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+    try:
+        dados = (f'GET {caminho} HTTP/1.1\r\nHost: 127.0.0.1:{porta}\r\n'
+                 'Connection: close\r\n\r\n').encode('utf-8')
+        if lento:
+            # Cabeçalhos em 10 pedaços ao longo de `lento` segundos
+            passo = max(1, len(dados) // 10)
+            for i in range(0, len(dados), passo):
+                escritor.write(dados[i:i + passo])
+                await escritor.drain()
+                await asyncio.sleep(lento / 10)
+        else:
+            escritor.write(dados)
+            await escritor.drain()
+        resposta = await leitor.read()
+    finally:
+        escritor.close()
+    return int(resposta.split(b' ', 2)[1]) if resposta.startswith(b'HTTP/') else 0
+
+
+async def carga(porta, conexoes, segundos, fracao_lentos, atraso_lento, linhas, semente):
+    fim = time.perf_counter() + segundos
+    latencias = {'normal': [], 'lento': []}
+    erros = 0
+
+    async def cliente(indice):
+        nonlocal erros
+        rnd = random.Random(semente + indice)
+        lento = atraso_lento if indice < conexoes * fracao_lentos else 0
+        tipo = 'lento' if lento else 'normal'
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            try:
+                status = await requisitar(porta, caminho_aleatorio(rnd, linhas), lento)
+            except OSError:
+                status = 0
+            if status != 200:
+                erros += 1
+                continue
+            latencias[tipo].append((time.perf_counter() - inicio) * 1000)
+
+    await asyncio.gather(*(cliente(i) for i in range(conexoes)))
+    return latencias, erros
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+
+def resumir(latencias, erros, segundos):
+    normais = sorted(latencias['normal'])
+    return {
+        'requisicoes': len(normais) + len(latencias['lento']),
+        'erros': erros,
+        'vazao': (len(normais) + len(latencias['lento'])) / segundos,
+        'p50_ms': percentil(normais, 50),
+        'p95_ms': percentil(normais, 95),
+        'p99_ms': percentil(normais, 99),
+        'lentos_p50_ms': percentil(sorted(latencias['lento']), 50),
+    }
+
+
+def esperar_pronto(porta, processo, limite=30.0):
+    fim = time.perf_counter() + limite
+    while time.perf_counter() < fim:
+        if processo.poll() is not None:
+            raise SystemExit(f'Servidor saiu com código {processo.returncode}')
+        try:
+            if asyncio.run(requisitar(porta, '/', 0)) == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit('Servidor não respondeu a tempo')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=10_000)
+    parser.add_argument('--conexoes', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--segundos', type=float, default=5.0)
+    parser.add_argument('--lentos', type=float, default=0.1, help='fração de clientes lentos')
+    parser.add_argument('--atraso-lento', type=float, default=2.0,
+                        help='segundos que um cliente lento leva para mandar a requisição')
+    parser.add_argument('--servidores', nargs='+', choices=SERVIDORES, default=list(SERVIDORES))
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', help='grava o resultado em JSON')
+    args = parser.parse_args()
+
+    if 'asgi' in args.servidores:
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            print('uvicorn não instalado: rodando só o WSGI (pip install uvicorn)', file=sys.stderr)
+            args.servidores = [s for s in args.servidores if s != 'asgi']
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        banco = os.path.join(tmp, 'asgi.db')
+        conn = conectar(banco)
+        migrar(conn)
+        popular_sintetico(conn, args.linhas, args.semente)
+        conn.execute('ANALYZE')
+        conn.close()
+
+        env = {**os.environ, 'FLASK_DATABASE': banco, 'PYTHONPATH': PASTA_APP}
+        print(f'{"servidor":>8} {"conexões":>9} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} '
+              f'{"p99 ms":>9} {"lentos p50":>11} {"erros":>7}')
+        for nome in args.servidores:
+            porta = porta_livre()
+            processo = subprocess.Popen(SERVIDORES[nome](porta), cwd=PASTA_APP, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                esperar_pronto(porta, processo)
+                for conexoes in args.conexoes:
+                    latencias, erros = asyncio.run(carga(
+                        porta, conexoes, args.segundos, args.lentos, args.atraso_lento,
+                        args.linhas, args.semente))
+                    r = {'servidor': nome, 'conexoes': conexoes,
+                         **resumir(latencias, erros, args.segundos)}
+                    resultados.append(r)
+                    print(f'{nome:>8} {conexoes:>9} {r["vazao"]:>9.1f} {r["p50_ms"]:>9.1f} '
+                          f'{r["p95_ms"]:>9.1f} {r["p99_ms"]:>9.1f} {r["lentos_p50_ms"]:>11.1f} '
+                          f'{r["erros"]:>7}')
+            finally:
+                processo.terminate()
+                processo.wait()
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({'parametros': vars(args), 'resultados': resultados}, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from busca import SQL_BUSCA_FTS, criar_indice_fts, expressao_fts, filtro_like
+
+
+# Compara a busca por LIKE '%x%' com a busca FTS5 em bancos sintéticos.
+# Uso: python benchmark_busca.py [--linhas 10000 100000 1000000]
+
+NOMES = ['João', 'Maria', 'Carlos', 'Ana', 'Pedro', 'Juliana', 'Marcos', 'Fernanda',
+         'Ricardo', 'Patrícia', 'Lucas', 'Amanda', 'Gustavo', 'Isabela', 'André', 'Letícia']
+SOBRENOMES = ['Silva', 'Oliveira', 'Souza', 'Costa', 'Santos', 'Pereira', 'Lima', 'Rocha',
+              'Alves', 'Gomes', 'Martins', 'Barbosa', 'Uchôa', 'Guimarães', 'Conceição', 'Ribeiro']
+CURSOS = ['Engenharia de Software', 'Ciência da Computação', 'Sistemas de Informação',
+          'Engenharia da Computação', 'Análise de Sistemas']
+
+# Termos comuns acham 50 linhas logo no começo do LIKE; os raros obrigam o
+# LIKE a varrer a tabela inteira, que é o pior caso da busca atual.
+TERMOS = ['silva', 'joão', 'joao', 'uchoa', 'Engenharia', 'pat', 'martins ana',
+          'aluno9999', 'inexistente']
+
+
+def gerar_banco(caminho, linhas):
+    conn = sqlite3.connect(caminho)
+    conn.execute('''
+    CREATE TABLE alunos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        email TEXT NOT NULL,
+        telefone TEXT,
+        curso TEXT,
+        criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    rnd = random.Random(42)
+
+    def alunos():
+        for i in range(linhas):
+            nome = f'{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)}'
+            email = f'aluno{i}@email.com'
+            yield (nome, email, None, rnd.choice(CURSOS))
+
+    conn.executemany('INSERT INTO alunos (nome, email, telefone, curso) VALUES (?, ?, ?, ?)',
+                     alunos())
+    criar_indice_fts(conn)
+    conn.commit()
+    return conn
+
+
+def medir(conn, sql, params, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        conn.execute(sql, params).fetchmany(50)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"linhas":>10} {"termo":>14} {"LIKE (ms)":>10} {"FTS5 (ms)":>10}')
+    for linhas in args.linhas:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = gerar_banco(os.path.join(tmp, 'bench.db'), linhas)
+            for termo in TERMOS:
+                # Primeira página (50 linhas), como a rota index pede
+                where, params = filtro_like(termo)
+                like = medir(conn, f'SELECT * FROM alunos WHERE {where} ORDER BY id',
+                             params, args.repeticoes)
+                fts = medir(conn, SQL_BUSCA_FTS + ' ORDER BY score, id',
+                            (expressao_fts(termo),), args.repeticoes)
+                print(f'{linhas:>10} {termo:>14} {like:>10.2f} {fts:>10.2f}')
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
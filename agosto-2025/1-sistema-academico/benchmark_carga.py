@@ -0,0 +1,317 @@
+import argparse
+import http.cookiejar
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+
+from werkzeug.security import generate_password_hash
+from werkzeug.serving import make_server
+
+from app import create_app, get_db_connection
+from gerar_dados import SOBRENOMES, CURSOS, popular_sintetico
+from migracoes import migrar
+
+
+# Teste de carga do app inteiro: gera um banco sintético, sobe o app (test
+# client em processo ou servidor WSGI local de verdade) e roda várias threads
+# com uma mistura de leitura, busca, estatísticas, login e escrita. Mede
+# p50/p95/p99 e vazão por operação e grava tudo em JSON, com o commit, para
+# comparar execuções entre versões.
+# Uso: python benchmark_carga.py [--linhas 10000] [--segundos 10] [--threads 8]
+#                                [--servidor] [--saida resultado.json]
+#                                [--comparar base.json]
+
+MISTURA_PADRAO = 'leitura=45,busca=20,estatisticas=10,login=5,escrita=20'
+USUARIO = ('carga', 'senha-carga')
+
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+
+# -------------------------------------------------------- Clientes
+class ClienteTeste:
+    # Test client do Flask: mede o app sem rede nem servidor
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, url):
+        resposta = self.client.get(url)
+        resposta.get_data()
+        resposta.close()
+        return resposta.status_code
+
+    def post(self, url, dados):
+        resposta = self.client.post(url, data=dados)
+        resposta.close()
+        return resposta.status_code
+
+
+class _SemRedirecionar(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ClienteHTTP:
+    # HTTP de verdade contra o servidor local, com cookies de sessão
+    def __init__(self, base):
+        self.base = base
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _SemRedirecionar())
+
+    def _abrir(self, url, dados=None):
+        corpo = urllib.parse.urlencode(dados).encode() if dados is not None else None
+        try:
+            with self.opener.open(self.base + url, corpo) as resposta:
+                resposta.read()
+                return resposta.status
+        except urllib.error.HTTPError as erro:
+            erro.read()
+            return erro.code
+
+    def get(self, url):
+        return self._abrir(url)
+
+    def post(self, url, dados):
+        return self._abrir(url, dados)
+# -------------------------------------------------------- END Clientes
+
+
+# -------------------------------------------------------- Operações
+# Cada operação recebe (cliente, rnd, estado) e devolve o status HTTP.
+# estado guarda o maior id conhecido e um contador para emails únicos.
+
+def op_leitura(cliente, rnd, estado):
+    id = rnd.randint(1, estado['max_id'])
+    if rnd.random() < 0.5:
+        return cliente.get(f'/{id}')
+    return cliente.get(f'/?apos={id}')
+
+
+def op_busca(cliente, rnd, estado):
+    termo = rnd.choice(SOBRENOMES) if rnd.random() < 0.8 else rnd.choice(CURSOS).split()[0]
+    return cliente.get('/?' + urllib.parse.urlencode({'search': termo.lower()}))
+
+
+def op_estatisticas(cliente, rnd, estado):
+    return cliente.get('/estatisticas')
+
+
+def op_login(cliente, rnd, estado):
+    return cliente.post('/login', {'username': USUARIO[0], 'password': USUARIO[1]})
+
+
+def op_escrita(cliente, rnd, estado):
+    with estado['lock']:
+        estado['sequencia'] += 1
+        n = estado['sequencia']
+    dados = {'nome': f'Carga {n} {rnd.choice(SOBRENOMES)}', 'email': f'carga.{n}@email.com',
+             'telefone': '', 'curso': rnd.choice(CURSOS)}
+    if rnd.random() < 0.5:
+        return cliente.post('/adicionar', dados)
+    return cliente.post(f'/{rnd.randint(1, estado["max_id"])}/editar', dados)
+
+
+OPERACOES = {
+    'leitura': op_leitura,
+    'busca': op_busca,
+    'estatisticas': op_estatisticas,
+    'login': op_login,
+    'escrita': op_escrita,
+}
+# -------------------------------------------------------- END Operações
+
+
+def ler_mistura(texto):
+    mistura = {}
+    for parte in texto.split(','):
+        nome, _, peso = parte.partition('=')
+        if nome not in OPERACOES:
+            raise SystemExit(f'Operação desconhecida: {nome} (use {", ".join(OPERACOES)})')
+        mistura[nome] = float(peso)
+    return mistura
+
+
+def percentil(valores, p):
+    # valores já ordenados; método nearest-rank
+    if not valores:
+        return 0.0
+    indice = max(0, math.ceil(p / 100 * len(valores)) - 1)
+    return valores[indice]
+
+
+def resumir(latencias, erros, segundos):
+    ordenadas = sorted(latencias)
+    return {
+        'requisicoes': len(ordenadas),
+        'erros': erros,
+        'vazao': len(ordenadas) / segundos,
+        'media_ms': sum(ordenadas) / len(ordenadas) if ordenadas else 0.0,
+        'p50_ms': percentil(ordenadas, 50),
+        'p95_ms': percentil(ordenadas, 95),
+        'p99_ms': percentil(ordenadas, 99),
+        'max_ms': ordenadas[-1] if ordenadas else 0.0,
+    }
+
+
+def rodar_carga(fazer_cliente, mistura, threads, segundos, aquecimento, max_id, semente):
+    nomes = list(mistura)
+    pesos = [mistura[nome] for nome in nomes]
+    estado = {'max_id': max_id, 'sequencia': 0, 'lock': threading.Lock()}
+    latencias = {nome: [] for nome in nomes}
+    erros = {nome: 0 for nome in nomes}
+    lock = threading.Lock()
+    inicio_medicao = time.perf_counter() + aquecimento
+    fim = inicio_medicao + segundos
+
+    def trabalhador(indice):
+        rnd = random.Random(semente + indice)
+        cliente = fazer_cliente()
+        # Sessão logada para as escritas; o login da mistura é medido à parte
+        op_login(cliente, rnd, estado)
+        while True:
+            agora = time.perf_counter()
+            if agora >= fim:
+                break
+            nome = rnd.choices(nomes, pesos)[0]
+            status = OPERACOES[nome](cliente, rnd, estado)
+            duracao = (time.perf_counter() - agora) * 1000
+            if agora < inicio_medicao:
+                continue
+            with lock:
+                latencias[nome].append(duracao)
+                if status >= 400:
+                    erros[nome] += 1
+
+    lista = [threading.Thread(target=trabalhador, args=(i,)) for i in range(threads)]
+    for t in lista:
+        t.start()
+    for t in lista:
+        t.join()
+
+    por_operacao = {nome: resumir(latencias[nome], erros[nome], segundos) for nome in nomes}
+    todas = [valor for nome in nomes for valor in latencias[nome]]
+    return {'total': resumir(todas, sum(erros.values()), segundos), 'operacoes': por_operacao}
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PASTA_APP,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir(resultado, base=None):
+    print(f'{"operação":>14} {"req":>7} {"erros":>6} {"req/s":>9} {"p50 ms":>8} '
+          f'{"p95 ms":>8} {"p99 ms":>8}' + ('   Δp95     Δreq/s' if base else ''))
+    linhas = list(resultado['operacoes'].items()) + [('total', resultado['total'])]
+    for nome, r in linhas:
+        texto = (f'{nome:>14} {r["requisicoes"]:>7} {r["erros"]:>6} {r["vazao"]:>9.1f} '
+                 f'{r["p50_ms"]:>8.2f} {r["p95_ms"]:>8.2f} {r["p99_ms"]:>8.2f}')
+        anterior = (base['total'] if nome == 'total' else base['operacoes'].get(nome)) if base else None
+        if anterior:
+            texto += (f' {_variacao(r["p95_ms"], anterior["p95_ms"]):>8}'
+                      f' {_variacao(r["vazao"], anterior["vazao"]):>10}')
+        print(texto)
+
+
+def _variacao(atual, anterior):
+    if not anterior:
+        return '-'
+    return f'{(atual - anterior) / anterior * 100:+.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=10_000)
+    parser.add_argument('--segundos', type=float, default=10.0)
+    parser.add_argument('--aquecimento', type=float, default=1.0)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--mistura', default=MISTURA_PADRAO,
+                        help=f'pesos por operação (padrão: {MISTURA_PADRAO})')
+    parser.add_argument('--servidor', action='store_true',
+                        help='usa um servidor WSGI local em vez do test client')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', help='grava o resultado em JSON')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparar')
+    args = parser.parse_args()
+    mistura = ler_mistura(args.mistura)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Sem limite de login: todas as threads entram com o mesmo usuário e IP
+        app = create_app({'DATABASE': os.path.join(tmp, 'carga.db'),
+                          'DB_POOL_SIZE': max(5, args.threads),
+                          'LOGIN_THROTTLE_ENABLED': False})
+        print(f'Gerando {args.linhas} alunos...', file=sys.stderr)
+        with app.app_context():
+            conn = get_db_connection()
+            migrar(conn)
+            popular_sintetico(conn, args.linhas, args.semente)
+            conn.execute('INSERT INTO usuarios (username, password_hash) VALUES (?, ?)',
+                         (USUARIO[0], generate_password_hash(USUARIO[1])))
+            conn.commit()
+            conn.execute('ANALYZE')
+
+        servidor = None
+        if args.servidor:
+            logging.getLogger('werkzeug').setLevel(logging.WARNING)   # sem log por requisição
+            servidor = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=servidor.serve_forever, daemon=True).start()
+            base = f'http://127.0.0.1:{servidor.server_port}'
+            fazer_cliente = lambda: ClienteHTTP(base)
+        else:
+            fazer_cliente = lambda: ClienteTeste(app)
+
+        print(f'Rodando {args.segundos:.0f}s com {args.threads} threads '
+              f'({"servidor WSGI" if servidor else "test client"})...', file=sys.stderr)
+        try:
+            medicao = rodar_carga(fazer_cliente, mistura, args.threads, args.segundos,
+                                  args.aquecimento, args.linhas, args.semente)
+        finally:
+            if servidor:
+                servidor.shutdown()
+            if 'hash_executor' in app.extensions:
+                app.extensions['hash_executor'].shutdown()
+            if 'db_gravador' in app.extensions:
+                app.extensions['db_gravador'].fechar()
+
+    resultado = {
+        'commit': commit_atual(),
+        'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'parametros': {
+            'linhas': args.linhas, 'segundos': args.segundos, 'threads': args.threads,
+            'mistura': mistura, 'modo': 'servidor' if args.servidor else 'test_client',
+            'semente': args.semente,
+        },
+        **medicao,
+    }
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+        print(f'Comparando com {args.comparar} (commit {base.get("commit")})')
+    imprimir(resultado, base)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        print(f'Resultado gravado em {args.saida}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
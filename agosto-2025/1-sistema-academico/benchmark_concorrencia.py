@@ -0,0 +1,138 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from armazenamento import GravadorSerial, configurar_conexao
+from migracoes import migrar
+
+
+# Vazão de leitura e escrita com vários processos (como workers do gunicorn)
+# no mesmo alunos.db, antes (journal padrão, pragmas padrão, cada thread
+# escrevendo por conta própria) e depois (WAL + pragmas + gravador serial).
+# Uso: python benchmark_concorrencia.py [--workers 1 2 4 8 16] [--segundos 3]
+
+LEITURAS = (
+    ('SELECT * FROM alunos WHERE id > ? ORDER BY id LIMIT 50', lambda r: (r.randint(1, 10_000),)),
+    ('SELECT curso, total FROM curso_stats ORDER BY total DESC', lambda r: ()),
+    ('SELECT * FROM alunos WHERE id = ?', lambda r: (r.randint(1, 10_000),)),
+)
+
+
+def preparar_banco(caminho, otimizado, linhas=10_000):
+    conn = sqlite3.connect(caminho)
+    if otimizado:
+        configurar_conexao(conn)
+    migrar(conn)
+    rnd = random.Random(1)
+    conn.executemany('INSERT INTO alunos (nome, email, telefone, curso) VALUES (?, ?, ?, ?)',
+                     ((f'Aluno {i}', f'aluno{i}@email.com', None, f'Curso {rnd.randint(1, 5)}')
+                      for i in range(linhas)))
+    conn.commit()
+    conn.close()
+
+
+def worker(caminho, otimizado, segundos, leitores, escritores, resultados):
+    contagem = {'leituras': 0, 'escritas': 0, 'erros': 0}
+    lock = threading.Lock()
+    fim = time.perf_counter() + segundos
+
+    def conectar():
+        conn = sqlite3.connect(caminho, check_same_thread=False)
+        return configurar_conexao(conn) if otimizado else conn
+
+    gravador = GravadorSerial(conectar) if otimizado else None
+
+    def ler(semente):
+        rnd = random.Random(semente)
+        conn = conectar()
+        while time.perf_counter() < fim:
+            sql, params = rnd.choice(LEITURAS)
+            try:
+                conn.execute(sql, params(rnd)).fetchall()
+                chave = 'leituras'
+            except sqlite3.OperationalError:
+                chave = 'erros'
+            with lock:
+                contagem[chave] += 1
+
+    def escrever(semente):
+        rnd = random.Random(semente)
+        conn = None if gravador else conectar()
+        while time.perf_counter() < fim:
+            id = rnd.randint(1, 10_000)
+            curso = f'Curso {rnd.randint(1, 5)}'
+
+            def alterar(c):
+                c.execute('UPDATE alunos SET curso = ? WHERE id = ?', (curso, id))
+
+            try:
+                if gravador:
+                    gravador.executar(alterar)
+                else:
+                    alterar(conn)
+                    conn.commit()
+                chave = 'escritas'
+            except sqlite3.OperationalError:
+                if conn is not None:
+                    conn.rollback()
+                chave = 'erros'
+            with lock:
+                contagem[chave] += 1
+
+    base = os.getpid() * 100
+    threads = [threading.Thread(target=ler, args=(base + i,)) for i in range(leitores)]
+    threads += [threading.Thread(target=escrever, args=(base + 50 + i,)) for i in range(escritores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if gravador:
+        gravador.fechar()
+    resultados.put(contagem)
+
+
+def rodar(caminho, otimizado, workers, segundos, leitores, escritores):
+    resultados = multiprocessing.Queue()
+    processos = [multiprocessing.Process(target=worker,
+                                         args=(caminho, otimizado, segundos, leitores,
+                                               escritores, resultados))
+                 for _ in range(workers)]
+    for p in processos:
+        p.start()
+    total = {'leituras': 0, 'escritas': 0, 'erros': 0}
+    for _ in processos:
+        for chave, valor in resultados.get().items():
+            total[chave] += valor
+    for p in processos:
+        p.join()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--segundos', type=float, default=3.0)
+    parser.add_argument('--leitores', type=int, default=2, help='threads de leitura por worker')
+    parser.add_argument('--escritores', type=int, default=2, help='threads de escrita por worker')
+    args = parser.parse_args()
+
+    print(f'{"modo":>8} {"workers":>8} {"leituras/s":>12} {"escritas/s":>12} {"erros":>8}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for otimizado in (False, True):
+            modo = 'depois' if otimizado else 'antes'
+            caminho = os.path.join(tmp, f'{modo}.db')
+            preparar_banco(caminho, otimizado)
+            for workers in args.workers:
+                total = rodar(caminho, otimizado, workers, args.segundos,
+                              args.leitores, args.escritores)
+                print(f'{modo:>8} {workers:>8} {total["leituras"] / args.segundos:>12.0f} '
+                      f'{total["escritas"] / args.segundos:>12.0f} {total["erros"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
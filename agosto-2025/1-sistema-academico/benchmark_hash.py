@@ -0,0 +1,100 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+
+# Mede o quanto uma rajada de logins atrapalha as outras rotas, com o hash
+# de senha inline (HASH_WORKERS=0) e no pool de processos.
+# Uso: python benchmark_hash.py [--segundos 5] [--logins 16] [--leitores 4]
+
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+
+def rodar(app, workers, segundos, logins, leitores):
+    app.config['HASH_WORKERS'] = workers
+    antigo = app.extensions.pop('hash_executor', None)
+    if antigo:
+        antigo.shutdown()
+
+    fim = time.perf_counter() + segundos
+    latencias_leitura = []
+    respostas_login = {}
+    lock = threading.Lock()
+
+    def storm():
+        client = app.test_client()
+        while time.perf_counter() < fim:
+            r = client.post('/login', data={'username': 'bench', 'password': 'senha-bench'})
+            with lock:
+                respostas_login[r.status_code] = respostas_login.get(r.status_code, 0) + 1
+
+    def leitor():
+        client = app.test_client()
+        rotas = ['/', '/estatisticas', '/1']
+        i = 0
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            client.get(rotas[i % len(rotas)])
+            duracao = time.perf_counter() - inicio
+            with lock:
+                latencias_leitura.append(duracao * 1000)
+            i += 1
+
+    threads = [threading.Thread(target=storm) for _ in range(logins)]
+    threads += [threading.Thread(target=leitor) for _ in range(leitores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencias_leitura.sort()
+    p95 = latencias_leitura[int(len(latencias_leitura) * 0.95) - 1] if latencias_leitura else 0.0
+    return {
+        'workers': workers,
+        'leituras/s': len(latencias_leitura) / segundos,
+        'leitura p50 (ms)': statistics.median(latencias_leitura) if latencias_leitura else 0.0,
+        'leitura p95 (ms)': p95,
+        'logins/s': respostas_login.get(302, 0) / segundos,
+        'logins 503': respostas_login.get(503, 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--segundos', type=float, default=5.0)
+    parser.add_argument('--logins', type=int, default=16, help='threads fazendo login em loop')
+    parser.add_argument('--leitores', type=int, default=4, help='threads lendo outras rotas')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sys.path.insert(0, PASTA_APP)
+        from app import create_app, get_db_connection
+        from migracoes import migrar, popular
+        from werkzeug.security import generate_password_hash
+
+        # Sem limite de login: a rajada vem toda do mesmo usuário e IP
+        app = create_app({'DATABASE': os.path.join(tmp, 'bench.db'), 'TESTING': True,
+                          'LOGIN_THROTTLE_ENABLED': False})
+        with app.app_context():
+            conn = get_db_connection()
+            migrar(conn)
+            popular(conn)
+            conn.execute('INSERT INTO usuarios (username, password_hash) VALUES (?, ?)',
+                         ('bench', generate_password_hash('senha-bench')))
+            conn.commit()
+
+        for workers in (0, args.workers):
+            resultado = rodar(app, workers, args.segundos, args.logins, args.leitores)
+            print('  '.join(f'{k}={v:.1f}' if isinstance(v, float) else f'{k}={v}'
+                            for k, v in resultado.items()))
+
+        app.extensions['hash_executor'].shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+# Mede o tempo de subida de um processo novo: import do app, create_app e a
+# primeira requisição. Cada rodada é um processo Python separado, como um
+# worker do gunicorn iniciando.
+# Uso: python benchmark_inicio.py [--rodadas 10]
+
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+FILHO = '''
+import json, sys, time
+inicio = time.perf_counter()
+sys.path.insert(0, {pasta!r})
+import app as modulo
+importado = time.perf_counter()
+app = modulo.create_app()
+criado = time.perf_counter()
+resposta = app.test_client().get('/')
+pronto = time.perf_counter()
+assert resposta.status_code == 200, resposta.status_code
+print(json.dumps({{
+    'import': importado - inicio,
+    'create_app': criado - importado,
+    'primeira requisição': pronto - criado,
+    'total': pronto - inicio,
+}}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rodadas', type=int, default=10)
+    args = parser.parse_args()
+
+    sys.path.insert(0, PASTA_APP)
+    from app import create_app, get_db_connection
+    from migracoes import migrar, popular
+
+    with tempfile.TemporaryDirectory() as tmp:
+        banco = os.path.join(tmp, 'inicio.db')
+        app = create_app({'DATABASE': banco})
+        with app.app_context():
+            migrar(get_db_connection())
+            popular(get_db_connection())
+
+        env = dict(os.environ, FLASK_DATABASE=banco)
+        medidas = []
+        for _ in range(args.rodadas):
+            saida = subprocess.run([sys.executable, '-c', FILHO.format(pasta=PASTA_APP)],
+                                   env=env, capture_output=True, text=True, check=True)
+            medidas.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    for fase in medidas[0]:
+        valores = [m[fase] * 1000 for m in medidas]
+        print(f'{fase:>20}: mediana {statistics.median(valores):7.1f} ms'
+              f'  (min {min(valores):.1f}, max {max(valores):.1f})')
+
+
+if __name__ == '__main__':
+    main()
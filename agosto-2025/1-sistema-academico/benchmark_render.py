@@ -0,0 +1,79 @@
+import argparse
+import time
+
+from flask import render_template, render_template_string
+
+from app import create_app, urls_aluno, fragmento, get_cache_fragmentos
+
+
+# Tempo de renderização das linhas da tabela do index, em ms por 1000 linhas:
+# o template antigo (três url_for por linha), o fragmento com os modelos de
+# URL pré-calculados e o acerto no cache de fragmentos.
+# Uso: python benchmark_render.py [--linhas 1000 10000] [--rodadas 5]
+
+LINHAS_ANTIGAS = '''
+{% for aluno in alunos %}
+    <tr>
+        <td>{{ aluno['id'] }}</td>
+        <td>{{ aluno['nome'] }}</td>
+        <td>{{ aluno['email'] }}</td>
+        <td>{{ aluno['curso'] or '-' }}</td>
+        <td class="actions">
+            <a href="{{ url_for('.ver_aluno', id=aluno['id']) }}" class="btn view">Ver</a>
+            <a href="{{ url_for('.editar', id=aluno['id']) }}" class="btn edit">Editar</a>
+            <form action="{{ url_for('.deletar', id=aluno['id']) }}" method="post">
+                <button type="submit" class="btn delete" onclick="return confirm('Tem certeza que deseja deletar este aluno?')">Deletar</button>
+            </form>
+        </td>
+    </tr>
+{% endfor %}
+'''
+
+
+def alunos_sinteticos(linhas):
+    return [{'id': i, 'nome': f'Aluno {i}', 'email': f'aluno{i}@email.com',
+             'curso': 'Engenharia de Software'} for i in range(1, linhas + 1)]
+
+
+def medir(funcao, rodadas):
+    tempos = []
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, nargs='+', default=[1000, 10_000])
+    parser.add_argument('--rodadas', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app({'TESTING': True, 'HASH_WORKERS': 0})
+    print(f'{"linhas":>8} {"url_for/linha":>14} {"pré-calculado":>14} {"cache":>10}   (ms por 1k linhas)')
+    with app.test_request_context('/'):
+        for linhas in args.linhas:
+            alunos = alunos_sinteticos(linhas)
+            get_cache_fragmentos().clear()
+
+            def antigo():
+                render_template_string(LINHAS_ANTIGAS, alunos=alunos)
+
+            def novo():
+                render_template('_linhas_alunos.html', alunos=alunos, urls=urls_aluno())
+
+            def cache():
+                fragmento(('benchmark', linhas),
+                          lambda: (render_template('_linhas_alunos.html', alunos=alunos,
+                                                   urls=urls_aluno()),))
+
+            cache()   # aquece a entrada
+            por_mil = 1000 / linhas * 1000
+            print(f'{linhas:>8} {medir(antigo, args.rodadas) * por_mil:>14.2f} '
+                  f'{medir(novo, args.rodadas) * por_mil:>14.2f} '
+                  f'{medir(cache, args.rodadas) * por_mil:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import re
+import sqlite3
+
+
+# -------------------------------------------------------- Busca full-text (FTS5)
+# Índice FTS5 "external content" sobre alunos: o texto fica só na tabela
+# alunos e os triggers mantêm o índice em dia. O tokenizer unicode61 com
+# remove_diacritics faz "joao" achar "João" e "uchoa" achar "Uchôa"; o índice
+# de prefixo deixa "jo*" rápido mesmo com poucas letras digitadas.
+
+SQL_CRIAR_FTS = '''
+CREATE VIRTUAL TABLE alunos_fts USING fts5(
+    nome, email, curso,
+    content='alunos',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+)
+'''
+
+SQL_TRIGGERS_FTS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS alunos_fts_ai AFTER INSERT ON alunos BEGIN
+        INSERT INTO alunos_fts(rowid, nome, email, curso)
+        VALUES (new.id, new.nome, new.email, new.curso);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS alunos_fts_ad AFTER DELETE ON alunos BEGIN
+        INSERT INTO alunos_fts(alunos_fts, rowid, nome, email, curso)
+        VALUES ('delete', old.id, old.nome, old.email, old.curso);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS alunos_fts_au AFTER UPDATE OF nome, email, curso ON alunos BEGIN
+        INSERT INTO alunos_fts(alunos_fts, rowid, nome, email, curso)
+        VALUES ('delete', old.id, old.nome, old.email, old.curso);
+        INSERT INTO alunos_fts(rowid, nome, email, curso)
+        VALUES (new.id, new.nome, new.email, new.curso);
+    END;
+    ''',
+)
+
+# rank do FTS5 é o bm25: quanto menor, mais relevante
+SQL_BUSCA_FTS = '''
+SELECT alunos.*, alunos_fts.rank AS score
+FROM alunos_fts JOIN alunos ON alunos.id = alunos_fts.rowid
+WHERE alunos_fts MATCH ?
+'''
+
+
+def criar_indice_fts(conn):
+    # Retorna False se o SQLite não foi compilado com FTS5
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alunos_fts'"
+    ).fetchone()
+    if not existe:
+        try:
+            conn.execute(SQL_CRIAR_FTS)
+        except sqlite3.OperationalError:
+            return False
+        # Indexa o que já estava na tabela antes do índice existir
+        conn.execute("INSERT INTO alunos_fts(alunos_fts) VALUES ('rebuild')")
+    # Um execute por trigger: executescript faria COMMIT no meio da migração
+    for trigger in SQL_TRIGGERS_FTS:
+        conn.execute(trigger)
+    return True
+
+
+def indexar_fts_apos(conn, ultimo_id):
+    # Equivalente em lote do trigger alunos_fts_ai para as linhas com id > ultimo_id
+    conn.execute('''
+        INSERT INTO alunos_fts(rowid, nome, email, curso)
+        SELECT id, nome, email, curso FROM alunos WHERE id > ?
+    ''', (ultimo_id,))
+
+
+def fts_disponivel(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alunos_fts'"
+    ).fetchone() is not None
+
+
+def expressao_fts(termo):
+    # Cada palavra vira um prefixo entre aspas ("jo"*), todas obrigatórias.
+    # Aspas isolam o texto do usuário da sintaxe de consulta do FTS5.
+    palavras = re.findall(r'\w+', termo)
+    if not palavras:
+        return None
+    return ' '.join(f'"{p}"*' for p in palavras)
+
+
+def filtro_like(termo):
+    padrao = f'%{termo}%'
+    return '(nome LIKE ? OR email LIKE ? OR curso LIKE ?)', (padrao, padrao, padrao)
+
+
+def consulta_busca(termo, usar_fts):
+    # Devolve (sql, params, chave de ordenação). Com FTS5 a busca sai
+    # ordenada por relevância; sem ele, cai no LIKE ordenado por id.
+    if not termo:
+        return 'SELECT * FROM alunos', (), ('id',)
+    if usar_fts:
+        expressao = expressao_fts(termo)
+        if expressao:
+            return SQL_BUSCA_FTS, (expressao,), ('score', 'id')
+    where, params = filtro_like(termo)
+    return 'SELECT * FROM alunos WHERE ' + where, params, ('id',)
+# -------------------------------------------------------- END Busca full-text (FTS5)
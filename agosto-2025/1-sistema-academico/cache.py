@@ -0,0 +1,215 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# -------------------------------------------------------- Cache LRU com TTL
+# Cache em memória do processo, limitado por número de entradas (LRU) e por
+# idade (TTL). Seguro para threads; conta acertos, faltas e despejos.
+
+_AUSENTE = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, chave, default=None):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._dados.get(chave, _AUSENTE)
+            if item is _AUSENTE:
+                self.misses += 1
+                return default
+            valor, expira_em = item
+            if expira_em is not None and expira_em <= agora:
+                del self._dados[chave]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def set(self, chave, valor, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expira_em = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._dados[chave] = (valor, expira_em)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, chave):
+        with self._lock:
+            if self._dados.pop(chave, _AUSENTE) is not _AUSENTE:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._dados)
+            self._dados.clear()
+
+    def __len__(self):
+        return len(self._dados)
+
+    def stats(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'tamanho': len(self._dados),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / consultas if consultas else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+# -------------------------------------------------------- END Cache LRU com TTL
+
+
+# -------------------------------------------------------- Cache LRU em arquivo compartilhado
+# Mesma interface do LRUCache, mas guardado num arquivo SQLite separado do
+# banco principal: todos os workers da máquina leem e escrevem o mesmo
+# cache. Valores em JSON (só tipos simples). É um cache: erro de lock ou de
+# disco vira falta, nunca erro na requisição, e synchronous=OFF basta.
+
+SQL_CRIAR_CACHE = '''
+CREATE TABLE IF NOT EXISTS cache (
+    chave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL,
+    expira_em REAL,
+    usado_em REAL NOT NULL
+)
+'''
+
+# Acerto só reescreve usado_em se a marca tiver mais que isso (segundos):
+# evita uma escrita por leitura nas chaves quentes
+PRECISAO_USO = 1.0
+
+
+class CacheArquivo:
+    def __init__(self, caminho, maxsize=1024, ttl=60.0):
+        self.caminho = caminho
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.erros = 0
+
+    def _conexao(self):
+        # Uma conexão por processo: depois de um fork a herdada não serve
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=0.1, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            conn.execute(SQL_CRIAR_CACHE)
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_usado_em ON cache (usado_em)')
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, chave, default=None):
+        agora = time.time()
+        with self._lock:
+            try:
+                conn = self._conexao()
+                linha = conn.execute('SELECT valor, expira_em, usado_em FROM cache WHERE chave = ?',
+                                     (chave,)).fetchone()
+                if linha is None:
+                    self.misses += 1
+                    return default
+                valor, expira_em, usado_em = linha
+                if expira_em is not None and expira_em <= agora:
+                    conn.execute('DELETE FROM cache WHERE chave = ?', (chave,))
+                    self.expirations += 1
+                    self.misses += 1
+                    return default
+                if agora - usado_em > PRECISAO_USO:
+                    conn.execute('UPDATE cache SET usado_em = ? WHERE chave = ?', (agora, chave))
+                self.hits += 1
+                return json.loads(valor)
+            except sqlite3.Error:
+                self.erros += 1
+                self.misses += 1
+                return default
+
+    def set(self, chave, valor, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        agora = time.time()
+        expira_em = agora + ttl if ttl else None
+        with self._lock:
+            try:
+                conn = self._conexao()
+                conn.execute('INSERT OR REPLACE INTO cache (chave, valor, expira_em, usado_em) '
+                             'VALUES (?, ?, ?, ?)', (chave, json.dumps(valor), expira_em, agora))
+                excesso = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.maxsize
+                if excesso > 0:
+                    conn.execute('DELETE FROM cache WHERE chave IN '
+                                 '(SELECT chave FROM cache ORDER BY usado_em LIMIT ?)', (excesso,))
+                    self.evictions += excesso
+            except sqlite3.Error:
+                self.erros += 1
+
+    def invalidate(self, chave):
+        with self._lock:
+            try:
+                if self._conexao().execute('DELETE FROM cache WHERE chave = ?', (chave,)).rowcount:
+                    self.invalidations += 1
+            except sqlite3.Error:
+                self.erros += 1
+
+    def clear(self):
+        with self._lock:
+            try:
+                self.invalidations += self._conexao().execute('DELETE FROM cache').rowcount
+            except sqlite3.Error:
+                self.erros += 1
+
+    def __len__(self):
+        with self._lock:
+            try:
+                return self._conexao().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+            except sqlite3.Error:
+                return 0
+
+    def stats(self):
+        tamanho = len(self)
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'arquivo': self.caminho,
+                'tamanho': tamanho,
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / consultas if consultas else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'erros': self.erros,
+            }
+# -------------------------------------------------------- END Cache LRU em arquivo compartilhado
@@ -0,0 +1,93 @@
+import argparse
+import csv
+import io
+import json
+import sys
+import zlib
+
+from busca import consulta_busca, fts_disponivel
+from armazenamento import conectar
+
+
+# -------------------------------------------------------- Exportação de alunos
+# Gera CSV ou JSONL direto do cursor, em blocos de ~64 KB: a memória usada
+# não depende do tamanho da tabela. Com gzip, cada bloco é comprimido assim
+# que sai, sem montar o arquivo inteiro.
+
+COLUNAS = ('id', 'nome', 'email', 'telefone', 'curso', 'criado_em')
+TAMANHO_BLOCO = 64 * 1024
+
+
+def consulta_exportacao(conn, search_term):
+    sql, params, chave = consulta_busca(search_term, search_term and fts_disponivel(conn))
+    return (f'SELECT {", ".join(COLUNAS)} FROM ({sql}) ORDER BY {", ".join(chave)}', params)
+
+
+def gerar_csv(cursor):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUNAS)
+    for linha in cursor:
+        writer.writerow(tuple(linha))
+        if buffer.tell() >= TAMANHO_BLOCO:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gerar_jsonl(cursor):
+    bloco = []
+    tamanho = 0
+    for linha in cursor:
+        texto = json.dumps(dict(zip(COLUNAS, linha)), ensure_ascii=False) + '\n'
+        bloco.append(texto)
+        tamanho += len(texto)
+        if tamanho >= TAMANHO_BLOCO:
+            yield ''.join(bloco)
+            bloco.clear()
+            tamanho = 0
+    yield ''.join(bloco)
+
+
+GERADORES = {'csv': gerar_csv, 'jsonl': gerar_jsonl}
+MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+def codificar(blocos, gzip=False):
+    # wbits=31 produz o formato gzip (cabeçalho + deflate + crc)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    for bloco in blocos:
+        dados = bloco.encode('utf-8')
+        if compressor:
+            dados = compressor.compress(dados)
+        if dados:
+            yield dados
+    if compressor:
+        yield compressor.flush()
+
+
+def exportar_alunos(conn, formato='csv', search_term='', gzip=False):
+    sql, params = consulta_exportacao(conn, search_term)
+    return codificar(GERADORES[formato](conn.execute(sql, params)), gzip)
+# -------------------------------------------------------- END Exportação de alunos
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exporta alunos em CSV ou JSONL')
+    parser.add_argument('--banco', default='alunos.db')
+    parser.add_argument('--formato', choices=GERADORES, default='csv')
+    parser.add_argument('--search', default='', help='mesmo filtro da busca da página inicial')
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('-o', '--saida', help='arquivo de saída (padrão: stdout)')
+    args = parser.parse_args()
+
+    conn = conectar(args.banco)
+    saida = open(args.saida, 'wb') if args.saida else sys.stdout.buffer
+    try:
+        for dados in exportar_alunos(conn, args.formato, args.search.strip(), args.gzip):
+            saida.write(dados)
+    finally:
+        if args.saida:
+            saida.close()
+        conn.close()
@@ -0,0 +1,123 @@
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from armazenamento import conectar
+from busca import SQL_TRIGGERS_FTS, indexar_fts_apos
+from migracoes import migrar
+from resumo_cursos import SQL_TRIGGERS_RESUMO, somar_resumo_apos
+from versoes import SQL_CRIAR_VERSOES, registrar_versoes_apos
+from alteracoes import SQL_CRIAR_ALTERACOES, registrar_alteracoes_apos
+
+
+# -------------------------------------------------------- Gerador de alunos sintéticos
+# Gera N alunos com nomes, emails, telefones, cursos e datas de matrícula
+# plausíveis, sempre iguais para a mesma semente. Insere com executemany em
+# lotes numa transação só. Os triggers de INSERT (FTS, curso_stats, versões, log)
+# custam ~8x a própria inserção quando disparam linha a linha: dentro da
+# transação eles são removidos, as tabelas derivadas são atualizadas numa
+# passada em lote no fim e os triggers são recriados antes do commit, então
+# nenhuma outra conexão vê o banco sem eles.
+
+NOMES = ['João', 'Maria', 'Carlos', 'Ana', 'Pedro', 'Juliana', 'Marcos', 'Fernanda',
+         'Ricardo', 'Patrícia', 'Lucas', 'Amanda', 'Gustavo', 'Isabela', 'André', 'Letícia',
+         'Rafael', 'Camila', 'Bruno', 'Beatriz', 'Diego', 'Larissa', 'Felipe', 'Gabriela',
+         'Thiago', 'Mariana', 'Eduardo', 'Vanessa', 'Rodrigo', 'Natália', 'Otávio', 'Débora']
+SOBRENOMES = ['Silva', 'Oliveira', 'Souza', 'Costa', 'Santos', 'Pereira', 'Lima', 'Rocha',
+              'Alves', 'Gomes', 'Martins', 'Barbosa', 'Uchôa', 'Guimarães', 'Conceição', 'Ribeiro',
+              'Carvalho', 'Ferreira', 'Almeida', 'Nunes', 'Teixeira', 'Mendes', 'Castro', 'Moreira']
+CURSOS = ['Engenharia de Software', 'Ciência da Computação', 'Sistemas de Informação',
+          'Engenharia da Computação', 'Análise de Sistemas']
+# Pesos dos cursos (nem todo curso tem o mesmo tamanho) e fração sem curso
+PESOS_CURSOS = [30, 25, 20, 15, 10]
+SEM_CURSO = 0.02
+DOMINIOS = ['email.com', 'aluno.edu.br', 'gmail.com', 'outlook.com']
+
+SQL_INSERIR = 'INSERT INTO alunos (nome, email, telefone, curso, criado_em) VALUES (?, ?, ?, ?, ?)'
+
+# (trigger de INSERT, SQL que o recria, equivalente em lote)
+TRIGGERS_INSERCAO = (
+    ('alunos_fts_ai', SQL_TRIGGERS_FTS, indexar_fts_apos),
+    ('curso_stats_ai', SQL_TRIGGERS_RESUMO, somar_resumo_apos),
+    ('versoes_alunos_ai', SQL_CRIAR_VERSOES, registrar_versoes_apos),
+    ('alteracoes_alunos_ai', SQL_CRIAR_ALTERACOES, registrar_alteracoes_apos),
+)
+
+
+def sem_acento(texto):
+    return texto.translate(str.maketrans('áâãàéêíóôõúüçÁÂÃÀÉÊÍÓÔÕÚÜÇ', 'aaaaeeiooouucAAAAEEIOOOUUC'))
+
+
+def gerar_alunos(linhas, semente=42, inicio=0, anos=4):
+    rnd = random.Random(semente)
+    agora = datetime(2025, 8, 1)
+    segundos = anos * 365 * 24 * 3600
+    for i in range(inicio, inicio + linhas):
+        nome = rnd.choice(NOMES)
+        sobrenomes = rnd.sample(SOBRENOMES, rnd.choice((1, 1, 2)))
+        nome_completo = ' '.join([nome, *sobrenomes])
+        # O índice no email garante unicidade (idx_alunos_email)
+        email = sem_acento(f'{nome}.{sobrenomes[-1]}.{i}@{rnd.choice(DOMINIOS)}').lower()
+        telefone = (f'({rnd.randint(11, 99)}) 9{rnd.randint(1000, 9999)}-{rnd.randint(1000, 9999)}'
+                    if rnd.random() < 0.8 else None)
+        curso = None if rnd.random() < SEM_CURSO else rnd.choices(CURSOS, PESOS_CURSOS)[0]
+        criado_em = agora - timedelta(seconds=rnd.randrange(segundos))
+        yield (nome_completo, email, telefone, curso, criado_em.strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def popular_sintetico(conn, linhas, semente=42, lote=50_000, progresso=None):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Continua a numeração dos emails a partir do maior id, para poder
+        # rodar de novo no mesmo banco sem bater no índice único
+        ultimo_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM alunos').fetchone()[0]
+        existentes = {linha[0] for linha in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        triggers = [t for t in TRIGGERS_INSERCAO if t[0] in existentes]
+        for nome, _, _ in triggers:
+            conn.execute(f'DROP TRIGGER {nome}')
+
+        alunos = gerar_alunos(linhas, semente + ultimo_id, ultimo_id)
+        inseridos = 0
+        while inseridos < linhas:
+            bloco = [next(alunos) for _ in range(min(lote, linhas - inseridos))]
+            conn.executemany(SQL_INSERIR, bloco)
+            inseridos += len(bloco)
+            if progresso:
+                progresso(inseridos)
+
+        for _, criar, em_lote in triggers:
+            em_lote(conn, ultimo_id)
+            for sql in criar:
+                conn.execute(sql)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return inseridos
+# -------------------------------------------------------- END Gerador de alunos sintéticos
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera alunos sintéticos para testes de carga')
+    parser.add_argument('--banco', default='alunos.db')
+    parser.add_argument('--linhas', type=int, default=10_000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--lote', type=int, default=50_000, help='linhas por executemany')
+    args = parser.parse_args()
+
+    conn = conectar(args.banco)
+    migrar(conn)
+    inicio = time.perf_counter()
+
+    def progresso(inseridos):
+        decorrido = time.perf_counter() - inicio
+        print(f'\r{inseridos}/{args.linhas} alunos ({inseridos / decorrido:.0f}/s)',
+              end='', file=sys.stderr, flush=True)
+
+    inseridos = popular_sintetico(conn, args.linhas, args.semente, args.lote, progresso)
+    conn.execute('ANALYZE')
+    conn.close()
+    print(f'\n{inseridos} alunos gerados em {time.perf_counter() - inicio:.1f}s.', file=sys.stderr)
@@ -0,0 +1,225 @@
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+
+from armazenamento import conectar
+
+
+# -------------------------------------------------------- Importação em massa de alunos
+# Lê CSV ou JSONL linha a linha (memória constante), valida como a rota
+# adicionar e insere com executemany em lotes. A cada transação o progresso
+# é gravado em importacoes junto com os dados, então depois de uma falha
+# dá para retomar exatamente de onde parou.
+
+SQL_CRIAR_IMPORTACOES = '''
+CREATE TABLE IF NOT EXISTS importacoes (
+    nome TEXT PRIMARY KEY,
+    linhas_processadas INTEGER NOT NULL DEFAULT 0,
+    inseridas INTEGER NOT NULL DEFAULT 0,
+    rejeitadas INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'em andamento',
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+# OR IGNORE: email já cadastrado (índice único) conta como linha rejeitada
+SQL_INSERIR = 'INSERT OR IGNORE INTO alunos (nome, email, telefone, curso) VALUES (?, ?, ?, ?)'
+
+
+class ErroImportacao(Exception):
+    pass
+
+
+def ler_linhas(arquivo, formato):
+    # arquivo: stream de texto já aberto
+    if formato == 'csv':
+        yield from csv.DictReader(arquivo)
+    elif formato == 'jsonl':
+        for linha in arquivo:
+            if not linha.strip():
+                continue
+            try:
+                yield json.loads(linha)
+            except json.JSONDecodeError:
+                # Linha inválida conta como rejeitada, não derruba a importação
+                yield None
+    else:
+        raise ErroImportacao(f'Formato desconhecido: {formato}')
+
+
+def chave_importacao(caminho, nome):
+    # Checkpoint por conteúdo, não só pelo nome: outro arquivo com o mesmo
+    # nome não pode retomar (e pular linhas) do progresso deste
+    digest = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            digest.update(bloco)
+    return f'{nome} sha256:{digest.hexdigest()[:16]} {os.path.getsize(caminho)}'
+
+
+def formato_do_arquivo(nome):
+    return 'jsonl' if nome.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+class CampoInvalido(ValueError):
+    pass
+
+
+def campo_texto(linha, campo):
+    # JSON pode trazer lista ou objeto; para o SQLite só vai texto ou número
+    valor = linha.get(campo)
+    if valor is None:
+        return ''
+    if isinstance(valor, bool) or not isinstance(valor, (str, int, float)):
+        raise CampoInvalido(f'O campo "{campo}" deve ser texto ou número.')
+    return str(valor)
+
+
+def validar(linha):
+    # Mesma regra do formulário: nome e email obrigatórios. Devolve None sem
+    # eles e levanta CampoInvalido para um campo que não é texto nem número.
+    if not isinstance(linha, dict):
+        return None
+    nome = campo_texto(linha, 'nome').strip()
+    email = campo_texto(linha, 'email').strip()
+    telefone = campo_texto(linha, 'telefone')
+    curso = campo_texto(linha, 'curso')
+    if not nome or not email:
+        return None
+    return (nome, email, telefone or None, curso or None)
+
+
+def importar_alunos(conn, linhas, nome, lote=1000, lotes_por_transacao=10,
+                    retomar=False, progresso=None, max_erros=20):
+    conn.execute(SQL_CRIAR_IMPORTACOES)
+    estado = conn.execute('SELECT * FROM importacoes WHERE nome = ?', (nome,)).fetchone()
+    pular = 0
+    inseridas = rejeitadas = 0
+    if estado and retomar:
+        pular = estado[1]
+        inseridas, rejeitadas = estado[2], estado[3]
+    conn.execute('''
+        INSERT INTO importacoes (nome, linhas_processadas, inseridas, rejeitadas, status)
+        VALUES (?, ?, ?, ?, 'em andamento')
+        ON CONFLICT (nome) DO UPDATE SET
+            linhas_processadas = excluded.linhas_processadas,
+            inseridas = excluded.inseridas,
+            rejeitadas = excluded.rejeitadas,
+            status = excluded.status,
+            atualizado_em = CURRENT_TIMESTAMP
+    ''', (nome, pular, inseridas, rejeitadas))
+    conn.commit()
+
+    erros = []
+    processadas = pular
+    buffer = []
+    lotes_na_transacao = 0
+    inicio = time.perf_counter()
+    importadas_agora = 0
+
+    def gravar_lote():
+        nonlocal lotes_na_transacao, inseridas, rejeitadas, importadas_agora
+        if buffer:
+            gravadas = conn.executemany(SQL_INSERIR, buffer).rowcount
+            inseridas += gravadas
+            rejeitadas += len(buffer) - gravadas
+            importadas_agora += gravadas
+            buffer.clear()
+        lotes_na_transacao += 1
+
+    def checkpoint():
+        nonlocal lotes_na_transacao
+        conn.execute('''
+            UPDATE importacoes SET linhas_processadas = ?, inseridas = ?, rejeitadas = ?,
+                atualizado_em = CURRENT_TIMESTAMP
+            WHERE nome = ?
+        ''', (processadas, inseridas, rejeitadas, nome))
+        conn.commit()
+        lotes_na_transacao = 0
+        if progresso:
+            decorrido = time.perf_counter() - inicio
+            progresso(processadas, inseridas, rejeitadas,
+                      importadas_agora / decorrido if decorrido else 0.0)
+
+    try:
+        for numero, linha in enumerate(linhas, 1):
+            if numero <= pular:
+                continue
+            try:
+                aluno = validar(linha)
+            except CampoInvalido:
+                aluno = None
+            processadas = numero
+            if aluno is None:
+                rejeitadas += 1
+                if len(erros) < max_erros:
+                    erros.append(numero)
+                continue
+            buffer.append(aluno)
+            if len(buffer) >= lote:
+                gravar_lote()
+                if lotes_na_transacao >= lotes_por_transacao:
+                    checkpoint()
+        gravar_lote()
+        checkpoint()
+    except Exception:
+        # Desfaz só a transação corrente; o checkpoint anterior continua valendo
+        conn.rollback()
+        conn.execute("UPDATE importacoes SET status = 'falhou' WHERE nome = ?", (nome,))
+        conn.commit()
+        raise
+
+    conn.execute("UPDATE importacoes SET status = 'concluida' WHERE nome = ?", (nome,))
+    conn.commit()
+
+    decorrido = time.perf_counter() - inicio
+    return {
+        'processadas': processadas,
+        'inseridas': inseridas,
+        'rejeitadas': rejeitadas,
+        'linhas_rejeitadas': erros,
+        'segundos': decorrido,
+        'linhas_por_segundo': importadas_agora / decorrido if decorrido else 0.0,
+    }
+
+
+def abrir_texto(stream_binario):
+    # Upload do Flask vem em bytes; utf-8-sig aceita CSV exportado pelo Excel
+    return io.TextIOWrapper(stream_binario, encoding='utf-8-sig', newline='')
+# -------------------------------------------------------- END Importação em massa de alunos
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Importa alunos de um arquivo CSV ou JSONL')
+    parser.add_argument('arquivo')
+    parser.add_argument('--banco', default='alunos.db')
+    parser.add_argument('--formato', choices=('csv', 'jsonl'))
+    parser.add_argument('--lote', type=int, default=1000)
+    parser.add_argument('--lotes-por-transacao', type=int, default=10)
+    parser.add_argument('--retomar', action='store_true',
+                        help='continua do último checkpoint deste arquivo')
+    args = parser.parse_args()
+
+    formato = args.formato or formato_do_arquivo(args.arquivo)
+
+    def mostrar(processadas, inseridas, rejeitadas, por_segundo):
+        print(f'\r{processadas} linhas | {inseridas} inseridas | {rejeitadas} rejeitadas'
+              f' | {por_segundo:.0f} linhas/s', end='', flush=True)
+
+    conn = conectar(args.banco)
+    with open(args.arquivo, encoding='utf-8-sig', newline='') as arquivo:
+        resultado = importar_alunos(conn, ler_linhas(arquivo, formato),
+                                    chave_importacao(args.arquivo, args.arquivo),
+                                    lote=args.lote, lotes_por_transacao=args.lotes_por_transacao,
+                                    retomar=args.retomar, progresso=mostrar)
+    conn.close()
+    print()
+    print(f"Importação concluída: {resultado['inseridas']} inseridas, "
+          f"{resultado['rejeitadas']} rejeitadas em {resultado['segundos']:.1f}s "
+          f"({resultado['linhas_por_segundo']:.0f} linhas/s)")
+    if resultado['linhas_rejeitadas']:
+        print('Primeiras linhas rejeitadas:', ', '.join(map(str, resultado['linhas_rejeitadas'])))
@@ -1,8 +1,9 @@
-from app import app, get_db_connection
+from app import create_app, get_db_connection
 from werkzeug.security import generate_password_hash
 import sqlite3
 
 def criar_usuario_admin():
+    app = create_app()
     with app.app_context():
         conn = get_db_connection()
         try:
@@ -11,13 +12,14 @@ def criar_usuario_admin():
                 ('bybenb', generate_password_hash('raizoku'), 1)
             )
             conn.commit()
+            # Processo à parte: o cache de usuários do servidor não é limpo
+            # daqui, e uma entrada antiga vive até USER_CACHE_TTL segundos
             print("Usuário admin criado com sucesso!")
             print("Usuário: bybenb")
             print("Senha: raizoku")
         except sqlite3.IntegrityError:
+            conn.rollback()
             print("⚠️ O usuário admin já existe!")
-        finally:
-            conn.close()
 
 if __name__ == '__main__':
     criar_usuario_admin()
\ No newline at end of file
@@ -0,0 +1,217 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# -------------------------------------------------------- Janelas deslizantes
+# Contagem aproximada de tentativas por chave numa janela deslizante: guarda
+# só o total da janela fixa atual e o da anterior, e estima
+#     anterior * (fração da janela anterior ainda dentro) + atual
+# Memória constante por chave, e o estado cabe numa linha de SQLite para ser
+# dividido entre os workers.
+#
+# tentar(chave, limite, janela) soma uma tentativa e devolve 0, ou, se a
+# chave já chegou no limite, não soma e devolve quantos segundos faltam para
+# liberar.
+
+def _estimar(estado, janela, agora):
+    # estado: (inicio da janela atual, atual, anterior), já avançado para agora
+    inicio, atual, anterior = estado
+    return anterior * (1 - (agora - inicio) / janela) + atual
+
+def _avancar(estado, janela, agora):
+    if estado is None:
+        return (agora - agora % janela, 0, 0)
+    inicio, atual, anterior = estado
+    passadas = int((agora - inicio) // janela)
+    if passadas <= 0:
+        return estado
+    # Uma janela: a atual vira a anterior; mais que isso, as duas zeram
+    return (inicio + passadas * janela, 0, atual if passadas == 1 else 0)
+
+def _espera(estado, limite, janela, agora):
+    inicio, atual, anterior = estado
+    if atual >= limite:
+        # Só libera na janela seguinte, quando a parte herdada cair abaixo do limite
+        return inicio + janela - agora + janela * (1 - limite / atual)
+    # anterior * (1 - (t - inicio) / janela) + atual < limite
+    return inicio + janela * (1 - (limite - atual) / anterior) - agora
+
+
+class JanelasMemoria:
+    # Por processo; as chaves menos usadas saem depois de maxsize (um IP por
+    # requisição não enche a memória)
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.erros = 0
+
+    def tentar(self, chave, limite, janela):
+        agora = time.time()
+        with self._lock:
+            estado = _avancar(self._dados.get(chave), janela, agora)
+            if _estimar(estado, janela, agora) >= limite:
+                self._dados[chave] = estado
+                self._dados.move_to_end(chave)
+                return max(_espera(estado, limite, janela, agora), 0.0)
+            inicio, atual, anterior = estado
+            self._dados[chave] = (inicio, atual + 1, anterior)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+            return 0.0
+
+    def limpar(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def __len__(self):
+        return len(self._dados)
+
+
+SQL_CRIAR_JANELAS = '''
+CREATE TABLE IF NOT EXISTS janelas (
+    chave TEXT PRIMARY KEY,
+    inicio REAL NOT NULL,
+    atual INTEGER NOT NULL,
+    anterior INTEGER NOT NULL,
+    expira_em REAL NOT NULL
+)
+'''
+
+# Uma limpeza das chaves vencidas a cada tantas tentativas
+LIMPEZA_A_CADA = 1000
+
+
+class JanelasArquivo:
+    # Mesmo contrato, num arquivo SQLite separado do banco e dividido por
+    # todos os workers da máquina. Erro de lock ou de disco não derruba o
+    # login, mas também não libera a tentativa: ela conta em erros e numa
+    # janela em memória do processo, com o mesmo limite.
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._reserva = JanelasMemoria()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._operacoes = 0
+        self.erros = 0
+
+    def _conexao(self):
+        # Uma conexão por processo: depois de um fork a herdada não serve
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=0.1, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            conn.execute(SQL_CRIAR_JANELAS)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def tentar(self, chave, limite, janela):
+        agora = time.time()
+        reserva, chave = chave, '\x1f'.join(chave)
+        with self._lock:
+            try:
+                conn = self._conexao()
+                # Leitura e escrita na mesma transação: dois workers não
+                # somam a mesma vaga
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    linha = conn.execute('SELECT inicio, atual, anterior FROM janelas WHERE chave = ?',
+                                         (chave,)).fetchone()
+                    estado = _avancar(linha, janela, agora)
+                    if _estimar(estado, janela, agora) >= limite:
+                        espera = max(_espera(estado, limite, janela, agora), 0.0)
+                    else:
+                        espera = 0.0
+                        inicio, atual, anterior = estado
+                        conn.execute('INSERT OR REPLACE INTO janelas VALUES (?, ?, ?, ?, ?)',
+                                     (chave, inicio, atual + 1, anterior, inicio + 2 * janela))
+                    self._operacoes += 1
+                    if self._operacoes % LIMPEZA_A_CADA == 0:
+                        conn.execute('DELETE FROM janelas WHERE expira_em < ?', (agora,))
+                    conn.execute('COMMIT')
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+                return espera
+            except sqlite3.Error:
+                self.erros += 1
+                return self._reserva.tentar(reserva, limite, janela)
+
+    def limpar(self, chave):
+        self._reserva.limpar(chave)
+        with self._lock:
+            try:
+                self._conexao().execute('DELETE FROM janelas WHERE chave = ?', ('\x1f'.join(chave),))
+            except sqlite3.Error:
+                self.erros += 1
+
+    def __len__(self):
+        with self._lock:
+            try:
+                return self._conexao().execute('SELECT COUNT(*) FROM janelas').fetchone()[0]
+            except sqlite3.Error:
+                return 0
+# -------------------------------------------------------- END Janelas deslizantes
+
+
+# -------------------------------------------------------- Limite de tentativas de login
+# Cada POST /login conta uma tentativa para o IP e uma para o usuário
+# informado antes de qualquer consulta ou hash. Passou do limite em
+# qualquer um dos dois, a resposta é 429 na hora. Login certo zera a conta
+# do usuário (não a do IP).
+
+RESULTADOS = ('sucesso', 'falha', 'desconhecido', 'bloqueado_ip', 'bloqueado_usuario')
+
+
+class LimitadorLogin:
+    def __init__(self, janelas, limite_ip=20, janela_ip=60.0, limite_usuario=5,
+                 janela_usuario=300.0):
+        self.janelas = janelas
+        self.limite_ip = limite_ip
+        self.janela_ip = janela_ip
+        self.limite_usuario = limite_usuario
+        self.janela_usuario = janela_usuario
+        self._lock = threading.Lock()
+        self.resultados = dict.fromkeys(RESULTADOS, 0)
+
+    def tentar(self, ip, usuario):
+        # Segundos até liberar (inteiro, para o Retry-After); 0 = pode tentar
+        espera = self.janelas.tentar(('ip', ip), self.limite_ip, self.janela_ip)
+        if espera:
+            self.contar('bloqueado_ip')
+            return math.ceil(espera)
+        espera = self.janelas.tentar(('usuario', usuario), self.limite_usuario, self.janela_usuario)
+        if espera:
+            self.contar('bloqueado_usuario')
+            return math.ceil(espera)
+        return 0
+
+    def sucesso(self, usuario):
+        self.janelas.limpar(('usuario', usuario))
+        self.contar('sucesso')
+
+    def contar(self, resultado):
+        with self._lock:
+            self.resultados[resultado] += 1
+
+    def stats(self):
+        chaves = len(self.janelas)
+        with self._lock:
+            return {
+                'store': 'arquivo' if isinstance(self.janelas, JanelasArquivo) else 'memoria',
+                'chaves': chaves,
+                'erros': self.janelas.erros,
+                'limite_ip': self.limite_ip,
+                'janela_ip': self.janela_ip,
+                'limite_usuario': self.limite_usuario,
+                'janela_usuario': self.janela_usuario,
+                **self.resultados,
+            }
+# -------------------------------------------------------- END Limite de tentativas de login
@@ -0,0 +1,294 @@
+import bisect
+import sqlite3
+import threading
+import time
+
+from perfilador import somar_tempo
+
+
+# -------------------------------------------------------- Instrumentação e métricas Prometheus
+# Registro em memória do processo: latência por rota (histograma), tempo e
+# linhas por comando SQL, tempo de renderização por template e contagem de
+# conexões. Cada observação é um incremento sob um lock, barato o bastante
+# para ficar ligado em produção. Com vários workers cada processo tem o seu
+# registro; o Prometheus soma as séries pelo label de instância.
+#
+# O SQL é medido por ConexaoInstrumentada (factory do sqlite3.connect): o
+# tempo cobre o execute e os fetchone/fetchall; linhas lidas iterando o
+# cursor são contadas, mas o tempo da iteração não entra (custaria uma
+# chamada de relógio por linha).
+
+BUCKETS_PADRAO = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Acima disso os comandos novos caem todos em OUTROS_SQL (SQL montado com
+# valores no texto não pode crescer o registro sem limite)
+MAX_COMANDOS_SQL = 500
+OUTROS_SQL = '(outros)'
+
+
+class Histograma:
+    __slots__ = ('buckets', 'contagens', 'soma', 'total')
+
+    def __init__(self, buckets=BUCKETS_PADRAO):
+        self.buckets = buckets
+        self.contagens = [0] * len(buckets)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        indice = bisect.bisect_left(self.buckets, valor)
+        if indice < len(self.contagens):
+            self.contagens[indice] += 1
+        self.soma += valor
+        self.total += 1
+
+    def acumulados(self):
+        acumulado = 0
+        for limite, contagem in zip(self.buckets, self.contagens):
+            acumulado += contagem
+            yield limite, acumulado
+        yield '+Inf', self.total
+
+
+class EstatisticaSQL:
+    __slots__ = ('execucoes', 'tempo_total', 'tempo_max', 'linhas')
+
+    def __init__(self):
+        self.execucoes = 0
+        self.tempo_total = 0.0
+        self.tempo_max = 0.0
+        self.linhas = 0
+
+
+class Metricas:
+    def __init__(self, lento=None, logger=None):
+        # lento: segundos; comandos acima disso vão para logger.warning
+        self.lento = lento
+        self.logger = logger
+        self._lock = threading.Lock()
+        self.requisicoes = {}       # (rota, método, status) -> contagem
+        self.latencias = {}         # (rota, método) -> Histograma
+        self.templates = {}         # nome -> Histograma
+        self.sql = {}               # comando normalizado -> EstatisticaSQL
+        self._normalizados = {}     # texto original -> comando normalizado
+        self.conexoes_abertas = 0
+        self.conexoes_fechadas = 0
+
+    # ---- requisições e templates
+    def registrar_requisicao(self, rota, metodo, status, duracao):
+        with self._lock:
+            chave = (rota, metodo, status)
+            self.requisicoes[chave] = self.requisicoes.get(chave, 0) + 1
+            histograma = self.latencias.get((rota, metodo))
+            if histograma is None:
+                histograma = self.latencias[(rota, metodo)] = Histograma()
+            histograma.observar(duracao)
+
+    def registrar_template(self, nome, duracao):
+        with self._lock:
+            histograma = self.templates.get(nome)
+            if histograma is None:
+                histograma = self.templates[nome] = Histograma()
+            histograma.observar(duracao)
+
+    # ---- SQL
+    def _normalizar(self, sql):
+        comando = self._normalizados.get(sql)
+        if comando is None:
+            comando = ' '.join(sql.split())
+            if len(self.sql) >= MAX_COMANDOS_SQL and comando not in self.sql:
+                comando = OUTROS_SQL
+            if len(self._normalizados) < MAX_COMANDOS_SQL * 4:
+                self._normalizados[sql] = comando
+        return comando
+
+    def registrar_sql(self, sql, duracao, linhas=0):
+        somar_tempo('sql', duracao)
+        with self._lock:
+            comando = self._normalizar(sql)
+            estatistica = self.sql.get(comando)
+            if estatistica is None:
+                estatistica = self.sql[comando] = EstatisticaSQL()
+            estatistica.execucoes += 1
+            estatistica.tempo_total += duracao
+            estatistica.tempo_max = max(estatistica.tempo_max, duracao)
+            if linhas > 0:
+                estatistica.linhas += linhas
+        if self.lento is not None and duracao >= self.lento and self.logger:
+            self.logger.warning('SQL lento (%.1f ms): %s', duracao * 1000, ' '.join(sql.split()))
+
+    def registrar_linhas(self, sql, linhas, duracao=0.0):
+        # Linhas (e tempo) de fetch, somados ao comando já contado no execute
+        somar_tempo('sql', duracao)
+        with self._lock:
+            estatistica = self.sql.get(self._normalizar(sql))
+            if estatistica is not None:
+                estatistica.linhas += linhas
+                estatistica.tempo_total += duracao
+
+    # ---- conexões
+    def conexao_aberta(self):
+        with self._lock:
+            self.conexoes_abertas += 1
+
+    def conexao_fechada(self):
+        with self._lock:
+            self.conexoes_fechadas += 1
+
+    def classe_conexao(self):
+        # Subclasse de sqlite3.Connection ligada a este registro, para usar
+        # como factory= do sqlite3.connect
+        cursor = type('Cursor', (CursorInstrumentado,), {'metricas': self})
+        return type('Conexao', (ConexaoInstrumentada,), {'metricas': self, 'classe_cursor': cursor})
+
+    # ---- exposição
+    def texto_prometheus(self, extras=()):
+        # extras: iterável de (nome, tipo, ajuda, [(labels, valor), ...])
+        linhas = []
+
+        def familia(nome, tipo, ajuda, amostras):
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} {tipo}')
+            for sufixo, labels, valor in amostras:
+                linhas.append(f'{nome}{sufixo}{_labels(labels)} {_numero(valor)}')
+
+        def histogramas(nome, ajuda, por_labels):
+            amostras = []
+            for labels, histograma in por_labels:
+                for limite, acumulado in histograma.acumulados():
+                    amostras.append(('_bucket', {**labels, 'le': limite}, acumulado))
+                amostras.append(('_sum', labels, histograma.soma))
+                amostras.append(('_count', labels, histograma.total))
+            familia(nome, 'histogram', ajuda, amostras)
+
+        with self._lock:
+            familia('academico_requisicoes_total', 'counter', 'Requisições por rota, método e status',
+                    [('', {'rota': r, 'metodo': m, 'status': s}, n)
+                     for (r, m, s), n in sorted(self.requisicoes.items())])
+            histogramas('academico_requisicao_segundos', 'Latência por rota',
+                        [({'rota': r, 'metodo': m}, h) for (r, m), h in sorted(self.latencias.items())])
+            histogramas('academico_template_segundos', 'Tempo de renderização por template',
+                        [({'template': t}, h) for t, h in sorted(self.templates.items())])
+            sql = sorted(self.sql.items())
+            familia('academico_sql_execucoes_total', 'counter', 'Execuções por comando SQL',
+                    [('', {'sql': c}, e.execucoes) for c, e in sql])
+            familia('academico_sql_segundos_total', 'counter', 'Tempo acumulado por comando SQL',
+                    [('', {'sql': c}, e.tempo_total) for c, e in sql])
+            familia('academico_sql_segundos_max', 'gauge', 'Maior tempo de uma execução do comando',
+                    [('', {'sql': c}, e.tempo_max) for c, e in sql])
+            familia('academico_sql_linhas_total', 'counter', 'Linhas lidas ou alteradas por comando SQL',
+                    [('', {'sql': c}, e.linhas) for c, e in sql])
+            familia('academico_conexoes_abertas_total', 'counter', 'Conexões SQLite abertas',
+                    [('', {}, self.conexoes_abertas)])
+            familia('academico_conexoes_fechadas_total', 'counter', 'Conexões SQLite fechadas',
+                    [('', {}, self.conexoes_fechadas)])
+
+        for nome, tipo, ajuda, amostras in extras:
+            familia(nome, tipo, ajuda, [('', labels, valor) for labels, valor in amostras])
+        return '\n'.join(linhas) + '\n'
+
+
+class CursorInstrumentado(sqlite3.Cursor):
+    metricas = None
+    _sql = None
+    _lidas = 0
+
+    def execute(self, sql, parametros=()):
+        self._contar_iteradas()
+        self._sql = sql
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self.metricas.registrar_sql(sql, time.perf_counter() - inicio, self.rowcount)
+
+    def executemany(self, sql, parametros):
+        self._contar_iteradas()
+        self._sql = sql
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, parametros)
+        finally:
+            self.metricas.registrar_sql(sql, time.perf_counter() - inicio, self.rowcount)
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        linha = super().fetchone()
+        if linha is not None:
+            self.metricas.registrar_linhas(self._sql, 1, time.perf_counter() - inicio)
+        return linha
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        linhas = super().fetchmany(self.arraysize if size is None else size)
+        self.metricas.registrar_linhas(self._sql, len(linhas), time.perf_counter() - inicio)
+        return linhas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        linhas = super().fetchall()
+        self.metricas.registrar_linhas(self._sql, len(linhas), time.perf_counter() - inicio)
+        return linhas
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        linha = super().__next__()
+        self._lidas += 1
+        return linha
+
+    def close(self):
+        self._contar_iteradas()
+        super().close()
+
+    def __del__(self):
+        self._contar_iteradas()
+
+    def _contar_iteradas(self):
+        # Linhas lidas por iteração são somadas de uma vez só ao fim do cursor
+        if self._lidas:
+            lidas, self._lidas = self._lidas, 0
+            self.metricas.registrar_linhas(self._sql, lidas)
+
+
+class ConexaoInstrumentada(sqlite3.Connection):
+    metricas = None
+    classe_cursor = CursorInstrumentado
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas.conexao_aberta()
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or self.classe_cursor)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+    def close(self):
+        self.metricas.conexao_fechada()
+        super().close()
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pares = ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in labels.items())
+    return '{' + pares + '}'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor):
+    if isinstance(valor, bool):
+        return '1' if valor else '0'
+    if isinstance(valor, float):
+        return repr(valor)
+    return str(valor)
+# -------------------------------------------------------- END Instrumentação e métricas Prometheus
@@ -0,0 +1,156 @@
+import os
+
+from busca import criar_indice_fts
+from resumo_cursos import criar_resumo_cursos
+from importar import SQL_CRIAR_IMPORTACOES
+from versoes import criar_versoes
+from tarefas import criar_tarefas
+from alteracoes import criar_alteracoes
+
+
+# -------------------------------------------------------- Migrações do banco
+# O schema é versionado em schema_migrations e só muda quando alguém roda
+# `flask --app app migrar` (uma vez por deploy). Subir o app não executa DDL.
+# Cada migração roda em BEGIN IMMEDIATE: se dois processos migrarem ao mesmo
+# tempo, o segundo espera o primeiro e depois vê a versão já aplicada.
+
+SQL_CRIAR_CONTROLE = '''
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    versao INTEGER PRIMARY KEY,
+    descricao TEXT NOT NULL,
+    aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+ARQUIVO_SEED = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'popular_db.sql')
+
+
+def _schema_inicial(conn):
+    # IF NOT EXISTS: bancos criados antes das migrações já têm estas tabelas
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS alunos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        email TEXT NOT NULL,
+        telefone TEXT,
+        curso TEXT,
+        criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        is_admin BOOLEAN DEFAULT 0
+    )
+    ''')
+
+
+def _importacoes(conn):
+    conn.execute(SQL_CRIAR_IMPORTACOES)
+
+
+class EmailsDuplicados(Exception):
+    pass
+
+
+SQL_EMAILS_DUPLICADOS = '''
+SELECT lower(email) AS email, COUNT(*) AS total, MIN(id) AS manter
+FROM alunos
+GROUP BY lower(email)
+HAVING COUNT(*) > 1
+'''
+
+
+def _indices(conn):
+    # email único (sem diferenciar maiúsculas), curso para o GROUP BY do
+    # resumo e dos filtros, criado_em para ordenar por matrícula recente
+    duplicados = conn.execute(SQL_EMAILS_DUPLICADOS).fetchall()
+    if duplicados:
+        raise EmailsDuplicados(
+            f'{len(duplicados)} emails aparecem em mais de um aluno. '
+            'Rode `flask --app app deduplicar-emails` antes de migrar.'
+        )
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_alunos_email ON alunos (email COLLATE NOCASE)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_alunos_curso ON alunos (curso)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_alunos_criado_em ON alunos (criado_em)')
+
+
+def deduplicar_emails(conn, aplicar=False):
+    # Mantém o aluno mais antigo (menor id) de cada email repetido
+    duplicados = conn.execute(SQL_EMAILS_DUPLICADOS).fetchall()
+    removidos = sum(linha[1] - 1 for linha in duplicados)
+    if aplicar and duplicados:
+        conn.execute('''
+            DELETE FROM alunos
+            WHERE id NOT IN (SELECT MIN(id) FROM alunos GROUP BY lower(email))
+        ''')
+        conn.commit()
+    return duplicados, removidos
+
+
+MIGRACOES = [
+    (1, 'tabelas alunos e usuarios', _schema_inicial),
+    (2, 'índice de busca FTS5', criar_indice_fts),
+    (3, 'resumo curso_stats', criar_resumo_cursos),
+    (4, 'controle de importações', _importacoes),
+    (5, 'índices de alunos (email único, curso, criado_em)', _indices),
+    (6, 'versões de dados para ETag', criar_versoes),
+    (7, 'fila de tarefas em segundo plano', criar_tarefas),
+    (8, 'log de alterações de alunos', criar_alteracoes),
+]
+
+
+def versao_atual(conn):
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'"
+    ).fetchone()
+    if not existe:
+        return 0
+    return conn.execute('SELECT COALESCE(MAX(versao), 0) FROM schema_migrations').fetchone()[0]
+
+
+def migrar(conn):
+    # Aplica as migrações pendentes e devolve as versões aplicadas agora
+    conn.execute(SQL_CRIAR_CONTROLE)
+    conn.commit()
+
+    aplicadas = []
+    for versao, descricao, aplicar in MIGRACOES:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            ja_aplicada = conn.execute(
+                'SELECT 1 FROM schema_migrations WHERE versao = ?', (versao,)
+            ).fetchone()
+            if ja_aplicada:
+                conn.rollback()
+                continue
+            aplicar(conn)
+            conn.execute('INSERT INTO schema_migrations (versao, descricao) VALUES (?, ?)',
+                         (versao, descricao))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        aplicadas.append((versao, descricao))
+    return aplicadas
+
+
+def popular(conn, arquivo=ARQUIVO_SEED):
+    # Carrega os alunos de exemplo só se a tabela estiver vazia
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        count = conn.execute('SELECT COUNT(*) FROM alunos').fetchone()[0]
+        if count:
+            conn.rollback()
+            return 0
+        with open(arquivo, encoding='utf-8') as sql_file:
+            conn.execute(sql_file.read())
+        inseridos = conn.execute('SELECT COUNT(*) FROM alunos').fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return inseridos
+# -------------------------------------------------------- END Migrações do banco
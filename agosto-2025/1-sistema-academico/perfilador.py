@@ -0,0 +1,281 @@
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+
+# -------------------------------------------------------- Perfis de requisições
+# Perfil de uma requisição de produção, sem debug: uma fração das
+# requisições (ou as que pedem por cabeçalho) roda com um perfilador e o
+# resultado vai para um arquivo na pasta de perfis.
+#
+# Modos:
+#   amostragem  uma thread do processo lê a pilha das threads perfiladas a
+#               cada intervalo (sys._current_frames) e conta as pilhas; custo
+#               só enquanto há perfil ativo, e o resultado sai no formato
+#               "colapsado" (f1;f2;f3 N) que flamegraph.pl e speedscope leem
+#   cprofile    cProfile na thread da requisição: tempo exato por função, mais
+#               caro; grava o .prof (pstats, snakeviz) e um resumo em texto
+#
+# Nos dois modos o perfil soma o tempo gasto em SQL, hash de senha,
+# renderização de templates e espera pelo gravador, medido por quem faz a
+# operação (somar_tempo) na thread da requisição.
+#
+# A configuração (taxa, modo, rota) fica num JSON na pasta de perfis: uma
+# mudança feita em um worker vale para todos.
+
+MODOS = ('amostragem', 'cprofile')
+CATEGORIAS = ('sql', 'escrita', 'hash', 'template')
+CONFIG_PADRAO = {'taxa': 0.0, 'modo': 'amostragem', 'rota': None}
+
+# Releitura do arquivo de configuração no máximo a cada tantos segundos
+RELER_CONFIG = 1.0
+# Quadros de pilha guardados por amostra (os mais externos são descartados)
+MAX_PROFUNDIDADE = 128
+
+_local = threading.local()
+
+
+def somar_tempo(categoria, segundos):
+    # Chamado por quem mede SQL, hash etc.; sem perfil ativo na thread é só
+    # um getattr
+    perfil = getattr(_local, 'perfil', None)
+    if perfil is not None:
+        perfil.tempos[categoria] = perfil.tempos.get(categoria, 0.0) + segundos
+
+
+def pilha_colapsada(frame):
+    nomes = []
+    while frame is not None and len(nomes) < MAX_PROFUNDIDADE:
+        codigo = frame.f_code
+        nomes.append(f"{frame.f_globals.get('__name__', '?')}.{codigo.co_qualname}")
+        frame = frame.f_back
+    return ';'.join(reversed(nomes))
+
+
+class Amostrador:
+    # Uma thread por processo, dormindo enquanto nenhuma requisição é perfilada
+    def __init__(self, intervalo=0.005):
+        self.intervalo = intervalo
+        self._ativos = {}           # ident da thread -> Perfil
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def adicionar(self, ident, perfil):
+        with self._lock:
+            # Depois de um fork a thread do pai não existe no filho
+            if self._thread is None or self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._loop, name='perfilador', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+            self._ativos[ident] = perfil
+        self._acordar.set()
+
+    def remover(self, ident):
+        with self._lock:
+            self._ativos.pop(ident, None)
+
+    def _loop(self):
+        while True:
+            self._acordar.wait()
+            with self._lock:
+                ativos = list(self._ativos.items())
+                if not ativos:
+                    self._acordar.clear()
+                    continue
+            quadros = sys._current_frames()
+            for ident, perfil in ativos:
+                frame = quadros.get(ident)
+                if frame is not None:
+                    perfil.pilhas[pilha_colapsada(frame)] += 1
+            del quadros, frame
+            time.sleep(self.intervalo)
+
+
+class Perfil:
+    def __init__(self, modo, metodo, url):
+        self.modo = modo
+        self.metodo = metodo
+        self.url = url
+        self.tempos = dict.fromkeys(CATEGORIAS, 0.0)
+        self.pilhas = Counter()
+        self.perfil_c = None
+        self.inicio = None
+        self.duracao = None
+
+
+class Perfilador:
+    def __init__(self, pasta, intervalo=0.005, max_arquivos=200):
+        self.pasta = pasta
+        self.max_arquivos = max_arquivos
+        self.amostrador = Amostrador(intervalo)
+        self._config = dict(CONFIG_PADRAO)
+        self._config_lida_em = 0.0
+        self._sequencia = itertools.count()
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.perfis = 0
+        self.erros = 0
+
+    # ---- configuração em tempo de execução
+    def caminho_config(self):
+        return os.path.join(self.pasta, 'config.json')
+
+    def config(self):
+        agora = time.monotonic()
+        if agora - self._config_lida_em >= RELER_CONFIG:
+            self._config_lida_em = agora
+            try:
+                with open(self.caminho_config()) as arquivo:
+                    self._config = {**CONFIG_PADRAO, **json.load(arquivo)}
+            except FileNotFoundError:
+                self._config = dict(CONFIG_PADRAO)
+            except (OSError, ValueError):
+                self.erros += 1
+        return self._config
+
+    def salvar_config(self, taxa, modo, rota=None):
+        if modo not in MODOS or not 0.0 <= taxa <= 1.0:
+            raise ValueError('Taxa entre 0 e 1 e modo em ' + ', '.join(MODOS))
+        os.makedirs(self.pasta, exist_ok=True)
+        config = {'taxa': taxa, 'modo': modo, 'rota': rota or None}
+        temporario = self.caminho_config() + f'.{os.getpid()}'
+        with open(temporario, 'w') as arquivo:
+            json.dump(config, arquivo)
+        os.replace(temporario, self.caminho_config())
+        self._config, self._config_lida_em = config, time.monotonic()
+        return config
+
+    def escolher(self, endpoint, forcado=False):
+        # Modo do perfil desta requisição, ou None
+        config = self.config()
+        if forcado:
+            return config['modo']
+        if config['taxa'] and (config['rota'] is None or config['rota'] == endpoint):
+            if random.random() < config['taxa']:
+                return config['modo']
+        return None
+
+    # ---- um perfil
+    def iniciar(self, modo, metodo, url):
+        perfil = Perfil(modo, metodo, url)
+        if modo == 'cprofile':
+            perfil.perfil_c = cProfile.Profile()
+            try:
+                perfil.perfil_c.enable()
+            except ValueError:
+                # Outro perfilador ativo (Python 3.12+ só aceita um por vez)
+                perfil.perfil_c = None
+                perfil.modo = 'amostragem'
+        if perfil.modo == 'amostragem':
+            self.amostrador.adicionar(threading.get_ident(), perfil)
+        _local.perfil = perfil
+        perfil.inicio = time.perf_counter()
+        return perfil
+
+    def terminar(self, perfil, ident, endpoint, status):
+        # ident: thread da requisição (o fim pode rodar em outra, no close da resposta)
+        perfil.duracao = time.perf_counter() - perfil.inicio
+        if perfil.perfil_c is not None:
+            perfil.perfil_c.disable()
+        self.amostrador.remover(ident)
+        if getattr(_local, 'perfil', None) is perfil:
+            _local.perfil = None
+        try:
+            return self.salvar(perfil, endpoint, status)
+        except OSError:
+            self.erros += 1
+            return None
+
+    def salvar(self, perfil, endpoint, status):
+        os.makedirs(self.pasta, exist_ok=True)
+        nome = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{next(self._sequencia):06d}'
+        dados = {
+            'nome': nome,
+            'modo': perfil.modo,
+            'metodo': perfil.metodo,
+            'url': perfil.url,
+            'rota': endpoint,
+            'status': status,
+            'pid': os.getpid(),
+            'criado_em': time.time(),
+            'duracao': perfil.duracao,
+            'tempos': perfil.tempos,
+            'outros': max(perfil.duracao - sum(perfil.tempos.values()), 0.0),
+            'amostras': sum(perfil.pilhas.values()),
+        }
+        if perfil.perfil_c is not None:
+            perfil.perfil_c.dump_stats(os.path.join(self.pasta, nome + '.prof'))
+            texto = io.StringIO()
+            pstats.Stats(perfil.perfil_c, stream=texto).sort_stats('cumulative').print_stats(40)
+            with open(os.path.join(self.pasta, nome + '.txt'), 'w') as arquivo:
+                arquivo.write(texto.getvalue())
+        else:
+            with open(os.path.join(self.pasta, nome + '.folded'), 'w') as arquivo:
+                for pilha, contagem in perfil.pilhas.most_common():
+                    arquivo.write(f'{pilha} {contagem}\n')
+        # O JSON por último: o perfil só aparece na lista com os arquivos prontos
+        with open(os.path.join(self.pasta, nome + '.json'), 'w') as arquivo:
+            json.dump(dados, arquivo)
+        with self._lock:
+            self.perfis += 1
+        self.limpar()
+        return nome
+
+    # ---- perfis gravados
+    def listar(self, limite=None):
+        try:
+            nomes = sorted((nome[:-5] for nome in os.listdir(self.pasta)
+                            if nome.endswith('.json') and nome != 'config.json'), reverse=True)
+        except FileNotFoundError:
+            return []
+        perfis = []
+        for nome in nomes[:limite]:
+            dados = self.ler(nome)
+            if dados is not None:
+                perfis.append(dados)
+        return perfis
+
+    def ler(self, nome):
+        try:
+            with open(os.path.join(self.pasta, nome + '.json')) as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+
+    def arquivo(self, nome, extensao):
+        # Caminho de um arquivo do perfil, ou None; nome vem da URL
+        if os.path.basename(nome) != nome or extensao not in ('json', 'folded', 'prof', 'txt'):
+            return None
+        caminho = os.path.join(self.pasta, f'{nome}.{extensao}')
+        return caminho if os.path.exists(caminho) else None
+
+    def limpar(self):
+        # Mantém os max_arquivos perfis mais novos
+        try:
+            nomes = sorted(nome[:-5] for nome in os.listdir(self.pasta)
+                           if nome.endswith('.json') and nome != 'config.json')
+        except FileNotFoundError:
+            return
+        for nome in nomes[:-self.max_arquivos or None]:
+            for extensao in ('json', 'folded', 'prof', 'txt'):
+                try:
+                    os.remove(os.path.join(self.pasta, f'{nome}.{extensao}'))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {'pasta': self.pasta, 'perfis': self.perfis, 'erros': self.erros,
+                    'config': dict(self.config())}
+# -------------------------------------------------------- END Perfis de requisições
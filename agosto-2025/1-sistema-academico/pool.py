@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+# -------------------------------------------------------- Pool de conexões SQLite
+# Um pool por processo: as conexões ficam abertas entre requisições, então o
+# custo de abrir o arquivo, ler o schema e aquecer o cache de páginas é pago
+# uma vez só. O app pega uma conexão por requisição e devolve no teardown.
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, database, size=5, timeout=10.0, on_connect=None, factory=sqlite3.Connection):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.on_connect = on_connect
+        self.factory = factory
+
+        self._lock = threading.Lock()
+        self._disponivel = threading.Condition(self._lock)
+        self._livres = deque()
+        self._abertas = 0
+        self._em_uso = 0
+
+        # Métricas
+        self.checkouts = 0
+        self.esperas = 0
+        self.tempo_espera_total = 0.0
+        self.tempo_espera_max = 0.0
+        self.timeouts = 0
+        self.conexoes_criadas = 0
+        self.conexoes_descartadas = 0
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False, factory=self.factory)
+        conn.row_factory = sqlite3.Row
+        if self.on_connect:
+            self.on_connect(conn)
+        self.conexoes_criadas += 1
+        return conn
+
+    def _saudavel(self, conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _descartar(self, conn):
+        self.conexoes_descartadas += 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self):
+        inicio = time.perf_counter()
+        with self._lock:
+            esperou = False
+            while not self._livres and self._abertas >= self.size:
+                esperou = True
+                restante = self.timeout - (time.perf_counter() - inicio)
+                if restante <= 0 or not self._disponivel.wait(restante):
+                    if not self._livres and self._abertas >= self.size:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f'Nenhuma conexão livre após {self.timeout}s '
+                            f'({self._em_uso}/{self.size} em uso)'
+                        )
+
+            conn = self._livres.pop() if self._livres else None
+            if conn is None:
+                self._abertas += 1
+            self._em_uso += 1
+
+            espera = time.perf_counter() - inicio
+            self.checkouts += 1
+            if esperou:
+                self.esperas += 1
+            self.tempo_espera_total += espera
+            self.tempo_espera_max = max(self.tempo_espera_max, espera)
+
+        # Abre/valida fora do lock para não serializar o pool inteiro
+        try:
+            if conn is not None and not self._saudavel(conn):
+                self._descartar(conn)
+                conn = None
+            if conn is None:
+                conn = self._conectar()
+        except Exception:
+            with self._lock:
+                self._abertas -= 1
+                self._em_uso -= 1
+                self._disponivel.notify()
+            raise
+        return conn
+
+    def release(self, conn):
+        # Transação esquecida aberta não pode vazar para a próxima requisição
+        reutilizavel = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            reutilizavel = False
+
+        with self._lock:
+            self._em_uso -= 1
+            if reutilizavel:
+                self._livres.append(conn)
+            else:
+                self._abertas -= 1
+            self._disponivel.notify()
+
+        if not reutilizavel:
+            self._descartar(conn)
+
+    def close(self):
+        with self._lock:
+            livres = list(self._livres)
+            self._livres.clear()
+            self._abertas -= len(livres)
+        for conn in livres:
+            self._descartar(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'abertas': self._abertas,
+                'em_uso': self._em_uso,
+                'livres': len(self._livres),
+                'checkouts': self.checkouts,
+                'esperas': self.esperas,
+                'timeouts': self.timeouts,
+                'tempo_espera_total': self.tempo_espera_total,
+                'tempo_espera_max': self.tempo_espera_max,
+                'tempo_espera_medio': (self.tempo_espera_total / self.checkouts
+                                       if self.checkouts else 0.0),
+                'conexoes_criadas': self.conexoes_criadas,
+                'conexoes_descartadas': self.conexoes_descartadas,
+            }
+# -------------------------------------------------------- END Pool de conexões SQLite
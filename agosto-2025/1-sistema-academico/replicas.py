@@ -0,0 +1,162 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:     # Windows: sem lock, cada processo sincroniza por conta própria
+    fcntl = None
+
+
+# -------------------------------------------------------- Réplicas de leitura
+# Cópias do banco principal em outros arquivos, atualizadas pela API de
+# backup online do SQLite (Connection.backup): a cópia é consistente, não
+# bloqueia as escritas no principal e os leitores da réplica (WAL) seguem
+# lendo a versão anterior até o fim da cópia.
+#
+# Ao lado de cada réplica fica um arquivo de marca cujo mtime é o instante
+# em que a última cópia começou: a réplica contém tudo o que foi confirmado
+# no principal antes disso. O app usa a marca para limitar o atraso e para
+# garantir que quem acabou de escrever não leia uma réplica anterior à
+# própria escrita.
+#
+# Se nada mudou no principal desde a última cópia (PRAGMA data_version numa
+# conexão que fica aberta), a rodada só avança a marca, sem copiar nada.
+
+logger = logging.getLogger(__name__)
+
+
+def caminho_marca(replica):
+    return replica + '-sincronizada'
+
+
+def marca_replica(replica):
+    # Instante (time.time) até o qual a réplica está em dia; None se nunca
+    # foi sincronizada
+    try:
+        return os.stat(caminho_marca(replica)).st_mtime
+    except OSError:
+        return None
+
+
+def _marcar(replica, instante):
+    marca = caminho_marca(replica)
+    if not os.path.exists(marca):
+        open(marca, 'a').close()
+    os.utime(marca, (instante, instante))
+
+
+def sincronizar(origem, replica):
+    # origem: conexão com o banco principal
+    destino = sqlite3.connect(replica)
+    try:
+        origem.backup(destino)
+    finally:
+        destino.close()
+
+
+class Replicador:
+    def __init__(self, principal, replicas, intervalo=5.0):
+        self.principal = principal
+        self.replicas = list(replicas)
+        self.intervalo = intervalo
+        self._origem = None
+        self._trava = None          # arquivo com o flock enquanto este processo é quem copia
+        self._versao_copiada = {}   # réplica -> data_version do principal na última cópia
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.copias = 0
+        self.rodadas_sem_mudanca = 0
+        self.falhas = 0
+        self.tempo_copia_total = 0.0
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = threading.Thread(target=self._loop, name='replicador-sqlite',
+                                                daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            self.rodada()
+            if self._parar.wait(self.intervalo):
+                break
+        if self._origem is not None:
+            self._origem.close()
+            self._origem = None
+        if self._trava is not None:
+            self._trava.close()
+            self._trava = None
+
+    def rodada(self):
+        # False se outro processo é quem está copiando
+        if not self._lider():
+            return False
+        for replica in self.replicas:
+            self._atualizar(replica)
+        return True
+
+    def _lider(self):
+        # Com vários workers, só o processo que segura o flock copia; se ele
+        # morrer o lock é liberado e outro assume na próxima rodada
+        if self._trava is not None:
+            return True
+        trava = open(self.principal + '-replicas.lock', 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                trava.close()
+                return False
+        self._trava = trava
+        return True
+
+    def _atualizar(self, replica):
+        inicio = time.time()
+        try:
+            if self._origem is None:
+                self._origem = sqlite3.connect(self.principal, check_same_thread=False)
+            versao = self._origem.execute('PRAGMA data_version').fetchone()[0]
+            if (self._versao_copiada.get(replica) == versao
+                    and marca_replica(replica) is not None):
+                with self._lock:
+                    self.rodadas_sem_mudanca += 1
+            else:
+                sincronizar(self._origem, replica)
+                self._versao_copiada[replica] = versao
+                with self._lock:
+                    self.copias += 1
+                    self.tempo_copia_total += time.time() - inicio
+            _marcar(replica, inicio)
+        except (sqlite3.Error, OSError):
+            logger.exception('Falha ao sincronizar a réplica %s', replica)
+            with self._lock:
+                self.falhas += 1
+
+    def parar(self):
+        with self._lock:
+            thread = self._thread
+        self._parar.set()
+        if thread is not None and thread.is_alive():
+            thread.join()
+
+    def stats(self):
+        agora = time.time()
+        with self._lock:
+            return {
+                'intervalo': self.intervalo,
+                'copias': self.copias,
+                'rodadas_sem_mudanca': self.rodadas_sem_mudanca,
+                'falhas': self.falhas,
+                'tempo_copia_medio': self.tempo_copia_total / self.copias if self.copias else 0.0,
+                'atraso': {replica: None if marca_replica(replica) is None
+                           else agora - marca_replica(replica) for replica in self.replicas},
+            }
+# -------------------------------------------------------- END Réplicas de leitura
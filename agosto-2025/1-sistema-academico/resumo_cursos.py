@@ -0,0 +1,113 @@
+import argparse
+
+from armazenamento import conectar
+from versoes import avancar_versao
+
+
+# -------------------------------------------------------- Resumo de alunos por curso
+# curso_stats guarda a contagem de alunos por curso, atualizada pelos
+# triggers a cada INSERT/DELETE/UPDATE de curso em alunos. Assim
+# /estatisticas lê uma linha por curso em vez de agregar a tabela inteira.
+# Curso NULL e curso vazio contam juntos como '' ("Não informado").
+
+SQL_CRIAR_RESUMO = '''
+CREATE TABLE curso_stats (
+    curso TEXT PRIMARY KEY NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+SQL_TRIGGERS_RESUMO = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS curso_stats_ai AFTER INSERT ON alunos BEGIN
+        INSERT INTO curso_stats (curso, total) VALUES (COALESCE(new.curso, ''), 1)
+        ON CONFLICT (curso) DO UPDATE SET total = total + 1;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS curso_stats_ad AFTER DELETE ON alunos BEGIN
+        UPDATE curso_stats SET total = total - 1 WHERE curso = COALESCE(old.curso, '');
+        DELETE FROM curso_stats WHERE curso = COALESCE(old.curso, '') AND total <= 0;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS curso_stats_au AFTER UPDATE OF curso ON alunos
+    WHEN COALESCE(old.curso, '') IS NOT COALESCE(new.curso, '') BEGIN
+        UPDATE curso_stats SET total = total - 1 WHERE curso = COALESCE(old.curso, '');
+        DELETE FROM curso_stats WHERE curso = COALESCE(old.curso, '') AND total <= 0;
+        INSERT INTO curso_stats (curso, total) VALUES (COALESCE(new.curso, ''), 1)
+        ON CONFLICT (curso) DO UPDATE SET total = total + 1;
+    END;
+    ''',
+)
+
+SQL_CONTAGEM_REAL = '''
+SELECT COALESCE(curso, '') AS curso, COUNT(*) AS total
+FROM alunos
+GROUP BY COALESCE(curso, '')
+'''
+
+
+def criar_resumo_cursos(conn):
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'curso_stats'"
+    ).fetchone()
+    if not existe:
+        conn.execute(SQL_CRIAR_RESUMO)
+        # Na migração, antes de existir versoes: só preenche
+        conn.execute(f'INSERT INTO curso_stats (curso, total) {SQL_CONTAGEM_REAL}')
+    # Um execute por trigger: executescript faria COMMIT no meio da migração
+    for trigger in SQL_TRIGGERS_RESUMO:
+        conn.execute(trigger)
+
+
+def reconstruir_resumo(conn):
+    conn.execute('DELETE FROM curso_stats')
+    conn.execute(f'INSERT INTO curso_stats (curso, total) {SQL_CONTAGEM_REAL}')
+    # Nenhum trigger de alunos dispara aqui
+    avancar_versao(conn)
+
+
+def somar_resumo_apos(conn, ultimo_id):
+    # Equivalente em lote do trigger curso_stats_ai para as linhas com id > ultimo_id
+    conn.execute('''
+        INSERT INTO curso_stats (curso, total)
+        SELECT COALESCE(curso, ''), COUNT(*) FROM alunos WHERE id > ?
+        GROUP BY COALESCE(curso, '')
+        ON CONFLICT (curso) DO UPDATE SET total = total + excluded.total
+    ''', (ultimo_id,))
+
+
+def verificar_resumo(conn):
+    # Lista de (curso, total no resumo, total real) para cada curso divergente
+    real = {linha[0]: linha[1] for linha in conn.execute(SQL_CONTAGEM_REAL)}
+    resumo = {linha[0]: linha[1] for linha in conn.execute('SELECT curso, total FROM curso_stats')}
+    divergentes = []
+    for curso in sorted(real.keys() | resumo.keys()):
+        if real.get(curso, 0) != resumo.get(curso, 0):
+            divergentes.append((curso, resumo.get(curso, 0), real.get(curso, 0)))
+    return divergentes
+# -------------------------------------------------------- END Resumo de alunos por curso
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Confere ou reconstrói a tabela curso_stats')
+    parser.add_argument('--banco', default='alunos.db')
+    parser.add_argument('--reconstruir', action='store_true',
+                        help='recalcula o resumo a partir de alunos')
+    args = parser.parse_args()
+
+    conn = conectar(args.banco)
+    divergentes = verificar_resumo(conn)
+    for curso, resumo, real in divergentes:
+        print(f"{curso or 'Não informado'}: resumo={resumo} real={real}")
+
+    if not divergentes:
+        print("Resumo de cursos consistente.")
+    elif args.reconstruir:
+        reconstruir_resumo(conn)
+        conn.commit()
+        print(f"Resumo reconstruído ({len(divergentes)} cursos corrigidos).")
+    else:
+        print(f"{len(divergentes)} cursos divergentes. Use --reconstruir para corrigir.")
+    conn.close()
@@ -0,0 +1,130 @@
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TempoEsgotado
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from perfilador import somar_tempo
+
+
+# -------------------------------------------------------- Hash de senhas fora da thread da requisição
+# generate_password_hash/check_password_hash são caros de propósito. Aqui
+# eles rodam num pool de processos com fila limitada: se a fila encher,
+# quem chama recebe FilaHashCheia na hora (o app responde 503) em vez de
+# empilhar logins até travar as outras rotas. Quem espera mais que o
+# timeout também recebe FilaHashCheia; a vaga só volta quando o hash sai do
+# pool, então a fila nunca passa de workers + fila.
+
+
+class FilaHashCheia(Exception):
+    pass
+
+
+_hash_ficticio = None
+
+def hash_ficticio():
+    # Um por processo, com o método padrão (o mesmo das contas novas); o
+    # servidor gera no aquecimento e os workers herdam no fork
+    global _hash_ficticio
+    if _hash_ficticio is None:
+        _hash_ficticio = generate_password_hash(secrets.token_hex(16))
+    return _hash_ficticio
+
+
+class HashExecutor:
+    def __init__(self, workers=2, fila=32, timeout=30.0):
+        self.workers = workers
+        self.fila = fila
+        self.timeout = timeout
+        self._vagas = threading.BoundedSemaphore(workers + fila)
+        self._executor = None
+        self._lock = threading.Lock()
+
+        # Métricas por operação: gerar / verificar
+        self.metricas = {
+            op: {'contagem': 0, 'tempo_total': 0.0, 'tempo_max': 0.0, 'rejeitadas': 0,
+                 'expiradas': 0}
+            for op in ('gerar', 'verificar')
+        }
+        self._pendentes = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _liberar(self, futuro=None):
+        # Quando o hash termina (ou é cancelado ainda na fila), não quando
+        # quem pediu desiste de esperar
+        self._vagas.release()
+        with self._lock:
+            self._pendentes -= 1
+
+    def _executar(self, op, funcao, *args):
+        if not self._vagas.acquire(blocking=False):
+            with self._lock:
+                self.metricas[op]['rejeitadas'] += 1
+            raise FilaHashCheia(f'Fila de hash cheia ({self.workers + self.fila} pendentes)')
+
+        inicio = time.perf_counter()
+        with self._lock:
+            self._pendentes += 1
+        try:
+            if self.workers:
+                try:
+                    futuro = self._get_executor().submit(funcao, *args)
+                except BaseException:
+                    self._liberar()
+                    raise
+                futuro.add_done_callback(self._liberar)
+                try:
+                    resultado = futuro.result(self.timeout)
+                except TempoEsgotado:
+                    # Ainda na fila: nem chega a rodar
+                    futuro.cancel()
+                    with self._lock:
+                        self.metricas[op]['expiradas'] += 1
+                    raise FilaHashCheia(f'Hash demorou mais de {self.timeout}s') from None
+            else:
+                # workers = 0: hash inline, como antes (útil para testes e comparação)
+                try:
+                    resultado = funcao(*args)
+                finally:
+                    self._liberar()
+        finally:
+            duracao = time.perf_counter() - inicio
+            somar_tempo('hash', duracao)
+            with self._lock:
+                m = self.metricas[op]
+                m['contagem'] += 1
+                m['tempo_total'] += duracao
+                m['tempo_max'] = max(m['tempo_max'], duracao)
+        return resultado
+
+    def gerar(self, senha):
+        return self._executar('gerar', generate_password_hash, senha)
+
+    def verificar(self, password_hash, senha):
+        return self._executar('verificar', check_password_hash, password_hash, senha)
+
+    def verificar_ficticio(self, senha):
+        # Usuário inexistente: o mesmo custo de uma senha errada (o tempo de
+        # resposta não revela quais nomes existem), sempre False
+        self.verificar(hash_ficticio(), senha)
+        return False
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def stats(self):
+        with self._lock:
+            stats = {'workers': self.workers, 'fila': self.fila, 'pendentes': self._pendentes}
+            for op, m in self.metricas.items():
+                stats[op] = dict(m, tempo_medio=m['tempo_total'] / m['contagem'] if m['contagem'] else 0.0)
+            return stats
+# -------------------------------------------------------- END Hash de senhas fora da thread da requisição
@@ -0,0 +1,330 @@
+import argparse
+import gc
+import logging
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from app import create_app, aquecer_app, preparar_worker, liberar_recursos
+
+
+# -------------------------------------------------------- Servidor multiprocesso
+# Servidor de produção só com a biblioteca padrão e o werkzeug:
+#     python servidor.py --bind 0.0.0.0:8000 --workers 4
+#
+# O processo pai importa o app, compila os templates e aquece os caches uma
+# vez, abre o socket e faz fork de N workers que aceitam conexões do mesmo
+# socket. Cada worker abre as próprias conexões SQLite depois do fork e só
+# começa a aceitar quando está pronto. Um worker atende até WORKER_THREADS
+# requisições ao mesmo tempo; com todas ocupadas ele para de aceitar e a
+# conexão espera no backlog até outro worker pegar.
+#
+# Sinais para o pai:
+#     SIGHUP          recarrega: reexecuta o pai com o código novo (mesmo
+#                     socket), sobe os workers novos e só então encerra os
+#                     antigos, sem recusar conexão nenhuma
+#     SIGTERM/SIGINT  encerra: os workers terminam as requisições em
+#                     andamento (até GRACEFUL_TIMEOUT) e saem
+
+# Variáveis que o pai passa para si mesmo ao reexecutar no SIGHUP
+ENV_FD = 'SERVIDOR_FD'
+ENV_ANTIGOS = 'SERVIDOR_ANTIGOS'
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+
+class Handler(WSGIRequestHandler):
+    def handle_one_request(self):
+        super().handle_one_request()
+        # Encerrando: responde a requisição atual e fecha o keep-alive
+        if self.server.encerrando:
+            self.close_connection = True
+
+
+class ServidorWorker(BaseWSGIServer):
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, app, sock, threads, keepalive):
+        handler = type('Handler', (Handler,), {
+            'protocol_version': 'HTTP/1.1' if keepalive else 'HTTP/1.0',
+            'timeout': keepalive or None,
+        })
+        host, port = sock.getsockname()[:2]
+        super().__init__(host, port, app, handler=handler, fd=sock.fileno())
+        # Não bloqueante: vários workers acordam para a mesma conexão e só um
+        # consegue o accept; os outros voltam para o select
+        self.socket.setblocking(False)
+        self.encerrando = False
+        self.pai = os.getppid()
+        self._vagas = threading.BoundedSemaphore(threads)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='worker')
+
+    def process_request(self, request, client_address):
+        request.setblocking(True)
+        self._vagas.acquire()
+        self._executor.submit(self._atender, request, client_address)
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._vagas.release()
+
+    def service_actions(self):
+        # Roda a cada volta do serve_forever: sem o pai (morto, sem tempo de
+        # mandar SIGTERM) ninguém mais supervisiona este worker
+        if os.getppid() != self.pai and not self.encerrando:
+            self.encerrar()
+
+    def encerrar(self):
+        # Chamado de um handler de sinal: shutdown() espera o serve_forever,
+        # então precisa rodar em outra thread
+        self.encerrando = True
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def fechar(self):
+        # Espera as requisições em andamento (server_close é chamado pelo
+        # próprio werkzeug no __init__ com fd, antes do executor existir)
+        self._executor.shutdown(wait=True)
+        self.server_close()
+
+
+def rodar_worker(app, sock, aviso):
+    config = app.config
+    servidor = None
+    parado = threading.Event()
+
+    def parar(signum, frame):
+        parado.set()
+        app.extensions['pronto'] = False
+        if servidor is not None:
+            servidor.encerrar()
+
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, parar)
+    signal.signal(signal.SIGINT, parar)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+    preparar_worker(app)
+    servidor = ServidorWorker(app, sock, config['WORKER_THREADS'], config['KEEPALIVE'])
+    os.write(aviso, b'1')
+    os.close(aviso)
+    try:
+        if parado.is_set():   # SIGTERM durante o aquecimento
+            app.extensions['pronto'] = False
+        else:
+            servidor.serve_forever(poll_interval=0.5)
+    finally:
+        servidor.fechar()
+        liberar_recursos(app)
+
+
+class Mestre:
+    def __init__(self, app, sock, workers, tempo_graca):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.tempo_graca = tempo_graca
+        self.filhos = {}        # pid -> fd do aviso de pronto (None quando pronto)
+        self.antigos = set()    # workers da geração anterior ao SIGHUP
+        self.sinais = []
+        self.parando = False
+
+    def log(self, mensagem):
+        print(f'[{os.getpid()}] {mensagem}', file=sys.stderr, flush=True)
+
+    def iniciar_worker(self):
+        leitura, escrita = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(leitura)
+            codigo = 0
+            try:
+                rodar_worker(self.app, self.sock, escrita)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                codigo = 1
+            finally:
+                os._exit(codigo)
+        os.close(escrita)
+        self.filhos[pid] = leitura
+        return pid
+
+    def rodar(self):
+        despertador_r, despertador_w = os.pipe()
+        os.set_blocking(despertador_w, False)
+        signal.set_wakeup_fd(despertador_w, warn_on_full_buffer=False)
+        for sinal in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sinal, lambda signum, frame: self.sinais.append(signum))
+
+        # Objetos do pré-carregamento fora do GC: coletas nos workers não
+        # tocam essas páginas e a memória continua compartilhada
+        gc.freeze()
+        gc.enable()
+        for _ in range(self.workers):
+            self.iniciar_worker()
+        self.log(f'{self.workers} workers em {self.endereco()}')
+
+        while True:
+            avisos = [fd for fd in self.filhos.values() if fd is not None]
+            prontos, _, _ = select.select([despertador_r, *avisos], [], [], 1.0)
+            for fd in prontos:
+                if fd == despertador_r:
+                    os.read(despertador_r, 512)
+                else:
+                    self.marcar_pronto(fd)
+            while self.sinais:
+                sinal = self.sinais.pop(0)
+                if sinal == signal.SIGHUP:
+                    self.recarregar()
+                elif sinal in (signal.SIGTERM, signal.SIGINT):
+                    self.parar()
+                    return
+            self.recolher()
+            if self.antigos and all(fd is None for fd in self.filhos.values()):
+                # Geração nova inteira pronta: a antiga pode sair
+                self.log(f'Encerrando {len(self.antigos)} workers antigos')
+                self.sinalizar(self.antigos, signal.SIGTERM)
+                self.esperar(self.antigos)
+
+    def marcar_pronto(self, fd):
+        for pid, aviso in self.filhos.items():
+            if aviso == fd:
+                if os.read(fd, 1):
+                    os.close(fd)
+                    self.filhos[pid] = None
+                return   # EOF: o worker morreu antes de ficar pronto; recolher() cuida
+
+    def recolher(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.antigos:
+                self.antigos.discard(pid)
+                continue
+            aviso = self.filhos.pop(pid, None)
+            if aviso is not None:
+                os.close(aviso)
+            if not self.parando:
+                self.log(f'Worker {pid} saiu (status {status}); iniciando outro')
+                if aviso is not None:
+                    time.sleep(1.0)   # morreu antes de ficar pronto: não entra em loop de fork
+                self.iniciar_worker()
+
+    def recarregar(self):
+        # Testa o código novo antes de trocar: se não importar, segue o atual
+        verificacao = subprocess.run(
+            [sys.executable, '-c', 'from app import create_app; create_app()'],
+            cwd=PASTA_APP, capture_output=True, text=True)
+        if verificacao.returncode != 0:
+            self.log(f'Recarga cancelada, o app não carrega:\n{verificacao.stderr}')
+            return
+        self.log('Recarregando')
+        os.set_inheritable(self.sock.fileno(), True)
+        os.environ[ENV_FD] = str(self.sock.fileno())
+        os.environ[ENV_ANTIGOS] = ','.join(str(pid) for pid in [*self.filhos, *self.antigos])
+        # O pid não muda no exec: os workers atuais continuam filhos do pai novo
+        os.execv(sys.executable, [sys.executable, *sys.argv])
+
+    def parar(self):
+        self.parando = True
+        todos = set(self.filhos) | self.antigos
+        self.log(f'Encerrando {len(todos)} workers')
+        self.sinalizar(todos, signal.SIGTERM)
+        self.esperar(todos)
+        self.sock.close()
+
+    def sinalizar(self, pids, sinal):
+        for pid in pids:
+            try:
+                os.kill(pid, sinal)
+            except ProcessLookupError:
+                pass
+
+    def esperar(self, pids):
+        limite = time.monotonic() + self.tempo_graca
+        pendentes = set(pids)
+        while pendentes:
+            for pid in list(pendentes):
+                try:
+                    fim, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    fim = pid
+                if fim:
+                    pendentes.discard(pid)
+                    self.filhos.pop(pid, None)
+                    self.antigos.discard(pid)
+            if pendentes and time.monotonic() > limite:
+                self.log(f'{len(pendentes)} workers não saíram em {self.tempo_graca}s; SIGKILL')
+                self.sinalizar(pendentes, signal.SIGKILL)
+                limite = float('inf')
+            time.sleep(0.05)
+
+    def endereco(self):
+        host, port = self.sock.getsockname()[:2]
+        return f'http://{host}:{port}'
+# -------------------------------------------------------- END Servidor multiprocesso
+
+
+def abrir_socket(bind, backlog=2048):
+    if ENV_FD in os.environ:
+        # Reexecução do SIGHUP: herda o socket que já está escutando
+        sock = socket.socket(fileno=int(os.environ.pop(ENV_FD)))
+        os.set_inheritable(sock.fileno(), False)
+        return sock
+    host, _, port = bind.rpartition(':')
+    sock = socket.create_server((host or '127.0.0.1', int(port)), backlog=backlog)
+    return sock
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor multiprocesso do sistema acadêmico')
+    parser.add_argument('--bind', default='127.0.0.1:8000', help='host:porta')
+    parser.add_argument('--workers', type=int, help='processos (padrão: WORKERS ou um por CPU)')
+    parser.add_argument('--threads', type=int, help='threads por worker (padrão: WORKER_THREADS)')
+    parser.add_argument('--keepalive', type=float, help='segundos de keep-alive; 0 desliga')
+    parser.add_argument('--tempo-graca', type=float, help='espera no encerramento (GRACEFUL_TIMEOUT)')
+    parser.add_argument('--acesso', action='store_true', help='loga cada requisição')
+    args = parser.parse_args()
+
+    if not args.acesso:
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    # Até o fork o pai só aloca; coletar agora só sujaria páginas compartilhadas
+    gc.disable()
+    app = create_app()
+    config = app.config
+    for chave, valor in (('WORKERS', args.workers), ('WORKER_THREADS', args.threads),
+                         ('KEEPALIVE', args.keepalive), ('GRACEFUL_TIMEOUT', args.tempo_graca)):
+        if valor is not None:
+            config[chave] = valor
+    workers = config['WORKERS'] or os.cpu_count() or 1
+
+    sock = abrir_socket(args.bind)
+    aquecer_app(app)
+
+    mestre = Mestre(app, sock, workers, config['GRACEFUL_TIMEOUT'])
+    antigos = os.environ.pop(ENV_ANTIGOS, '')
+    mestre.antigos = {int(pid) for pid in antigos.split(',') if pid}
+    mestre.rodar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+
+
+# -------------------------------------------------------- Fila de tarefas em segundo plano
+# Operações longas (importação, reconstrução de estatísticas, remoção em
+# massa) viram uma linha em tarefas e a rota responde na hora com o id. As
+# threads de ExecutorTarefas pegam a tarefa pendente mais antiga com um
+# UPDATE condicional (um worker só por tarefa, mesmo com vários processos),
+# rodam a função registrada para o tipo e gravam resultado ou erro.
+#
+# Falha: volta para pendente com espera exponencial até max_tentativas. O
+# progresso fica em memória e uma thread de vigia grava de tempos em tempos
+# (por outra conexão, sem se misturar com a transação da tarefa), junto com
+# o sinal de vida: tarefa 'executando' sem sinal há EXPIRA_SINAL segundos é
+# de um processo que morreu e volta para a fila.
+
+SQL_CRIAR_TAREFAS = (
+    '''
+    CREATE TABLE IF NOT EXISTS tarefas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL,
+        parametros TEXT NOT NULL DEFAULT '{}',
+        estado TEXT NOT NULL DEFAULT 'pendente',
+        tentativas INTEGER NOT NULL DEFAULT 0,
+        max_tentativas INTEGER NOT NULL DEFAULT 3,
+        progresso REAL NOT NULL DEFAULT 0,
+        mensagem TEXT,
+        resultado TEXT,
+        erro TEXT,
+        criado_por INTEGER,
+        criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        iniciado_em TIMESTAMP,
+        concluido_em TIMESTAMP,
+        executar_apos REAL NOT NULL DEFAULT 0,
+        dono TEXT,
+        sinal_em REAL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_tarefas_fila ON tarefas (estado, executar_apos, id)',
+)
+
+ESTADOS = ('pendente', 'executando', 'concluida', 'falhou')
+
+logger = logging.getLogger(__name__)
+
+
+def criar_tarefas(conn):
+    for sql in SQL_CRIAR_TAREFAS:
+        conn.execute(sql)
+
+
+def enfileirar(conn, tipo, parametros=None, max_tentativas=3, criado_por=None):
+    # Não dá commit: a rota chama dentro de executar_escrita
+    return conn.execute(
+        'INSERT INTO tarefas (tipo, parametros, max_tentativas, criado_por) VALUES (?, ?, ?, ?)',
+        (tipo, json.dumps(parametros or {}), max_tentativas, criado_por)).lastrowid
+
+
+def _decodificar(linha):
+    tarefa = dict(linha)
+    for campo in ('parametros', 'resultado'):
+        if tarefa[campo] is not None:
+            tarefa[campo] = json.loads(tarefa[campo])
+    return tarefa
+
+
+def ler_tarefa(conn, id):
+    linha = conn.execute('SELECT * FROM tarefas WHERE id = ?', (id,)).fetchone()
+    return _decodificar(linha) if linha else None
+
+
+def listar_tarefas(conn, limite=50):
+    return [_decodificar(linha) for linha in
+            conn.execute('SELECT * FROM tarefas ORDER BY id DESC LIMIT ?', (limite,))]
+
+
+class Progresso:
+    # Passado para a função da tarefa: progresso(feitos, total, mensagem)
+    __slots__ = ('id', 'tentativa', 'max_tentativas', 'fracao', 'mensagem', 'alterado')
+
+    def __init__(self, id, tentativa, max_tentativas=1):
+        self.id = id
+        self.tentativa = tentativa
+        self.max_tentativas = max_tentativas
+        self.fracao = 0.0
+        self.mensagem = None
+        self.alterado = False
+
+    @property
+    def ultima(self):
+        # Se esta tentativa falhar, a tarefa termina como 'falhou'
+        return self.tentativa >= self.max_tentativas
+
+    def __call__(self, feitos, total=None, mensagem=None):
+        if total:
+            self.fracao = min(1.0, feitos / total)
+        if mensagem is not None:
+            self.mensagem = mensagem
+        self.alterado = True
+
+
+class ExecutorTarefas:
+    def __init__(self, conectar, tipos, threads=1, intervalo=1.0, atraso_retentativa=5.0,
+                 expira_sinal=60.0, contexto=None):
+        # conectar(): conexão nova (uma por thread); tipos: nome -> funcao(conn, parametros, progresso)
+        # contexto(): context manager em volta de cada tarefa (app_context do Flask)
+        self.conectar = conectar
+        self.tipos = tipos
+        self.threads = threads
+        self.intervalo = intervalo
+        self.atraso_retentativa = atraso_retentativa
+        self.expira_sinal = expira_sinal
+        self.contexto = contexto
+        self.dono = f'{socket.gethostname()}:{os.getpid()}'
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._threads = []
+        self._em_execucao = {}      # id -> Progresso
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.concluidas = 0
+        self.falhas = 0
+        self.retentativas = 0
+        self.recuperadas = 0
+
+    def iniciar(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._parar.clear()
+            alvos = [self._trabalhar] * self.threads + [self._vigiar]
+            for numero, alvo in enumerate(alvos):
+                thread = threading.Thread(target=alvo, name=f'tarefas-{numero}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def acordar(self):
+        # Tarefa nova neste processo: não espera o próximo intervalo
+        self._acordar.set()
+
+    def parar(self, timeout=None):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        self._parar.set()
+        self._acordar.set()
+        for thread in threads:
+            thread.join(timeout)
+
+    # ---- execução
+    def executar_pendentes(self, conn):
+        # Na thread de quem chama, até a fila não ter tarefa pronta (scripts,
+        # verificar_planos.py); devolve quantas rodaram
+        self._recuperar_orfas(conn)
+        executadas = 0
+        while True:
+            tarefa = self._pegar(conn)
+            if tarefa is None:
+                return executadas
+            self._executar(conn, tarefa)
+            executadas += 1
+
+    def _trabalhar(self):
+        conn = self.conectar()
+        try:
+            while not self._parar.is_set():
+                tarefa = self._pegar(conn)
+                if tarefa is None:
+                    self._acordar.wait(self.intervalo)
+                    self._acordar.clear()
+                    continue
+                self._executar(conn, tarefa)
+        finally:
+            conn.close()
+
+    def _pegar(self, conn):
+        # Leitura sem lock primeiro: fila vazia não disputa o lock de escrita
+        agora = time.time()
+        candidata = conn.execute('''
+            SELECT id FROM tarefas WHERE estado = 'pendente' AND executar_apos <= ?
+            ORDER BY id LIMIT 1
+        ''', (agora,)).fetchone()
+        if candidata is None:
+            return None
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Outro worker pode ter pego entre a leitura e o lock
+            pegou = conn.execute('''
+                UPDATE tarefas SET estado = 'executando', tentativas = tentativas + 1,
+                    dono = ?, sinal_em = ?, iniciado_em = CURRENT_TIMESTAMP, erro = NULL
+                WHERE id = ? AND estado = 'pendente'
+            ''', (self.dono, agora, candidata[0])).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return ler_tarefa(conn, candidata[0]) if pegou else None
+
+    def _executar(self, conn, tarefa):
+        progresso = Progresso(tarefa['id'], tarefa['tentativas'], tarefa['max_tentativas'])
+        with self._lock:
+            self._em_execucao[tarefa['id']] = progresso
+        try:
+            funcao = self.tipos.get(tarefa['tipo'])
+            if funcao is None:
+                raise LookupError(f"Tipo de tarefa desconhecido: {tarefa['tipo']}")
+            if self.contexto:
+                with self.contexto():
+                    resultado = funcao(conn, tarefa['parametros'], progresso)
+            else:
+                resultado = funcao(conn, tarefa['parametros'], progresso)
+        except Exception as erro:
+            if conn.in_transaction:
+                conn.rollback()
+            self._falhou(conn, tarefa, erro)
+        else:
+            conn.execute('''
+                UPDATE tarefas SET estado = 'concluida', progresso = 1, resultado = ?,
+                    mensagem = COALESCE(?, mensagem), concluido_em = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (json.dumps(resultado), progresso.mensagem, tarefa['id']))
+            conn.commit()
+            with self._lock:
+                self.concluidas += 1
+        finally:
+            with self._lock:
+                self._em_execucao.pop(tarefa['id'], None)
+
+    def _falhou(self, conn, tarefa, erro):
+        logger.warning('Tarefa %s (%s) falhou na tentativa %s', tarefa['id'], tarefa['tipo'],
+                       tarefa['tentativas'], exc_info=erro)
+        texto = ''.join(traceback.format_exception_only(type(erro), erro)).strip()
+        if tarefa['tentativas'] < tarefa['max_tentativas']:
+            espera = self.atraso_retentativa * 2 ** (tarefa['tentativas'] - 1)
+            conn.execute('''
+                UPDATE tarefas SET estado = 'pendente', erro = ?, executar_apos = ?, dono = NULL
+                WHERE id = ?
+            ''', (texto, time.time() + espera, tarefa['id']))
+            with self._lock:
+                self.retentativas += 1
+        else:
+            conn.execute('''
+                UPDATE tarefas SET estado = 'falhou', erro = ?, concluido_em = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (texto, tarefa['id']))
+            with self._lock:
+                self.falhas += 1
+        conn.commit()
+
+    # ---- progresso e tarefas órfãs
+    def _vigiar(self):
+        conn = self.conectar()
+        try:
+            while not self._parar.wait(min(self.intervalo, self.expira_sinal / 4)):
+                try:
+                    self._gravar_progresso(conn)
+                    self._recuperar_orfas(conn)
+                except Exception:
+                    # Lock ocupado por uma tarefa longa etc.: tenta na próxima volta
+                    if conn.in_transaction:
+                        conn.rollback()
+                    logger.exception('Falha ao atualizar a fila de tarefas')
+        finally:
+            conn.close()
+
+    def _gravar_progresso(self, conn):
+        with self._lock:
+            atuais = list(self._em_execucao.values())
+        if not atuais:
+            return
+        agora = time.time()
+        for progresso in atuais:
+            if progresso.alterado:
+                progresso.alterado = False
+                conn.execute('UPDATE tarefas SET progresso = ?, mensagem = ?, sinal_em = ? '
+                             "WHERE id = ? AND estado = 'executando'",
+                             (progresso.fracao, progresso.mensagem, agora, progresso.id))
+            else:
+                conn.execute("UPDATE tarefas SET sinal_em = ? WHERE id = ? AND estado = 'executando'",
+                             (agora, progresso.id))
+        conn.commit()
+
+    def _recuperar_orfas(self, conn):
+        limite = time.time() - self.expira_sinal
+        orfa = conn.execute('''
+            SELECT 1 FROM tarefas WHERE estado = 'executando' AND sinal_em < ? LIMIT 1
+        ''', (limite,)).fetchone()
+        if orfa is None:
+            return
+        recuperadas = conn.execute('''
+            UPDATE tarefas SET
+                estado = CASE WHEN tentativas < max_tentativas THEN 'pendente' ELSE 'falhou' END,
+                erro = 'Processo parou de responder durante a execução', dono = NULL
+            WHERE estado = 'executando' AND sinal_em < ?
+        ''', (limite,)).rowcount
+        conn.commit()
+        with self._lock:
+            self.recuperadas += recuperadas
+
+    def stats(self):
+        with self._lock:
+            return {
+                'threads': self.threads,
+                'em_execucao': {id: p.fracao for id, p in self._em_execucao.items()},
+                'concluidas': self.concluidas,
+                'falhas': self.falhas,
+                'retentativas': self.retentativas,
+                'recuperadas': self.recuperadas,
+            }
+# -------------------------------------------------------- END Fila de tarefas em segundo plano
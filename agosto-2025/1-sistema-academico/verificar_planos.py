@@ -0,0 +1,216 @@
+import argparse
+import io
+import os
+import re
+import sys
+import tempfile
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, get_db_connection, get_pool, TIPOS_TAREFA
+from gerar_dados import popular_sintetico
+from migracoes import migrar
+from tarefas import ExecutorTarefas
+
+
+# Regressão de plano de consulta: sobe o app num banco sintético grande,
+# passa por todas as rotas, captura cada SQL executado (trace do sqlite3) e
+# roda EXPLAIN QUERY PLAN em cada um. Falha (exit 1) se alguma consulta
+# fizer SCAN numa tabela que cresce com os dados, a não ser que o SQL esteja
+# em VARREDURAS_PERMITIDAS ou o cenário seja um dump completo. As tarefas
+# enfileiradas rodam na hora, na conexão com trace, e entram no cenário.
+# Uso: python verificar_planos.py [--linhas 200000]
+
+# Tabelas pequenas por natureza: varrer é O(cursos) ou O(migrações)
+TABELAS_PEQUENAS = {'curso_stats', 'schema_migrations', 'importacoes', 'sqlite_master', 'versoes',
+                    'alteracoes_horizonte', 'alunos_fts_config'}
+
+# Varreduras aceitas, uma a uma: (regex do SQL normalizado, motivo). O
+# trace traz os parâmetros já substituídos (LIMIT 51, datas entre aspas).
+VARREDURAS_PERMITIDAS = [
+    (r"^SELECT \* FROM \(SELECT \* FROM alunos\) ORDER BY id (DESC )?LIMIT \d+$",
+     'primeira/última página do keyset: percorre a chave primária e para no LIMIT'),
+    (r"^SELECT \* FROM tarefas ORDER BY id DESC LIMIT \d+$",
+     'últimas tarefas: percorre a chave primária e para no LIMIT'),
+    (r"^(INSERT INTO curso_stats \(curso, total\) )?SELECT COALESCE\(curso, ''\) AS curso, "
+     r"COUNT\(\*\) AS total FROM alunos GROUP BY COALESCE\(curso, ''\)$",
+     'reconstrução de curso_stats (tarefa): conta a tabela inteira pelo índice de curso'),
+    (r"^DELETE FROM alteracoes_alunos WHERE criado_em < '[^']*' AND versao < \(",
+     'compactação do log (tarefa): uma passada no log, busca por aluno no índice'),
+]
+
+ARQUIVO_IMPORTACAO = ('nome,email,telefone,curso\n'
+                      'Importado Um,importado.1@email.com,,Física\n'
+                      'Importado Dois,importado.2@email.com,,\n')
+
+# (método, url, dados, pode varrer a tabela). Dados vão como formulário,
+# ou como JSON nas rotas /api/.
+CENARIOS = [
+    ('POST', '/login', {'username': 'admin', 'password': 'admin'}, False),
+    ('POST', '/criar-conta', {'username': 'outro', 'password': 'outro'}, False),
+    ('GET', '/', None, False),
+    ('GET', '/?apos=5000', None, False),
+    ('GET', '/?antes=5000', None, False),
+    ('GET', '/?search=silva', None, False),
+    ('GET', '/?search=silva&apos=-1.0,5000', None, False),
+    ('GET', '/?search=silva&antes=-1.0,5000', None, False),
+    ('GET', '/1234', None, False),
+    ('GET', '/estatisticas', None, False),
+    ('GET', '/1234/editar', None, False),
+    ('POST', '/1234/editar', {'nome': 'Novo Nome', 'email': 'novo.1234@email.com',
+                              'telefone': '', 'curso': 'Física'}, False),
+    ('POST', '/adicionar', {'nome': 'Aluno Novo', 'email': 'aluno.novo@email.com',
+                            'telefone': '', 'curso': 'Física'}, False),
+    ('POST', '/1235/deletar', None, False),
+    ('POST', '/lote', {'acao': 'curso', 'ids': [1300, 1301], 'curso': 'Química'}, False),
+    ('POST', '/lote', {'acao': 'editar', 'ids': [1302, 1303], 'telefone': '11 0000-0000'}, False),
+    ('POST', '/lote', {'acao': 'deletar', 'ids': [1304, 1305]}, False),
+    ('GET', '/api/alunos', None, False),
+    ('GET', '/api/alunos?apos=5000&limite=20', None, False),
+    ('GET', '/api/alunos?search=silva', None, False),
+    ('GET', '/api/alunos/1234', None, False),
+    ('POST', '/api/alunos', {'nome': 'Api Novo', 'email': 'api.novo@email.com'}, False),
+    ('PUT', '/api/alunos/1236', {'nome': 'Api Editado', 'email': 'api.1236@email.com'}, False),
+    ('DELETE', '/api/alunos/1237', None, False),
+    ('POST', '/api/alunos/lote', {'alunos': [{'nome': 'Lote Um', 'email': 'lote.1@email.com'},
+                                             {'nome': 'Lote Dois', 'email': 'lote.2@email.com'}]},
+     False),
+    ('PUT', '/api/alunos/lote', {'alunos': [{'id': 1238, 'nome': 'Lote', 'email': 'l.1238@email.com'}]},
+     False),
+    ('DELETE', '/api/alunos/lote', {'ids': [1239, 1240]}, False),
+    ('GET', '/api/alunos/changes?since=0', None, False),
+    ('GET', '/api/alunos/changes?since=5000&limite=100', None, False),
+    ('POST', '/tarefas/estatisticas', None, False),
+    ('POST', '/tarefas/remover-alunos', {'ids': [1241, 1242]}, False),
+    ('POST', '/tarefas/remover-alunos', {'curso': 'Filosofia'}, False),
+    ('POST', '/tarefas/compactar-alteracoes', None, False),
+    ('POST', '/importar', {'arquivo': (ARQUIVO_IMPORTACAO, 'alunos.csv')}, False),
+    ('GET', '/tarefas', None, False),
+    ('GET', '/tarefas/1', None, False),
+    # Dumps completos: varrer a tabela é o objetivo
+    ('GET', '/?stream=1', None, True),
+    ('GET', '/exportar', None, True),
+    ('GET', '/exportar?search=silva', None, False),
+]
+
+IGNORAR = re.compile(r'^\s*(--|PRAGMA|BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|SELECT 1$)', re.I)
+SCAN = re.compile(r'^SCAN (?:main\.)?(\w+)(.*)$')
+
+
+def preparar_banco(conn, linhas):
+    popular_sintetico(conn, linhas, semente=7)
+    conn.execute('INSERT INTO usuarios (username, password_hash, is_admin) VALUES (?, ?, 1)',
+                 ('admin', generate_password_hash('admin', method='pbkdf2:sha256:1')))
+    conn.commit()
+    conn.execute('ANALYZE')
+
+
+def normalizar(sql):
+    return ' '.join(sql.split())
+
+
+def varredura_permitida(sql):
+    return any(re.match(padrao, normalizar(sql)) for padrao, _ in VARREDURAS_PERMITIDAS)
+
+
+def varreduras(conn, sql):
+    plano = [linha[-1] for linha in conn.execute(f'EXPLAIN QUERY PLAN {sql}')]
+    problemas = []
+    for detalhe in plano:
+        encontrado = SCAN.match(detalhe)
+        if not encontrado:
+            continue
+        tabela, resto = encontrado.groups()
+        if tabela in TABELAS_PEQUENAS or 'VIRTUAL TABLE' in resto:
+            continue
+        problemas.append(detalhe)
+    if problemas and varredura_permitida(sql):
+        return []
+    return problemas
+
+
+def requisicao(client, metodo, url, dados):
+    if dados is None:
+        return client.open(url, method=metodo)
+    if url.startswith('/api/'):
+        return client.open(url, method=metodo, json=dados)
+    if 'arquivo' in dados:
+        texto, nome = dados['arquivo']
+        dados = {'arquivo': (io.BytesIO(texto.encode()), nome)}
+    return client.open(url, method=metodo, data=dados)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'DATABASE': os.path.join(tmp, 'planos.db'),
+            'TESTING': True,
+            'HASH_WORKERS': 0,
+            # Escritas na conexão da requisição, onde o trace está ligado
+            'DB_WRITER_ENABLED': False,
+            # Tarefas rodam abaixo, na conexão com trace, e não em threads
+            'JOB_WORKERS': 0,
+            # Sem cache de usuários: toda requisição logada passa por load_user
+            'USER_CACHE_SIZE': 0,
+            'LOGIN_THROTTLE_ENABLED': False,
+            'PROFILE_ENABLED': False,
+        })
+        executados = []
+        with app.app_context():
+            pool = get_pool()
+            configurar = pool.on_connect
+
+            def on_connect(conn):
+                configurar(conn)
+                conn.set_trace_callback(executados.append)
+
+            pool.on_connect = on_connect
+            migrar(get_db_connection())
+            preparar_banco(get_db_connection(), args.linhas)
+
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+        falhas = 0
+        verificadas = set()
+        # Conexão fora de app_context: dentro de um, o test client reusaria o
+        # mesmo g em todas as requisições (e o usuário carregado nele)
+        conn = pool.acquire()
+        executor = ExecutorTarefas(lambda: conn, TIPOS_TAREFA, contexto=app.app_context)
+        for metodo, url, dados, pode_varrer in CENARIOS:
+            executados.clear()
+            resposta = requisicao(client, metodo, url, dados)
+            resposta.get_data()   # consome respostas em stream
+            resposta.close()
+            executor.executar_pendentes(conn)
+            # Sem login a rota só redireciona e o cenário não testaria nada
+            if resposta.status_code >= 400 or '/login?next=' in resposta.headers.get('Location', ''):
+                print(f'ERRO  {metodo} {url}: HTTP {resposta.status_code}')
+                falhas += 1
+                continue
+            ok = True
+            for sql in dict.fromkeys(executados):
+                if IGNORAR.match(sql) or (url, sql) in verificadas:
+                    continue
+                verificadas.add((url, sql))
+                problemas = varreduras(conn, sql)
+                if problemas and not pode_varrer:
+                    ok = False
+                    falhas += 1
+                    print(f'SCAN  {metodo} {url}\n      {normalizar(sql)[:160]}')
+                    for problema in problemas:
+                        print(f'      -> {problema}')
+            if ok:
+                print(f'ok    {metodo} {url}' + (' (varredura permitida)' if pode_varrer else ''))
+        pool.release(conn)
+
+    print(f'{len(verificadas)} consultas verificadas, {falhas} falhas.')
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+
+
+# -------------------------------------------------------- Versões de dados
+# versoes guarda um contador por tabela, incrementado pelos triggers a cada
+# escrita em alunos (rotas, importação, scripts, qualquer caminho).
+# versoes_alunos guarda a versão de cada aluno: a versão global no momento
+# da última escrita naquela linha. As rotas de leitura montam o ETag a partir
+# delas sem ler as linhas de alunos.
+
+SQL_CRIAR_VERSOES = (
+    '''
+    CREATE TABLE IF NOT EXISTS versoes (
+        nome TEXT PRIMARY KEY,
+        versao INTEGER NOT NULL DEFAULT 0,
+        atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS versoes_alunos (
+        aluno_id INTEGER PRIMARY KEY,
+        versao INTEGER NOT NULL,
+        atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS versoes_alunos_ai AFTER INSERT ON alunos BEGIN
+        UPDATE versoes SET versao = versao + 1, atualizado_em = CURRENT_TIMESTAMP
+        WHERE nome = 'alunos';
+        INSERT OR REPLACE INTO versoes_alunos (aluno_id, versao, atualizado_em)
+        VALUES (new.id, (SELECT versao FROM versoes WHERE nome = 'alunos'), CURRENT_TIMESTAMP);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS versoes_alunos_au AFTER UPDATE ON alunos BEGIN
+        UPDATE versoes SET versao = versao + 1, atualizado_em = CURRENT_TIMESTAMP
+        WHERE nome = 'alunos';
+        INSERT OR REPLACE INTO versoes_alunos (aluno_id, versao, atualizado_em)
+        VALUES (new.id, (SELECT versao FROM versoes WHERE nome = 'alunos'), CURRENT_TIMESTAMP);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS versoes_alunos_ad AFTER DELETE ON alunos BEGIN
+        UPDATE versoes SET versao = versao + 1, atualizado_em = CURRENT_TIMESTAMP
+        WHERE nome = 'alunos';
+        DELETE FROM versoes_alunos WHERE aluno_id = old.id;
+    END;
+    ''',
+)
+
+
+def criar_versoes(conn):
+    for sql in SQL_CRIAR_VERSOES:
+        conn.execute(sql)
+    conn.execute("INSERT OR IGNORE INTO versoes (nome, versao) VALUES ('alunos', 1)")
+    conn.execute('''
+        INSERT OR IGNORE INTO versoes_alunos (aluno_id, versao)
+        SELECT id, 1 FROM alunos
+    ''')
+
+
+def avancar_versao(conn, nome='alunos'):
+    # Para quem escreve dados derivados de alunos sem passar pelos triggers
+    # (curso_stats reconstruída, por exemplo): ETag e caches por versão mudam
+    conn.execute('''
+        UPDATE versoes SET versao = versao + 1, atualizado_em = CURRENT_TIMESTAMP
+        WHERE nome = ?
+    ''', (nome,))
+
+
+def registrar_versoes_apos(conn, ultimo_id):
+    # Equivalente em lote do trigger versoes_alunos_ai: uma versão nova para
+    # todas as linhas com id > ultimo_id
+    avancar_versao(conn)
+    conn.execute('''
+        INSERT OR REPLACE INTO versoes_alunos (aluno_id, versao, atualizado_em)
+        SELECT id, (SELECT versao FROM versoes WHERE nome = 'alunos'), CURRENT_TIMESTAMP
+        FROM alunos WHERE id > ?
+    ''', (ultimo_id,))
+
+
+def _data(texto):
+    if not texto:
+        return None
+    return datetime.strptime(texto, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+
+def versao_tabela(conn, nome='alunos'):
+    # (versao, atualizado_em), ou (None, None) se a tabela não tem registro
+    linha = conn.execute('SELECT versao, atualizado_em FROM versoes WHERE nome = ?',
+                         (nome,)).fetchone()
+    return (linha[0], _data(linha[1])) if linha else (None, None)
+
+
+def versao_aluno(conn, aluno_id):
+    linha = conn.execute('SELECT versao, atualizado_em FROM versoes_alunos WHERE aluno_id = ?',
+                         (aluno_id,)).fetchone()
+    return (linha[0], _data(linha[1])) if linha else (None, None)
+# -------------------------------------------------------- END Versões de dados